@@ -0,0 +1,177 @@
+"""NoteBookCreator 离线基准测试
+
+用 stubModel 中的假模型替换真实模型，不访问网络，统计每棵 agent 树的：
+- 端到端延迟（秒）
+- LLM 调用轮数
+- 工具调用次数
+- 输入 / 输出 token 总数
+
+结果与 baseline.json 对比，任一指标超过基线的 (1 + threshold) 倍即视为回归，退出码为 1。
+
+用法（在 NoteBookCreator 目录下）：
+    python Benchmark/benchmark.py                      # 运行并与基线对比
+    python Benchmark/benchmark.py --update-baseline    # 运行并覆盖基线
+    python Benchmark/benchmark.py --latency 0.1 --threshold 0.3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import RunConfig, set_tracing_disabled
+
+from agentRunner import run_agent
+from stubModel import StubModel, StubModelProvider
+from sectionAgent import section_agent
+from sectionPipeline import build_section
+from chapterPipeline import build_chapter
+from DefinitionCreator.definationAgent import definition_agent
+from TheoremCreator.theoremAgent import theorem_agent
+from SummaryCreator.summaryAgent import summary_agent
+from ExerciseCreator.exerciseAgent import exercise_agent, mc_agent, fb_agent, proof_agent, sa_agent, code_agent
+from ExerciseCreator.exercisePlanner import generate_exercises
+
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+METRICS = ("latency", "turns", "tool_calls", "input_tokens", "output_tokens")
+
+TOPIC = "函数定义域"
+
+
+def _agent_scenario(agent, input: str) -> Callable[[RunConfig], Awaitable]:
+    return lambda run_config: run_agent(agent, input, run_config)
+
+
+# 场景名 -> 以 run_config 为参数的协程工厂
+SCENARIOS: List[Tuple[str, Callable[[RunConfig], Awaitable]]] = [
+    ("definition_agent", _agent_scenario(definition_agent, f"生成{TOPIC}的定义")),
+    ("theorem_agent", _agent_scenario(theorem_agent, f"生成一个关于{TOPIC}的定理")),
+    ("summary_agent", _agent_scenario(summary_agent, f"为{TOPIC}生成章节总结")),
+    ("mc_agent", _agent_scenario(mc_agent, f"生成一道关于{TOPIC}的选择题")),
+    ("fb_agent", _agent_scenario(fb_agent, f"生成一道关于{TOPIC}的填空题")),
+    ("proof_agent", _agent_scenario(proof_agent, f"生成一道关于{TOPIC}的证明题")),
+    ("sa_agent", _agent_scenario(sa_agent, f"生成一道关于{TOPIC}的简答题")),
+    ("code_agent", _agent_scenario(code_agent, f"生成一道关于{TOPIC}的代码题")),
+    ("exercise_agent", _agent_scenario(exercise_agent, f"生成3-5道关于{TOPIC}的练习题，难度由浅入深")),
+    ("generate_exercises", lambda run_config: generate_exercises(TOPIC, count=4, run_config=run_config)),
+    ("section_agent", _agent_scenario(section_agent, f"创建一个关于{TOPIC}的章节，包含定义、相关定理、3-5道由浅入深的练习题和总结")),
+    ("build_section", lambda run_config: build_section(TOPIC, run_config=run_config)),
+    ("build_chapter", lambda run_config: build_chapter("函数", run_config=run_config)),
+]
+
+
+async def run_scenario(factory: Callable[[RunConfig], Awaitable], model: StubModel) -> Dict[str, float]:
+    """运行一个场景并返回各项指标"""
+    model.reset_stats()
+    run_config = RunConfig(model_provider=StubModelProvider(model), tracing_disabled=True)
+    started = time.perf_counter()
+    await factory(run_config)
+    return {
+        "latency": round(time.perf_counter() - started, 4),
+        "turns": model.calls,
+        "tool_calls": model.tool_calls,
+        "input_tokens": model.input_tokens,
+        "output_tokens": model.output_tokens,
+    }
+
+
+async def run_all(
+    latency: float,
+    repeat: int = 3,
+    names: Optional[List[str]] = None,
+) -> Dict[str, Dict[str, float]]:
+    """运行所有场景；每个场景重复 repeat 次，延迟取中位数，其余指标是确定的，取最后一次"""
+    results = {}
+    for name, factory in SCENARIOS:
+        if names and name not in names:
+            continue
+        model = StubModel(latency=latency)
+        runs = [await run_scenario(factory, model) for _ in range(repeat)]
+        results[name] = dict(runs[-1], latency=round(statistics.median(run["latency"] for run in runs), 4))
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+    metrics: Tuple[str, ...] = METRICS,
+) -> List[str]:
+    """返回所有超过阈值的回归描述"""
+    regressions = []
+    for name, values in results.items():
+        if name not in baseline:
+            continue
+        for metric in metrics:
+            expected = baseline[name].get(metric)
+            actual = values[metric]
+            if expected is not None and actual > expected * (1 + threshold):
+                regressions.append(f"{name}.{metric}: {actual} > {expected} (+{threshold:.0%})")
+    return regressions
+
+
+def print_table(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> None:
+    header = f"{'scenario':<24}" + "".join(f"{metric:>16}" for metric in METRICS)
+    print(header)
+    print("-" * len(header))
+    for name, metrics in results.items():
+        row = f"{name:<24}"
+        for metric in METRICS:
+            value = metrics[metric]
+            expected = baseline.get(name, {}).get(metric)
+            cell = f"{value}" if expected is None else f"{value} ({expected})"
+            row += f"{cell:>16}"
+        print(row)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="NoteBookCreator 离线基准测试")
+    parser.add_argument("--latency", type=float, default=0.05, help="假模型每次调用的延迟（秒）")
+    parser.add_argument("--threshold", type=float, default=0.2, help="允许超过基线的比例")
+    parser.add_argument("--repeat", type=int, default=3, help="每个场景的重复次数，延迟取中位数")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="基线文件路径")
+    parser.add_argument("--update-baseline", action="store_true", help="用本次结果覆盖基线")
+    parser.add_argument("--scenario", action="append", help="只运行指定场景，可重复")
+    args = parser.parse_args(argv)
+
+    set_tracing_disabled(True)
+    results = asyncio.run(run_all(args.latency, args.repeat, args.scenario))
+
+    baseline_path = Path(args.baseline)
+    stored = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else {}
+    baseline = stored.get("scenarios", {})
+    print_table(results, baseline)
+
+    if args.update_baseline:
+        baseline.update(results)
+        stored = {"stub_latency": args.latency, "scenarios": baseline}
+        baseline_path.write_text(json.dumps(stored, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"\n基线已更新: {baseline_path}")
+        return 0
+
+    metrics = METRICS
+    if stored.get("stub_latency") != args.latency:
+        # 模拟延迟不同时延迟指标不可比，只比较调用次数和 token
+        print(f"\n基线的模拟延迟为 {stored.get('stub_latency')}，本次为 {args.latency}，跳过延迟对比")
+        metrics = tuple(metric for metric in METRICS if metric != "latency")
+    regressions = compare(results, baseline, args.threshold, metrics)
+    if regressions:
+        print("\n性能回归：")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("\n未发现回归")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""整章生成的调用次数、token 和耗时对比
+
+用一个有 sections 节的合成规划（ChapterPlan）比较三种生成整章的方式：
+- section_agent：逐节独立运行编排 agent
+- build_section：逐节独立运行代码驱动流水线
+- build_chapter：按规划共享概念块和介绍，各节并发生成（跳过规划阶段，直接传入合成规划）
+
+合成规划中共有 concepts 个共享概念，每节引用其中两个；shared_ratio 比例的节以共享概念作为核心概念。
+假模型的输出是固定的，因此 token 的差别只来自调用次数和输入长度，真实模型下介绍和定义变短的收益不在其中。
+
+用法（在 NoteBookCreator 目录下）：
+    python Benchmark/chapterScaling.py --sections 20 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import RunConfig, set_tracing_disabled
+
+from agentRegistry import get_agent
+from agentRunner import run_agent
+from chapterPipeline import build_chapter
+from model import ChapterPlan, SectionPlan
+from sectionPipeline import build_section
+from stubModel import StubModel, StubModelProvider
+
+
+def make_plan(sections: int, concepts: int, shared_ratio: float) -> ChapterPlan:
+    names = [f"概念{i + 1}" for i in range(concepts)]
+    shared_sections = round(sections * shared_ratio)
+    items = []
+    for i in range(sections):
+        secondary = [names[i % concepts], names[(i + 1) % concepts]]
+        core = [] if i < shared_sections else [f"第 {i + 1} 节的核心概念"]
+        items.append(SectionPlan(
+            title=f"函数的性质 {i + 1}",
+            concepts=core + secondary,
+            focus=f"性质 {i + 1}",
+            introduction=f"本节学习函数的第 {i + 1} 个性质。",
+        ))
+    return ChapterPlan(chapter_title="函数", introduction="本章学习函数的基本性质。", concepts=names, sections=items)
+
+
+async def measure(factory: Callable[[RunConfig], Awaitable], latency: float) -> Dict[str, float]:
+    model = StubModel(latency=latency)
+    run_config = RunConfig(model_provider=StubModelProvider(model), tracing_disabled=True)
+    started = time.perf_counter()
+    await factory(run_config)
+    return {
+        "seconds": time.perf_counter() - started,
+        "calls": model.calls,
+        "input_tokens": model.input_tokens,
+        "output_tokens": model.output_tokens,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="整章生成的调用次数、token 和耗时对比")
+    parser.add_argument("--sections", type=int, default=20, help="节数")
+    parser.add_argument("--concepts", type=int, default=5, help="共享概念数")
+    parser.add_argument("--shared-ratio", type=float, default=0.5, help="以共享概念为核心概念的节所占的比例")
+    parser.add_argument("--concurrency", type=int, default=4, help="build_chapter 同时生成的节数")
+    parser.add_argument("--latency", type=float, default=0.05, help="假模型每次调用的延迟（秒）")
+    args = parser.parse_args(argv)
+
+    set_tracing_disabled(True)
+    plan = make_plan(args.sections, args.concepts, args.shared_ratio)
+
+    async def independent_agent(run_config: RunConfig) -> None:
+        for item in plan.sections:
+            await run_agent(get_agent("section"), f"创建一个关于{item.title}的章节", run_config)
+
+    async def independent_pipeline(run_config: RunConfig) -> None:
+        for item in plan.sections:
+            await build_section(item.title, run_config=run_config)
+
+    async def chapter(run_config: RunConfig) -> None:
+        await build_chapter("函数", plan=plan, section_concurrency=args.concurrency, run_config=run_config)
+
+    print(f"{args.sections} 节，{args.concepts} 个共享概念，模拟延迟 {args.latency}s\n")
+    print(f"{'mode':<16}{'seconds':>10}{'calls':>8}{'input tokens':>15}{'output tokens':>15}{'total':>10}")
+    baseline_total = None
+    for name, factory in (
+        ("section_agent", independent_agent),
+        ("build_section", independent_pipeline),
+        ("build_chapter", chapter),
+    ):
+        result = asyncio.run(measure(factory, args.latency))
+        total = result["input_tokens"] + result["output_tokens"]
+        baseline_total = baseline_total or total
+        print(
+            f"{name:<16}{result['seconds']:>10.2f}{result['calls']:>8}{result['input_tokens']:>15,}"
+            f"{result['output_tokens']:>15,}{total:>10,}  ({total / baseline_total:.0%})"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
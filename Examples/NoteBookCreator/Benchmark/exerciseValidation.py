@@ -0,0 +1,110 @@
+"""练习题校验与序列化的微基准
+
+比较旧的无标签联合类型（pydantic 逐个尝试各子类型）和带 type 标签的联合类型（model.Example）
+在批量加载题库时的耗时：
+- validate_json：从 JSON 文本校验 count 道题（带标签的新数据 / 没有标签的旧数据）
+- dump_json：把校验后的题目序列化回 JSON
+
+同时统计无标签联合类型选错子类型的题目数量。
+
+用法（在 NoteBookCreator 目录下）：
+    python Benchmark/exerciseValidation.py
+    python Benchmark/exerciseValidation.py --count 20000 --repeat 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Union
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+
+from model import (
+    CodeQuestion,
+    Example,
+    FillBlankQuestion,
+    MultipleChoiceQuestion,
+    ProofQuestion,
+    ShortAnswerQuestion,
+)
+from stubModel import CANNED_OUTPUTS
+
+
+# 引入 type 标签之前的定义
+LegacyExample = Union[
+    MultipleChoiceQuestion,
+    FillBlankQuestion,
+    ProofQuestion,
+    ShortAnswerQuestion,
+    CodeQuestion
+]
+
+# 每种题型一道样题（stubModel 中的预置输出）
+SAMPLES: List[dict] = [
+    CANNED_OUTPUTS[name]
+    for name in ("MultipleChoiceQuestion", "FillBlankQuestion", "ProofQuestion", "ShortAnswerQuestion", "CodeQuestion")
+]
+
+
+def make_payload(count: int, tagged: bool) -> bytes:
+    """生成 count 道题的 JSON 数组；tagged 为 False 时模拟没有 type 字段的旧数据"""
+    adapter = TypeAdapter(Example)
+    items = []
+    for i in range(count):
+        item = adapter.dump_python(adapter.validate_python(SAMPLES[i % len(SAMPLES)]), mode="json")
+        item["id"] = f"example_{i:08x}"
+        if not tagged:
+            del item["type"]
+        items.append(item)
+    return json.dumps(items, ensure_ascii=False).encode("utf-8")
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def run(count: int, repeat: int) -> Dict[str, float]:
+    legacy = TypeAdapter(List[LegacyExample])
+    tagged = TypeAdapter(List[Example])
+    tagged_payload = make_payload(count, tagged=True)
+    untagged_payload = make_payload(count, tagged=False)
+
+    results = {
+        "legacy validate (untagged json)": best_of(lambda: legacy.validate_json(untagged_payload), repeat),
+        "tagged validate (tagged json)": best_of(lambda: tagged.validate_json(tagged_payload), repeat),
+        "tagged validate (untagged json)": best_of(lambda: tagged.validate_json(untagged_payload), repeat),
+    }
+    legacy_items = legacy.validate_json(untagged_payload)
+    tagged_items = tagged.validate_json(tagged_payload)
+    results["legacy dump_json"] = best_of(lambda: legacy.dump_json(legacy_items), repeat)
+    results["tagged dump_json"] = best_of(lambda: tagged.dump_json(tagged_items), repeat)
+
+    mismatches = sum(type(a) is not type(b) for a, b in zip(legacy_items, tagged_items))
+    print(f"{count} 道题，重复 {repeat} 次取中位数；无标签联合类型选错子类型 {mismatches} 道\n")
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="练习题校验与序列化的微基准")
+    parser.add_argument("--count", type=int, default=100_000, help="题目数量")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数，取中位数")
+    args = parser.parse_args(argv)
+
+    results = run(args.count, args.repeat)
+    for name, seconds in results.items():
+        print(f"{name:<34}{seconds:>10.3f}s{args.count / seconds:>14,.0f} 道/秒")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
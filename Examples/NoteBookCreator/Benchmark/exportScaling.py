@@ -0,0 +1,81 @@
+"""sectionExport 的吞吐和内存基准
+
+生成 count 个章节的 JSONL 文件（基于 stubModel 的预置章节），分别用不同的进程数导出，
+输出每种格式的耗时、吞吐和父进程的峰值内存。每次导出在独立的子进程中运行，峰值内存互不影响。
+
+用法（在 NoteBookCreator 目录下）：
+    python Benchmark/exportScaling.py --count 50000 --workers 1 2 4 8
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import Section
+from stubModel import CANNED_OUTPUTS
+
+
+def make_corpus(path: str, count: int) -> None:
+    """逐行写出 count 个章节，每个章节的 ID 和标题不同"""
+    section = Section.model_validate(CANNED_OUTPUTS["Section"])
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            section.id = f"section_{i:08x}"
+            section.section_title = f"函数的定义域 {i}"
+            f.write(section.model_dump_json())
+            f.write("\n")
+
+
+def _export_once(corpus: str, fmt: str, workers: int, out_path: str) -> None:
+    """在子进程中执行：导出并打印耗时和峰值内存（KB）"""
+    from sectionExport import export_sections
+
+    started = time.perf_counter()
+    count = export_sections([corpus], out_path, fmt, workers)
+    elapsed = time.perf_counter() - started
+    print(json.dumps({"count": count, "elapsed": elapsed, "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="sectionExport 的吞吐和内存基准")
+    parser.add_argument("--count", type=int, default=50_000, help="章节数量")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1], help="要测试的进程数")
+    parser.add_argument("--format", nargs="+", default=["markdown", "jsonl", "html"], help="要测试的格式")
+    parser.add_argument("--export-once", nargs=4, metavar=("CORPUS", "FORMAT", "WORKERS", "OUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.export_once:
+        corpus, fmt, workers, out_path = args.export_once
+        _export_once(corpus, fmt, int(workers), out_path)
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus = os.path.join(tmp_dir, "sections.jsonl")
+        make_corpus(corpus, args.count)
+        print(f"{args.count} 个章节，语料 {os.path.getsize(corpus) / 1e6:.1f} MB\n")
+        print(f"{'format':<10}{'workers':>8}{'seconds':>10}{'sections/s':>14}{'parent RSS':>14}")
+        for fmt in args.format:
+            for workers in args.workers:
+                out_path = os.path.join(tmp_dir, f"out.{fmt}")
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--export-once", corpus, fmt, str(workers), out_path],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(
+                    f"{fmt:<10}{workers:>8}{result['elapsed']:>10.2f}"
+                    f"{result['count'] / result['elapsed']:>14,.0f}{result['max_rss_kb'] / 1024:>11.1f} MB"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
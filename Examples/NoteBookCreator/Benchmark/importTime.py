@@ -0,0 +1,130 @@
+"""NoteBookCreator 的导入耗时基准
+
+每个入口模块在独立的子进程中用 `python -X importtime -c "import <模块>"` 导入 repeat 次，
+从 importtime 的输出中累加该语句引起的所有顶层导入（不含解释器启动本身的导入），取中位数。
+
+两类检查，任一不通过退出码为 1：
+- 耗时：超过 import_baseline.json 中基线的 (1 + threshold) 倍、且至少超出 min_slack 毫秒即视为回归
+- 依赖：列在 FORBIDDEN 中的重型依赖（agents SDK、numpy）不能被对应的模块在导入时引入，
+  例如 sectionExport 的渲染进程不应该导入 agents SDK，构造 agent 的模块只在 get_agent 时才需要它
+
+用法（在 NoteBookCreator 目录下）：
+    python Benchmark/importTime.py                      # 运行并与基线对比
+    python Benchmark/importTime.py --update-baseline    # 运行并覆盖基线
+    python Benchmark/importTime.py --repeat 9 --threshold 0.3
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = Path(__file__).with_name("import_baseline.json")
+
+# 入口模块 -> 导入时不能引入的模块
+FORBIDDEN: Dict[str, Tuple[str, ...]] = {
+    "agentRegistry": ("agents", "numpy", "pydantic"),
+    "model": ("agents", "numpy"),
+    "sectionMarkdown": ("agents", "numpy"),
+    "sectionStore": ("agents", "numpy"),
+    "sectionExport": ("agents", "numpy"),
+    "DefinitionCreator.definationAgent": ("agents", "numpy"),
+    "ExerciseCreator.exerciseAgent": ("agents", "numpy"),
+    "sectionAgent": ("agents", "numpy"),
+    "sectionPipeline": ("numpy",),
+    "chapterPipeline": ("numpy",),
+    "batchBuilder": ("numpy",),
+}
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+
+def _importtime(statement: str) -> List[Tuple[int, int, str]]:
+    """运行一条语句，返回 importtime 输出的 (嵌套深度, 累计微秒, 模块名) 列表"""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stderr
+    entries = []
+    for line in output.splitlines():
+        match = _LINE.match(line)
+        if match:
+            entries.append((len(match.group(3)), int(match.group(2)), match.group(4)))
+    return entries
+
+
+def measure(module: str, startup: Set[str]) -> Tuple[float, Set[str]]:
+    """导入一次 module，返回 (耗时毫秒, 引入的模块名集合)，不计解释器启动时的导入"""
+    entries = [entry for entry in _importtime(f"import {module}") if entry[2] not in startup]
+    top_level = min((depth for depth, _, _ in entries), default=1)
+    elapsed = sum(cumulative for depth, cumulative, _ in entries if depth == top_level) / 1000
+    return elapsed, {name for _, _, name in entries}
+
+
+def run(repeat: int) -> Tuple[Dict[str, float], Dict[str, List[str]]]:
+    """返回 (模块 -> 中位数耗时毫秒, 模块 -> 违规引入的模块)"""
+    startup = {name for _, _, name in _importtime("pass")}
+    timings: Dict[str, float] = {}
+    violations: Dict[str, List[str]] = {}
+    for module, forbidden in FORBIDDEN.items():
+        samples = []
+        for _ in range(repeat):
+            elapsed, imported = measure(module, startup)
+            samples.append(elapsed)
+        timings[module] = round(statistics.median(samples), 1)
+        found = [name for name in forbidden if name in imported]
+        if found:
+            violations[module] = found
+    return timings, violations
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="NoteBookCreator 的导入耗时基准")
+    parser.add_argument("--repeat", type=int, default=5, help="每个模块的导入次数，取中位数")
+    parser.add_argument("--threshold", type=float, default=0.5, help="允许超过基线的比例（导入耗时波动较大）")
+    parser.add_argument("--min-slack", type=float, default=20.0, help="允许超过基线的最小毫秒数，避免很小的基线因抖动误报")
+    parser.add_argument("--update-baseline", action="store_true", help="用本次结果覆盖基线")
+    args = parser.parse_args(argv)
+
+    timings, violations = run(args.repeat)
+
+    if args.update_baseline:
+        BASELINE_PATH.write_text(json.dumps({"modules": timings}, indent=2) + "\n", encoding="utf-8")
+        print(f"基线已写入 {BASELINE_PATH}")
+
+    baseline = {}
+    if BASELINE_PATH.exists():
+        baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8"))["modules"]
+
+    regressions = []
+    print(f"{'module':<36}{'ms':>10}{'baseline':>12}{'budget':>10}")
+    for module, elapsed in timings.items():
+        base = baseline.get(module)
+        budget = max(base * (1 + args.threshold), base + args.min_slack) if base is not None else None
+        flag = ""
+        if budget is not None and elapsed > budget:
+            flag = "  <- 超出预算"
+            regressions.append(module)
+        base_text = f"{base:.1f}" if base is not None else "-"
+        budget_text = f"{budget:.1f}" if budget is not None else "-"
+        print(f"{module:<36}{elapsed:>10.1f}{base_text:>12}{budget_text:>10}{flag}")
+
+    for module, found in violations.items():
+        print(f"{module} 在导入时引入了 {', '.join(found)}")
+
+    if regressions or violations:
+        print(f"\n导入耗时回归 {len(regressions)} 个，依赖违规 {len(violations)} 个")
+        return 1
+    print("\n未发现回归")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
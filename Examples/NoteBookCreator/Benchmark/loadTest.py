@@ -0,0 +1,168 @@
+"""对本地 OpenAI 兼容假服务器运行章节流水线的负载测试
+
+stubServer.py 在子进程中启动，请求经过 openai 库、httpx 连接池和本地 TCP 连接的完整路径。
+在逐级增加的并发数下运行 build_section（每级 rounds × 并发数 个章节），比较两种客户端：
+- default：openai 库的默认客户端（最多保持 100 个空闲连接，空闲 5 秒即关闭）
+- pooled：openaiClient.ClientSettings 的设置（--max-connections / --max-keepalive）
+
+每级报告章节吞吐量、请求吞吐量、服务器接受的连接数（连接重建情况）、每个连接承载的请求数、
+请求耗时（从进入 httpx 到收到响应头，包含在池中等待连接的时间）和章节耗时的 p50 / p99。
+
+用法（在 NoteBookCreator 目录下）：
+    python Benchmark/loadTest.py --levels 1,4,16,32 --latency 0.05
+    python Benchmark/loadTest.py --levels 8,32 --max-connections 32 --max-keepalive 32 --modes pooled
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from agents import set_tracing_disabled
+
+from openaiClient import ClientSettings, create_client, make_run_config
+from sectionPipeline import build_section
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOPIC = "函数的定义域"
+
+
+def percentile(values: List[float], q: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def start_server(latency: float, jitter: float) -> Tuple[subprocess.Popen, str]:
+    """在子进程中启动 stubServer，返回 (进程, base_url)"""
+    process = subprocess.Popen(
+        [sys.executable, "stubServer.py", "--port", "0", "--latency", str(latency), "--jitter", str(jitter)],
+        cwd=ROOT, stdout=subprocess.PIPE, text=True,
+    )
+    base_url = process.stdout.readline().strip()
+    if not base_url:
+        process.kill()
+        raise RuntimeError("stub server failed to start")
+    return process, base_url
+
+
+class RequestTimer:
+    """用 httpx 的事件钩子记录每个请求的耗时"""
+
+    def __init__(self):
+        self.started: Dict[int, float] = {}
+        self.durations: List[float] = []
+
+    async def on_request(self, request: httpx.Request) -> None:
+        self.started[id(request)] = time.perf_counter()
+
+    async def on_response(self, response: httpx.Response) -> None:
+        started = self.started.pop(id(response.request), None)
+        if started is not None:
+            self.durations.append(time.perf_counter() - started)
+
+    def hooks(self) -> Dict[str, list]:
+        return {"request": [self.on_request], "response": [self.on_response]}
+
+
+def make_client(mode: str, base_url: str, settings: ClientSettings, timer: RequestTimer) -> AsyncOpenAI:
+    if mode == "default":
+        # 与 SDK 不做配置时创建的客户端相同的连接池设置
+        return AsyncOpenAI(api_key="stub", base_url=base_url, http_client=DefaultAsyncHttpxClient(event_hooks=timer.hooks()))
+    return create_client(settings, event_hooks=timer.hooks())
+
+
+async def run_level(mode: str, base_url: str, settings: ClientSettings, concurrency: int, sections: int) -> Dict[str, float]:
+    timer = RequestTimer()
+    client = make_client(mode, base_url, settings, timer)
+    run_config = make_run_config(client, tracing_disabled=True)
+    semaphore = asyncio.Semaphore(concurrency)
+    section_seconds: List[float] = []
+
+    async def one() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await build_section(TOPIC, run_config=run_config)
+            section_seconds.append(time.perf_counter() - started)
+
+    async with httpx.AsyncClient(base_url=base_url.rsplit("/v1", 1)[0]) as control:
+        await control.post("/stats/reset")
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(one() for _ in range(sections)))
+        finally:
+            await client.close()
+        elapsed = time.perf_counter() - started
+        stats = (await control.get("/stats")).json()
+    return {
+        "sections_per_s": sections / elapsed,
+        "requests_per_s": stats["requests"] / elapsed,
+        "requests": stats["requests"],
+        # 统计用的连接在清零前已经建立，不计入 connections；同时打开的连接数要减去它
+        "connections": stats["connections"],
+        "max_open": stats["max_active"] - 1,
+        "request_p50": percentile(timer.durations, 50),
+        "request_p99": percentile(timer.durations, 99),
+        "section_p50": percentile(section_seconds, 50),
+        "section_p99": percentile(section_seconds, 99),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="章节流水线对本地假服务器的负载测试")
+    parser.add_argument("--levels", default="1,4,16,32", help="逗号分隔的并发章节数")
+    parser.add_argument("--rounds", type=int, default=2, help="每级运行 rounds × 并发数 个章节")
+    parser.add_argument("--latency", type=float, default=0.05, help="假服务器每个请求的延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.3, help="延迟的随机浮动比例")
+    parser.add_argument("--modes", default="default,pooled", help="逗号分隔的客户端：default、pooled")
+    parser.add_argument("--max-connections", type=int, default=ClientSettings.max_connections, help="pooled 的连接数上限")
+    parser.add_argument("--max-keepalive", type=int, default=ClientSettings.max_keepalive_connections, help="pooled 的空闲连接数上限")
+    args = parser.parse_args(argv)
+
+    set_tracing_disabled(True)
+    logging.getLogger("openai").setLevel(logging.ERROR)
+    levels = [int(level) for level in args.levels.split(",")]
+    modes = args.modes.split(",")
+
+    process, base_url = start_server(args.latency, args.jitter)
+    settings = ClientSettings(
+        base_url=base_url,
+        api_key="stub",
+        max_connections=args.max_connections,
+        max_keepalive_connections=args.max_keepalive,
+    )
+    try:
+        print(f"假服务器 {base_url}，延迟 {args.latency}s，pooled: 连接上限 {args.max_connections}，空闲连接上限 {args.max_keepalive}\n")
+        print(
+            f"{'mode':<9}{'conc':>5}{'sect/s':>8}{'req/s':>8}{'reqs':>7}{'conns':>7}{'req/conn':>9}{'open':>6}"
+            f"{'req p50':>9}{'req p99':>9}{'sec p50':>9}{'sec p99':>9}"
+        )
+        for concurrency in levels:
+            for mode in modes:
+                result = asyncio.run(run_level(mode, base_url, settings, concurrency, concurrency * args.rounds))
+                per_connection = result["requests"] / max(result["connections"], 1)
+                print(
+                    f"{mode:<9}{concurrency:>5}{result['sections_per_s']:>8.2f}{result['requests_per_s']:>8.1f}"
+                    f"{result['requests']:>7}{result['connections']:>7}{per_connection:>9.1f}{result['max_open']:>6}"
+                    f"{result['request_p50']:>9.3f}{result['request_p99']:>9.3f}"
+                    f"{result['section_p50']:>9.2f}{result['section_p99']:>9.2f}"
+                )
+    finally:
+        process.terminate()
+        process.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
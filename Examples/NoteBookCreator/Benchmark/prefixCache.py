@@ -0,0 +1,91 @@
+"""前缀缓存命中率：逐 agent 统计缓存命中和未命中的输入 token
+
+假模型开启 prefix_cache（stubModel.PrefixCache）后，按 OpenAI 的规则模拟服务端前缀缓存：
+请求开头逐字节相同的部分达到 min_tokens 后按 block_tokens 一档命中。
+依次为 TOPICS 中的主题各生成 rounds 个章节，tracing 交给 MetricsProcessor，打印 cache_report 的表格：
+- pipeline：sectionPipeline.build_section
+- agent：section_agent（run_agent）
+
+另外在不同的 PYTHONHASHSEED 下各启动一个子进程构造所有 agent，检查每个 agent 的 prompt_cache_key
+（包含静态前缀的哈希）在进程之间保持不变。
+
+用法（在 NoteBookCreator 目录下）：
+    python Benchmark/prefixCache.py --rounds 4
+    python Benchmark/prefixCache.py --min-tokens 0 --block-tokens 16   # 不考虑服务端下限，只看请求布局
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import RunConfig, set_trace_processors, set_tracing_disabled
+
+from agentMetrics import MetricsProcessor, format_cache_report
+from agentRegistry import get_agent
+from agentRunner import run_agent
+from sectionPipeline import build_section
+from stubModel import PrefixCache, StubModel, StubModelProvider
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOPICS = ["函数的定义域", "函数的值域", "数列的极限", "导数的几何意义"]
+
+_PRINT_KEYS = (
+    "import json; from agentRegistry import agent_names, get_agent; "
+    "print(json.dumps({name: get_agent(name).model_settings.extra_args.get('prompt_cache_key') for name in agent_names()}))"
+)
+
+
+def cache_keys(hash_seed: int) -> Dict[str, str]:
+    """在指定 PYTHONHASHSEED 的子进程中构造所有 agent，返回 名称 -> prompt_cache_key"""
+    env = dict(os.environ, PYTHONHASHSEED=str(hash_seed))
+    output = subprocess.run(
+        [sys.executable, "-c", _PRINT_KEYS], cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+async def run(mode: str, rounds: int, model: StubModel) -> None:
+    run_config = RunConfig(model_provider=StubModelProvider(model))
+    for _ in range(rounds):
+        for topic in TOPICS:
+            if mode == "pipeline":
+                await build_section(topic, run_config=run_config)
+            else:
+                await run_agent(get_agent("section"), f"创建一个关于{topic}的章节", run_config)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="逐 agent 的前缀缓存命中率")
+    parser.add_argument("--rounds", type=int, default=3, help="每个主题生成的章节数")
+    parser.add_argument("--min-tokens", type=int, default=1024, help="可缓存的最短前缀（token）")
+    parser.add_argument("--block-tokens", type=int, default=128, help="缓存的粒度（token）")
+    parser.add_argument("--modes", default="pipeline,agent", help="逗号分隔：pipeline、agent")
+    args = parser.parse_args(argv)
+
+    first, second = cache_keys(1), cache_keys(2)
+    unstable = sorted(name for name in first if first[name] != second.get(name))
+    print(f"prompt_cache_key 在不同进程之间{'不一致：' + ', '.join(unstable) if unstable else '保持不变'}"
+          f"（{len(first)} 个 agent）\n")
+
+    for mode in args.modes.split(","):
+        metrics = MetricsProcessor()
+        set_trace_processors([metrics])
+        set_tracing_disabled(False)
+        model = StubModel(prefix_cache=PrefixCache(args.min_tokens, args.block_tokens))
+        asyncio.run(run(mode, args.rounds, model))
+        print(f"{mode}：{args.rounds * len(TOPICS)} 个章节，{model.calls} 次模型调用，"
+              f"最短前缀 {args.min_tokens}，粒度 {args.block_tokens}")
+        print(format_cache_report(metrics.cache_report()))
+        print()
+    return 1 if unstable else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
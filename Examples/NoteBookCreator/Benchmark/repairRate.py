@@ -0,0 +1,82 @@
+"""格式有小错误的输出：本地修复与重新请求的对比
+
+假模型的结构化输出以 malformed_rate 的概率带有 stubModel.MALFORMATIONS 中的一种错误
+（前后的说明文字、多余的逗号、options 是字符串、blanks 是列表、未转义的 LaTeX、截断）。
+依次生成 sections 个章节（build_section），比较：
+- off：不做本地修复，每个错误输出都要重新请求模型（run_agent 最多重新请求一次）
+- on：先在本地修复（outputRepair），只有截断这类无法修复的输出才重新请求
+
+打印失败的章节数、模型调用次数、重新请求次数、本地修复次数和各修复类型的次数。
+
+用法（在 NoteBookCreator 目录下）：
+    python Benchmark/repairRate.py --sections 40 --malformed-rate 0.15
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from typing import List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import RunConfig, set_tracing_disabled
+from agents.exceptions import AgentsException
+
+from agentRegistry import set_output_repair
+from outputRepair import repair_stats
+from sectionPipeline import build_section
+from stubModel import StubModel, StubModelProvider
+
+
+TOPIC = "函数的定义域"
+
+
+async def run(sections: int, model: StubModel) -> int:
+    """返回失败的章节数"""
+    run_config = RunConfig(model_provider=StubModelProvider(model), tracing_disabled=True)
+    failed = 0
+    for _ in range(sections):
+        try:
+            await build_section(TOPIC, run_config=run_config)
+        except AgentsException:
+            failed += 1
+    return failed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="本地修复与重新请求的对比")
+    parser.add_argument("--sections", type=int, default=40, help="生成的章节数")
+    parser.add_argument("--malformed-rate", type=float, default=0.15, help="格式有错误的输出比例")
+    parser.add_argument("--seed", type=int, default=0, help="假模型的随机数种子")
+    args = parser.parse_args(argv)
+
+    set_tracing_disabled(True)
+    # 失败和丢弃的日志很多，这里只看汇总
+    logging.getLogger("sectionPipeline").setLevel(logging.CRITICAL)
+    logging.getLogger("ExerciseCreator.exercisePlanner").setLevel(logging.CRITICAL)
+    logging.getLogger("openai.agents").setLevel(logging.CRITICAL)
+
+    print(f"{args.sections} 个章节，格式错误的输出比例 {args.malformed_rate:.0%}\n")
+    print(f"{'repair':<8}{'failed':>8}{'calls':>8}{'malformed':>11}{'reasked':>9}{'repaired':>10}{'unrepaired':>12}")
+    for enabled in (False, True):
+        set_output_repair(enabled)
+        repair_stats.reset()
+        model = StubModel(malformed_rate=args.malformed_rate, seed=args.seed)
+        try:
+            failed = asyncio.run(run(args.sections, model))
+        finally:
+            set_output_repair(True)
+        print(
+            f"{'on' if enabled else 'off':<8}{failed:>8}{model.calls:>8}{model.malformed:>11}"
+            f"{sum(repair_stats.reasked.values()):>9}{sum(repair_stats.repaired.values()):>10}"
+            f"{sum(repair_stats.failed.values()):>12}"
+        )
+        if enabled:
+            print("\n修复类型：" + "，".join(f"{fix} {count}" for fix, count in sorted(repair_stats.fixes.items())))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
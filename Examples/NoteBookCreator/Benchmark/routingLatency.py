@@ -0,0 +1,96 @@
+"""按 agent 路由模型档位的离线对比
+
+三个档位各用一个不同延迟的假模型（heavy 最慢、fast 最快），对同一个主题运行 build_section：
+- single：不设路由，所有 agent 都使用 heavy 档位的模型
+- routed：使用 DEFAULT_ROUTING 的档位划分（预算按假模型的延迟缩小）
+- slow-heavy：heavy 档位的延迟超出预算，theorem / proof 降级到 standard
+- failing-heavy：heavy 档位每次都返回 429，theorem / proof 降级到 standard
+
+每个场景打印耗时、各档位的调用次数，以及 (agent, 档位) 的尝试、成功、超时、出错次数。
+
+用法（在 NoteBookCreator 目录下）：
+    python Benchmark/routingLatency.py --heavy-latency 0.3 --standard-latency 0.15 --fast-latency 0.05
+"""
+
+import argparse
+import asyncio
+import copy
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import RunConfig, set_tracing_disabled
+
+from agentRegistry import set_model_router
+from modelRouting import DEFAULT_ROUTING, ModelRouter
+from sectionPipeline import build_section
+from stubModel import StubModel, StubModelProvider
+
+
+TOPIC = "函数的定义域"
+
+
+def scaled_routing(scale: float) -> Dict:
+    """DEFAULT_ROUTING 的预算乘以 scale，使其与假模型的延迟处在同一量级"""
+    routing = copy.deepcopy(DEFAULT_ROUTING)
+    for route in [routing["default"], *routing["agents"].values()]:
+        route["budget"] = route["budget"] * scale
+    return routing
+
+
+async def run(router: Optional[ModelRouter], models: Dict[str, StubModel]) -> float:
+    set_model_router(router)
+    run_config = RunConfig(model_provider=StubModelProvider(models["heavy"]), tracing_disabled=True)
+    started = time.perf_counter()
+    try:
+        await build_section(TOPIC, run_config=run_config)
+    finally:
+        set_model_router(None)
+    return time.perf_counter() - started
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="按 agent 路由模型档位的离线对比")
+    parser.add_argument("--heavy-latency", type=float, default=0.3, help="heavy 档位假模型的延迟（秒）")
+    parser.add_argument("--standard-latency", type=float, default=0.15, help="standard 档位假模型的延迟（秒）")
+    parser.add_argument("--fast-latency", type=float, default=0.05, help="fast 档位假模型的延迟（秒）")
+    args = parser.parse_args(argv)
+
+    set_tracing_disabled(True)
+    latencies = {"heavy": args.heavy_latency, "standard": args.standard_latency, "fast": args.fast_latency}
+    # 默认预算在 20-90 秒之间，缩放到 heavy 档位延迟的 2-6 倍左右
+    routing = scaled_routing(args.heavy_latency / 15)
+
+    scenarios = {
+        "single": ({}, False),
+        "routed": ({}, True),
+        "slow-heavy": ({"heavy": {"latency": args.heavy_latency * 10}}, True),
+        "failing-heavy": ({"heavy": {"rate_limit_rate": 1.0}}, True),
+    }
+    for name, (overrides, routed) in scenarios.items():
+        models = {
+            tier: StubModel(**{"latency": latency, **overrides.get(tier, {})})
+            for tier, latency in latencies.items()
+        }
+        router = None
+        if routed:
+            router = ModelRouter(routing, providers={tier: StubModelProvider(model) for tier, model in models.items()})
+        seconds = asyncio.run(run(router, models))
+        calls = ", ".join(f"{tier} {model.calls}" for tier, model in models.items())
+        print(f"\n[{name}] {seconds:.2f}s  模型调用: {calls}")
+        if router is None:
+            continue
+        print(f"  {'agent':<18}{'tier':<10}{'attempts':>9}{'ok':>5}{'timeout':>9}{'error':>7}{'mean s':>9}")
+        for (agent, tier), item in sorted(router.summary().items()):
+            print(
+                f"  {agent:<18}{tier:<10}{item['attempts']:>9}{item['ok']:>5}"
+                f"{item['timeout']:>9}{item['error']:>7}{item['mean_seconds']:>9.2f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
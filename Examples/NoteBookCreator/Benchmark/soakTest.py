@@ -0,0 +1,322 @@
+"""长时间运行的浸泡测试：跟踪内存增长和事件循环延迟
+
+在同一个进程中对假模型连续生成 sections 个章节（默认 section_agent，也可以是 build_section 流水线），
+每个章节像批量任务一样保存到 SectionStore（写入 JSON 和渲染后的 Markdown），然后只保留章节 ID。
+session 模式改为运行 sections 轮对话：每轮经过 BoundedSession（仓库根目录的 boundedSession.py）运行，
+所有 session 共用一个临时目录中的 SessionPool，旧对话由 AgentSummarizer 折叠进摘要（都使用假模型）；
+同时进行 --sessions 个对话，每个对话运行 --turns 轮后 clear_session 并换成新的 session，
+因此测量的是 session 的读写、折叠和换新是否留下内存，结束时还会打印数据库中剩余的条目数。
+每轮结束后还会检查摘要和回放的条目是否覆盖了全部轮次（已折叠轮数 + 回放中的用户轮数 = 总轮数），
+有遗漏时返回 1。
+每生成 sample_every 个章节（或对话轮）采样一次：
+- tracemalloc：Python 分配的内存（gc 之后），与预热结束时的快照比较
+- RSS：进程的常驻内存（Linux 读 /proc/self/statm，其他平台退回 ru_maxrss 峰值）
+- 事件循环延迟：后台任务每 lag_interval 秒 sleep 一次，实际醒来时间比预期晚多少
+
+结束时打印增长最多的分配位置（按 tracemalloc 的 traceback 聚合），并把每个章节留存的内存与 budget 比较，
+超出时返回 1。留存内存按后一半采样区间计算（tracemalloc 增量 / 章节数）：
+预热阶段的 agent 构造、schema 生成等一次性开销不计入，
+有上限的缓冲区（期限统计的样本窗口、SDK 的 trace ID 表等）在前一半填满后也不再增长，只有真正的泄漏会留下来。
+tracemalloc 会让运行慢几倍（frames 越大越慢），事件循环延迟也会被放大；
+--no-tracemalloc 只采样 RSS 和事件循环延迟，留存内存按 RSS 计算。
+
+用法（在 NoteBookCreator 目录下）：
+    python Benchmark/soakTest.py --sections 2000 --budget-kb 1
+    python Benchmark/soakTest.py --mode pipeline --sections 5000 --concurrency 16 --top 15
+    python Benchmark/soakTest.py --sections 1000 --metrics --routing   # 同时开启 tracing 指标和模型路由
+    python Benchmark/soakTest.py --mode session --sections 5000 --sessions 32 --turns 40
+"""
+
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# boundedSession.py 在仓库根目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from agents import Agent, RunConfig, Runner, set_trace_processors, set_tracing_disabled
+
+from agentMetrics import MetricsProcessor
+from agentRegistry import get_agent, set_model_router
+from agentRunner import run_agent
+from boundedSession import AgentSummarizer, BoundedSession, SessionPool
+from modelRouting import ModelRouter
+from sectionPipeline import build_section
+from sectionStore import SectionStore
+from stubModel import StubModel, StubModelProvider
+
+
+TOPICS = ["函数的定义域", "函数的值域", "数列的极限", "导数的几何意义", "定积分的换元法"]
+
+
+def rss_bytes() -> int:
+    """进程当前的常驻内存；没有 /proc 时退回 ru_maxrss（峰值）"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 的单位是字节，Linux 是 KB
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class LoopLagMonitor:
+    """后台任务：每 interval 秒 sleep 一次，记录实际醒来时间的延迟"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def drain(self) -> List[float]:
+        """取出并清空上次采样以来的延迟"""
+        samples, self.samples = self.samples, []
+        return samples
+
+
+class SessionDriver:
+    """session 模式：第 i 轮对话交给第 i % sessions 个对话，每个对话运行 turns 轮后换成新的 session
+
+    同一个对话的各轮依次进行（每个对话一把锁），换新时等待旧 session 的折叠完成后 clear_session。
+    每轮结束后检查下一轮的输入是否覆盖全部轮次，遗漏的次数记在 gaps 中。
+    """
+
+    def __init__(self, pool: SessionPool, run_config: RunConfig, sessions: int, turns: int, keep_turns: int):
+        self.pool = pool
+        self.run_config = run_config
+        self.sessions = sessions
+        self.turns = turns
+        self.keep_turns = keep_turns
+        self.agent = Agent(name="soak_tutor", instructions="你是一个数学辅导老师，简要回答学生的问题。")
+        self.summarizer = AgentSummarizer(run_config=run_config)
+        # 对话编号 -> (第几代, session)
+        self._slots: Dict[int, Tuple[int, BoundedSession]] = {}
+        self._locks = [asyncio.Lock() for _ in range(sessions)]
+        self.gaps = 0
+
+    async def turn(self, i: int, topic: str) -> None:
+        slot, generation = i % self.sessions, i // self.sessions // self.turns
+        async with self._locks[slot]:
+            current = self._slots.get(slot)
+            if current is None or current[0] != generation:
+                if current is not None:
+                    await self._retire(current[1])
+                session = BoundedSession(
+                    f"soak-{generation}-{slot}", self.pool, keep_turns=self.keep_turns, summarizer=self.summarizer,
+                )
+                self._slots[slot] = (generation, session)
+            session = self._slots[slot][1]
+            await Runner.run(self.agent, f"请讲解{topic}", session=session, run_config=self.run_config)
+            await self._check(session)
+
+    async def _check(self, session: BoundedSession) -> None:
+        """下一轮的输入（摘要 + 回放的条目）应覆盖全部轮次：已折叠的轮数加上回放中的用户轮数等于总轮数"""
+        items = await session.get_items()
+        state = (await self.pool.stats(session.session_id))[session.session_id]
+        replayed, previous_user = 0, False
+        for item in items:
+            is_user = isinstance(item, dict) and item.get("role") == "user"
+            replayed += is_user and not previous_user
+            previous_user = is_user
+        if state["folded_turns"] + replayed != state["turns"]:
+            self.gaps += 1
+            logging.error(
+                "Session %s replays %d of %d unfolded turns",
+                session.session_id, replayed, state["turns"] - state["folded_turns"],
+            )
+
+    async def _retire(self, session: BoundedSession) -> None:
+        if session._fold_task is not None:
+            await session._fold_task
+        await session.clear_session()
+
+    async def close(self) -> Tuple[int, int]:
+        """等待所有折叠完成，返回数据库中的 (session 数, 条目数)"""
+        for _, session in self._slots.values():
+            if session._fold_task is not None:
+                await session._fold_task
+        stats = await self.pool.stats()
+        return len(stats), sum(row["items"] for row in stats.values())
+
+
+def memory_bytes() -> int:
+    """gc 之后的内存：tracemalloc 在跟踪时为 Python 分配的内存，否则为 RSS"""
+    gc.collect()
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    return rss_bytes()
+
+
+def percentile(values: List[float], q: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+async def soak(
+    args: argparse.Namespace, store: SectionStore, pool: Optional[SessionPool] = None,
+) -> Tuple[int, int]:
+    """运行浸泡测试，返回后一半采样区间中每个章节（session 模式为每轮对话）留存的字节数，以及 session 历史遗漏的次数"""
+    run_config = RunConfig(model_provider=StubModelProvider(StubModel(latency=args.latency, jitter=0.5)))
+    driver = None
+    if pool is not None:
+        driver = SessionDriver(pool, run_config, args.sessions, args.turns, args.keep_turns)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    monitor = LoopLagMonitor(args.lag_interval)
+    monitor.start()
+
+    async def one(i: int) -> None:
+        topic = TOPICS[i % len(TOPICS)]
+        async with semaphore:
+            if driver is not None:
+                await driver.turn(i, topic)
+                return
+            if args.mode == "pipeline":
+                section = await build_section(topic, run_config=run_config)
+            else:
+                section = await run_agent(get_agent("section"), f"创建一个关于{topic}的章节", run_config)
+            # 与批量任务一样：保存之后只保留 ID
+            store.save(section)
+
+    async def run_batch(start: int, count: int) -> None:
+        await asyncio.gather(*(one(i) for i in range(start, start + count)))
+
+    await run_batch(0, args.warmup)
+    baseline = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+    baseline_bytes = memory_bytes()
+    baseline_rss = rss_bytes()
+    await asyncio.sleep(2 * monitor.interval)
+    monitor.drain()
+    started = time.perf_counter()
+
+    memory_label = "traced MB" if baseline is not None else "memory MB"
+    unit = "turns" if driver is not None else "sections"
+    print(
+        f"{unit:>9}{memory_label:>11}{'RSS MB':>9}{'KB/' + unit[:4]:>9}"
+        f"{'lag p99 ms':>12}{'lag max ms':>12}{unit[:4] + '/s':>8}"
+    )
+    done = 0
+    samples = [(0, baseline_bytes)]
+    while done < args.sections:
+        count = min(args.sample_every, args.sections - done)
+        await run_batch(args.warmup + done, count)
+        done += count
+        lag = monitor.drain()
+        current = memory_bytes()
+        samples.append((done, current))
+        print(
+            f"{done:>9}{current / 2**20:>11.1f}{rss_bytes() / 2**20:>9.1f}"
+            f"{max(0, current - baseline_bytes) / done / 1024:>9.2f}"
+            f"{percentile(lag, 99) * 1000:>12.1f}{max(lag, default=0.0) * 1000:>12.1f}"
+            f"{done / (time.perf_counter() - started):>8.1f}"
+        )
+        # 采样本身（gc、tracemalloc）会阻塞事件循环，等探测任务记下这次延迟后丢弃
+        await asyncio.sleep(2 * monitor.interval)
+        monitor.drain()
+    await monitor.stop()
+    # 后一半采样区间的增长
+    middle_done, middle_bytes = samples[len(samples) // 2]
+    if middle_done == done:
+        middle_done, middle_bytes = samples[0]
+    retained = max(0, samples[-1][1] - middle_bytes) // (done - middle_done)
+
+    print(f"\nRSS 增长 {(rss_bytes() - baseline_rss) / 2**20:.1f} MB（含分配器未归还系统的内存）")
+    if driver is not None:
+        sessions, items = await driver.close()
+        print(f"数据库中剩余 {sessions} 个 session、{items} 条条目（最多 {args.sessions} 个进行中的对话）")
+        print(f"历史遗漏 {driver.gaps} 次（摘要和回放的条目没有覆盖全部轮次）")
+    gaps = driver.gaps if driver is not None else 0
+    if baseline is None:
+        return retained, gaps
+    print(f"增长最多的 {args.top} 个分配位置（与预热结束时相比）：")
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ])
+    growing = [stat for stat in snapshot.compare_to(baseline, "traceback") if stat.size_diff > 0]
+    for stat in growing[:args.top]:
+        frames = stat.traceback.format(limit=args.frames, most_recent_first=True)
+        print(f"  {stat.size_diff / 1024:+10.1f} KB {stat.count_diff:+8d} 块  {frames[0].strip() if frames else ''}")
+        for frame in frames[1:]:
+            print(f"  {'':>30}{frame.strip()}")
+    return retained, gaps
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="长时间运行的内存和事件循环延迟浸泡测试")
+    parser.add_argument("--sections", type=int, default=2000, help="预热之后生成的章节数")
+    parser.add_argument("--warmup", type=int, default=50, help="预热的章节数，不计入留存内存")
+    parser.add_argument(
+        "--mode", choices=["agent", "pipeline", "session"], default="agent",
+        help="section_agent、build_section，或经过 BoundedSession 的多轮对话（--sections 为对话轮数）",
+    )
+    parser.add_argument("--sessions", type=int, default=32, help="session 模式：同时进行的对话数")
+    parser.add_argument("--turns", type=int, default=40, help="session 模式：每个对话的轮数，之后换成新的 session")
+    parser.add_argument("--keep-turns", type=int, default=6, help="session 模式：BoundedSession 原样保留的轮数")
+    parser.add_argument("--concurrency", type=int, default=8, help="同时生成的章节数")
+    parser.add_argument("--latency", type=float, default=0.0, help="假模型每次调用的延迟（秒）")
+    parser.add_argument("--sample-every", type=int, default=100, help="每生成多少个章节采样一次")
+    parser.add_argument("--lag-interval", type=float, default=0.05, help="事件循环延迟的探测间隔（秒）")
+    parser.add_argument("--budget-kb", type=float, default=1.0, help="每个章节留存内存的上限（KB）")
+    parser.add_argument("--top", type=int, default=10, help="打印增长最多的分配位置数")
+    parser.add_argument("--frames", type=int, default=1, help="每个分配位置记录的调用栈深度")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="不启用 tracemalloc，只采样 RSS 和事件循环延迟")
+    parser.add_argument("--metrics", action="store_true", help="开启 tracing，交给 MetricsProcessor 统计")
+    parser.add_argument("--routing", action="store_true", help="使用默认的模型路由（各档位都是同一个假模型）")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+    if args.metrics:
+        set_trace_processors([MetricsProcessor()])
+        set_tracing_disabled(False)
+    else:
+        set_tracing_disabled(True)
+    if args.routing:
+        set_model_router(ModelRouter(provider=StubModelProvider(StubModel(latency=args.latency, jitter=0.5))))
+
+    if not args.no_tracemalloc:
+        tracemalloc.start(args.frames)
+    with tempfile.TemporaryDirectory() as root:
+        pool = SessionPool(os.path.join(root, "sessions.db")) if args.mode == "session" else None
+        try:
+            retained, gaps = asyncio.run(soak(args, SectionStore(root), pool))
+        finally:
+            if pool is not None:
+                pool.close()
+    tracemalloc.stop()
+
+    over = retained / 1024 > args.budget_kb
+    print(f"\n后一半区间每个{'对话轮' if args.mode == 'session' else '章节'}留存 {retained / 1024:.2f} KB，上限 {args.budget_kb} KB：{'超出上限' if over else '未超出'}")
+    return 1 if over or gaps else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""章节耗时的长尾对比：不设期限、只设期限、期限加对冲
+
+假模型的每次调用以 slow_rate 的概率变为 slow_latency 秒的长尾调用，依次生成 sections 个章节
+（build_section，同时进行 concurrency 个），比较章节耗时的 p50 / p95 / p99、模型调用次数和丢弃的部分：
+- none：不设期限，一次长尾调用就拖住整个章节
+- deadline：定理和各题型的期限为 leaf_deadline 秒，超时的定理和练习题被丢弃
+  （介绍、定义、出题规划和总结缺一不可，不设期限）
+- hedge：同样的期限，并对所有子 agent 做 p95 对冲（前 min_samples 次调用用于积累样本）
+
+因超时而失败的章节单独计数，不计入耗时分位数。
+
+用法（在 NoteBookCreator 目录下）：
+    python Benchmark/tailLatency.py --sections 60 --latency 0.05 --slow-rate 0.03 --slow-latency 1.0
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from typing import List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import RunConfig, set_tracing_disabled
+
+from agentDeadline import DeadlineExceeded, DeadlinePolicy, set_deadline_policy
+from sectionPipeline import build_section
+from stubModel import StubModel, StubModelProvider
+
+
+TOPIC = "函数的定义域"
+# 可以缺少的部分
+OPTIONAL_AGENTS = ["theorem", "multiple_choice", "fill_blank", "proof", "short_answer", "code"]
+LEAF_AGENTS = ["introduction", "definition", "plan", "summary", *OPTIONAL_AGENTS]
+
+
+def percentile(values: List[float], q: int) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+async def run(sections: int, concurrency: int, model: StubModel) -> Tuple[List[float], int]:
+    """返回 (成功章节的耗时, 失败的章节数)"""
+    run_config = RunConfig(model_provider=StubModelProvider(model), tracing_disabled=True)
+    semaphore = asyncio.Semaphore(concurrency)
+    durations: List[float] = []
+    failed = 0
+
+    async def one() -> None:
+        nonlocal failed
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await build_section(TOPIC, run_config=run_config)
+            except DeadlineExceeded:
+                failed += 1
+                return
+            durations.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one() for _ in range(sections)))
+    return durations, failed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="章节耗时的长尾对比")
+    parser.add_argument("--sections", type=int, default=60, help="生成的章节数")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时生成的章节数")
+    parser.add_argument("--latency", type=float, default=0.05, help="假模型正常调用的延迟（秒）")
+    parser.add_argument("--slow-rate", type=float, default=0.03, help="长尾调用的比例")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="长尾调用的延迟（秒）")
+    parser.add_argument("--leaf-deadline", type=float, default=0.5, help="每个子 agent 的期限（秒）")
+    parser.add_argument("--min-samples", type=int, default=20, help="开始对冲前每个 agent 需要的样本数")
+    args = parser.parse_args(argv)
+
+    set_tracing_disabled(True)
+    # 丢弃和对冲的日志很多，这里只看汇总
+    logging.getLogger("agentDeadline").setLevel(logging.ERROR)
+    logging.getLogger("sectionPipeline").setLevel(logging.ERROR)
+    logging.getLogger("ExerciseCreator.exercisePlanner").setLevel(logging.ERROR)
+
+    # 只给可以缺少的部分设期限，章节本身不设
+    deadlines = {name: args.leaf_deadline for name in OPTIONAL_AGENTS}
+    policies = {
+        "none": None,
+        "deadline": DeadlinePolicy(deadlines),
+        "hedge": DeadlinePolicy(deadlines, hedge=LEAF_AGENTS, min_samples=args.min_samples),
+    }
+    print(f"{args.sections} 个章节，长尾调用 {args.slow_rate:.0%} × {args.slow_latency}s，正常延迟 {args.latency}s\n")
+    print(f"{'policy':<10}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}{'calls':>8}{'timeouts':>10}{'hedged':>8}{'wins':>6}{'failed':>8}")
+    for name, policy in policies.items():
+        set_deadline_policy(policy)
+        model = StubModel(latency=args.latency, jitter=0.3, slow_rate=args.slow_rate, slow_latency=args.slow_latency)
+        try:
+            durations, failed = asyncio.run(run(args.sections, args.concurrency, model))
+        finally:
+            set_deadline_policy(None)
+        timeouts = sum(policy.timeouts.values()) if policy else 0
+        hedged = sum(policy.hedged.values()) if policy else 0
+        wins = sum(policy.hedge_wins.values()) if policy else 0
+        print(
+            f"{name:<10}{percentile(durations, 50):>8.2f}{percentile(durations, 95):>8.2f}"
+            f"{percentile(durations, 99):>8.2f}{max(durations):>8.2f}{model.calls:>8}{timeouts:>10}{hedged:>8}{wins:>6}{failed:>8}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,8 @@
-from agents import Agent, Runner, AgentOutputSchema
-
 from model import Definition
+from agentRegistry import lazy_agents
 
 
-definition_agent = Agent(
-    name="definition_generator",
-    instructions="""你是一个专业的概念定义生成器。你的任务是生成高质量的概念定义。
+DEFINITION_INSTRUCTIONS = """你是一个专业的概念定义生成器。你的任务是生成高质量的概念定义。
 
 要求：
 1. 定义应该准确、清晰、完整，能够准确描述概念的本质特征
@@ -14,7 +11,18 @@ definition_agent = Agent(
 4. 确保定义与给定的知识点或上下文相关
 
 输出格式必须符合 Definition 模型的要求：
-- definition: 定义内容（必需，字符串格式）""",
-    output_type = AgentOutputSchema(Definition, strict_json_schema=False),
-)
+- definition: 定义内容（必需，字符串格式）"""
+
+
+def build_definition_agent():
+    """构造 definition_agent（由 agentRegistry 在第一次使用时调用）"""
+    from agents import Agent, AgentOutputSchema
+
+    return Agent(
+        name="definition_generator",
+        instructions=DEFINITION_INSTRUCTIONS,
+        output_type=AgentOutputSchema(Definition, strict_json_schema=False),
+    )
+
 
+__getattr__ = lazy_agents(__name__, definition_agent="definition")
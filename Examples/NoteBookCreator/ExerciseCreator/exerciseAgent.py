@@ -1,10 +1,7 @@
-from agents import Agent, Runner, AgentOutputSchema
+from model import BaseExample, MultipleChoiceQuestion, FillBlankQuestion, ProofQuestion, ShortAnswerQuestion, CodeQuestion, ExerciseRefs
+from agentRegistry import get_agent, lazy_agents
 
-from model import BaseExample, MultipleChoiceQuestion, FillBlankQuestion, ProofQuestion, ShortAnswerQuestion, CodeQuestion, ExerciseList
-
-mc_agent = Agent(
-    name="multiple_choice_question_generator",
-    instructions="""你是一个专业的选择题生成器。你的任务是生成高质量的选择题。
+MC_INSTRUCTIONS = """你是一个专业的选择题生成器。你的任务是生成高质量的选择题。
 
 要求：
 1. 题目应该清晰明确，考察学生对知识点的理解
@@ -14,13 +11,20 @@ mc_agent = Agent(
 5. 提供详细的解释，说明为什么正确答案是正确的，以及其他选项为什么是错误的
 6. 确保题目与给定的知识点或上下文相关
 
-输出格式必须符合 MultipleChoiceQuestion 模型的要求。""",
-    output_type = AgentOutputSchema(MultipleChoiceQuestion, strict_json_schema=False),
-)
+输出格式必须符合 MultipleChoiceQuestion 模型的要求。"""
+
+
+def build_mc_agent():
+    """构造 mc_agent（由 agentRegistry 在第一次使用时调用）"""
+    from agents import Agent, AgentOutputSchema
+
+    return Agent(
+        name="multiple_choice_question_generator",
+        instructions=MC_INSTRUCTIONS,
+        output_type=AgentOutputSchema(MultipleChoiceQuestion, strict_json_schema=False),
+    )
 
-fb_agent = Agent(
-    name="fill_blank_question_generator",
-    instructions="""你是一个专业的填空题生成器。你的任务是生成高质量的填空题。
+FB_INSTRUCTIONS = """你是一个专业的填空题生成器。你的任务是生成高质量的填空题。
 
 要求：
 1. 题目应该清晰明确，考察学生对关键概念、定义或公式的记忆和理解
@@ -31,13 +35,20 @@ fb_agent = Agent(
 6. 可以提供可选的解释，说明答案的来源或理由
 7. 确保题目与给定的知识点或上下文相关
 
-输出格式必须符合 FillBlankQuestion 模型的要求，blanks 字典的键必须与题目中的占位符完全匹配。""",
-    output_type = AgentOutputSchema(FillBlankQuestion, strict_json_schema=False),
-)
+输出格式必须符合 FillBlankQuestion 模型的要求，blanks 字典的键必须与题目中的占位符完全匹配。"""
 
-proof_agent = Agent(
-    name="proof_question_generator",
-    instructions="""你是一个专业的证明题生成器。你的任务是生成高质量的证明题。
+
+def build_fb_agent():
+    """构造 fb_agent（由 agentRegistry 在第一次使用时调用）"""
+    from agents import Agent, AgentOutputSchema
+
+    return Agent(
+        name="fill_blank_question_generator",
+        instructions=FB_INSTRUCTIONS,
+        output_type=AgentOutputSchema(FillBlankQuestion, strict_json_schema=False),
+    )
+
+PROOF_INSTRUCTIONS = """你是一个专业的证明题生成器。你的任务是生成高质量的证明题。
 
 要求：
 1. 题目应该明确要求证明的命题或定理
@@ -48,13 +59,20 @@ proof_agent = Agent(
 6. 对于复杂的证明，可以分步骤或分情况讨论
 7. 确保证明过程与给定的知识点或上下文相关
 
-输出格式必须符合 ProofQuestion 模型的要求。""",
-    output_type = AgentOutputSchema(ProofQuestion, strict_json_schema=False),
-)
+输出格式必须符合 ProofQuestion 模型的要求。"""
+
 
-sa_agent = Agent(
-    name="short_answer_question_generator",
-    instructions="""你是一个专业的简答题生成器。你的任务是生成高质量的简答题。
+def build_proof_agent():
+    """构造 proof_agent（由 agentRegistry 在第一次使用时调用）"""
+    from agents import Agent, AgentOutputSchema
+
+    return Agent(
+        name="proof_question_generator",
+        instructions=PROOF_INSTRUCTIONS,
+        output_type=AgentOutputSchema(ProofQuestion, strict_json_schema=False),
+    )
+
+SA_INSTRUCTIONS = """你是一个专业的简答题生成器。你的任务是生成高质量的简答题。
 
 要求：
 1. 题目应该清晰明确，考察学生对知识点的理解和应用
@@ -64,14 +82,21 @@ sa_agent = Agent(
 5. 题目应该鼓励学生进行思考和总结，而不是简单的记忆
 6. 确保题目与给定的知识点或上下文相关
 
-输出格式必须符合 ShortAnswerQuestion 模型的要求。""",
-    output_type = AgentOutputSchema(ShortAnswerQuestion, strict_json_schema=False),
-)
+输出格式必须符合 ShortAnswerQuestion 模型的要求。"""
+
+
+def build_sa_agent():
+    """构造 sa_agent（由 agentRegistry 在第一次使用时调用）"""
+    from agents import Agent, AgentOutputSchema
 
+    return Agent(
+        name="short_answer_question_generator",
+        instructions=SA_INSTRUCTIONS,
+        output_type=AgentOutputSchema(ShortAnswerQuestion, strict_json_schema=False),
+    )
 
-code_agent = Agent(
-    name="code_question_generator",
-    instructions="""你是一个专业的代码题生成器。你的任务是生成高质量的编程题目。
+
+CODE_INSTRUCTIONS = """你是一个专业的代码题生成器。你的任务是生成高质量的编程题目。
 
 要求：
 1. 题目应该清晰明确，描述需要实现的编程任务或解决的问题
@@ -81,20 +106,29 @@ code_agent = Agent(
 5. 代码应该处理边界情况和错误情况
 6. 可以提供可选的解释，说明解题思路、算法复杂度等
 7. 确保题目与给定的知识点或上下文相关
+8. 如果没有指定编程语言，使用 Python；code_answer 只包含代码本身，不要加 Markdown 代码块标记
+9. code_answer 应该可以直接运行：不要在顶层读取输入，示例调用放在 if __name__ == "__main__": 中
+
+输出格式必须符合 CodeQuestion 模型的要求。"""
+
+
+def build_code_agent():
+    """构造 code_agent（由 agentRegistry 在第一次使用时调用）"""
+    from agents import Agent, AgentOutputSchema
 
-输出格式必须符合 CodeQuestion 模型的要求。""",
-    output_type = AgentOutputSchema(CodeQuestion, strict_json_schema=False),
-)
+    return Agent(
+        name="code_question_generator",
+        instructions=CODE_INSTRUCTIONS,
+        output_type=AgentOutputSchema(CodeQuestion, strict_json_schema=False),
+    )
 
 
-exercise_agent = Agent(
-    name="exercise_generator",
-    instructions="""你是一个专业的练习题生成器。你的任务是根据给定的知识点和上下文，生成合适的练习题。
+EXERCISE_INSTRUCTIONS = """你是一个专业的练习题生成器。你的任务是根据给定的知识点和上下文，生成合适的练习题。
 
                     重要提示：
                     - 当你调用工具函数（如 generate_multiple_choice_question, generate_fill_blank_question 等）时，这些工具已经返回了完整的题目对象
-                    - 你不需要重新生成或格式化这些题目，只需要直接使用工具返回的结果
-                    - 将所有工具调用的结果直接收集到 exercises 列表中即可
+                    - 这些题目已经被记录下来，每道题目都带有 id
+                    - 最终输出只需要按顺序列出题目的 id，不要复制题目内容，程序会根据 id 组装完整的题目列表
 
                     工作流程：
                     1. 分析给定的知识点、概念或上下文
@@ -113,35 +147,70 @@ exercise_agent = Agent(
                     - 如果需要简要回答和解释，生成简答题
                     - 如果需要编程实现，生成代码题
                     5. 根据判断结果，调用相应的工具来生成每道题目
-                    6. 将工具函数返回的题目对象直接添加到 exercises 列表中，不要修改或重新生成
-                    7. 确保题目按照难度递增的顺序排列
+                    6. 把工具返回的每道题目的 id 添加到 exercise_ids 列表中，不要重新写出题目
+                    7. 确保 exercise_ids 按照难度递增的顺序排列
 
                     输出格式：
-                    - 输出必须符合 ExerciseList 模型的要求
-                    - exercises 字段应该是一个列表，包含所有工具调用返回的题目对象
-                    - 直接使用工具返回的对象，不要重新创建或修改它们
-                    - 如果要求生成3-5道题目，必须确保生成3-5道，且难度由浅入深""",
-    output_type = AgentOutputSchema(ExerciseList, strict_json_schema=False),
-    tools=[
-        mc_agent.as_tool(
-            tool_name="generate_multiple_choice_question",
-            tool_description="生成选择题。选择题需要提供多个选项（通常4个）和一个正确答案。",
-        ),
-        fb_agent.as_tool(
-            tool_name="generate_fill_blank_question",
-            tool_description="生成填空题。填空题需要在题目中留空，并提供每个空格的答案。",
-        ),
-        proof_agent.as_tool(
-            tool_name="generate_proof_question",
-            tool_description="生成证明题。证明题需要提供完整的证明步骤和逻辑推理过程。",
-        ),
-        sa_agent.as_tool(
-            tool_name="generate_short_answer_question",
-            tool_description="生成简答题。简答题需要提供简洁的答案和可选的解释说明。",
-        ),
-        code_agent.as_tool(
-            tool_name="generate_code_question",
-            tool_description="生成代码题。代码题需要提供编程相关的题目和完整的代码答案。",
-        ),
-    ],
-)
+                    - 输出必须符合 ExerciseRefs 模型的要求
+                    - exercise_ids 字段应该是一个列表，包含工具调用返回的题目的 id
+                    - 只输出 id，不要重新创建或修改题目
+                    - 如果要求生成3-5道题目，必须确保生成3-5道，且难度由浅入深"""
+
+
+def build_exercise_agent():
+    """构造 exercise_agent（由 agentRegistry 在第一次使用时调用）"""
+    from agents import Agent, AgentOutputSchema
+
+    from agentDeadline import guard_tool
+    from artifactTable import store_output
+
+    return Agent(
+        name="exercise_generator",
+        instructions=EXERCISE_INSTRUCTIONS,
+        output_type=AgentOutputSchema(ExerciseRefs, strict_json_schema=False),
+        tools=[
+            guard_tool(
+                get_agent("multiple_choice").as_tool(
+                    tool_name="generate_multiple_choice_question",
+                    tool_description="生成选择题。选择题需要提供多个选项（通常4个）和一个正确答案。",
+                    custom_output_extractor=store_output,
+                ),
+                "multiple_choice",
+            ),
+            guard_tool(
+                get_agent("fill_blank").as_tool(
+                    tool_name="generate_fill_blank_question",
+                    tool_description="生成填空题。填空题需要在题目中留空，并提供每个空格的答案。",
+                    custom_output_extractor=store_output,
+                ),
+                "fill_blank",
+            ),
+            guard_tool(
+                get_agent("proof").as_tool(
+                    tool_name="generate_proof_question",
+                    tool_description="生成证明题。证明题需要提供完整的证明步骤和逻辑推理过程。",
+                    custom_output_extractor=store_output,
+                ),
+                "proof",
+            ),
+            guard_tool(
+                get_agent("short_answer").as_tool(
+                    tool_name="generate_short_answer_question",
+                    tool_description="生成简答题。简答题需要提供简洁的答案和可选的解释说明。",
+                    custom_output_extractor=store_output,
+                ),
+                "short_answer",
+            ),
+            guard_tool(
+                get_agent("code").as_tool(
+                    tool_name="generate_code_question",
+                    tool_description="生成代码题。代码题需要提供编程相关的题目和完整的代码答案。",
+                    custom_output_extractor=store_output,
+                ),
+                "code",
+            ),
+        ],
+    )
+
+
+__getattr__ = lazy_agents(__name__, mc_agent="multiple_choice", fb_agent="fill_blank", proof_agent="proof", sa_agent="short_answer", code_agent="code", exercise_agent="exercise")
@@ -0,0 +1,241 @@
+"""Exercise planner - 先规划、再并发生成的两阶段出题模式
+
+exercise_agent 每道题都要经过一次编排 LLM 的工具调用，题目之间串行等待。这里改为：
+1. 规划：plan_agent 一次调用输出所有题目的 (题型, 难度) 列表
+2. 生成：所有题目在信号量限制下并发调用对应题型的 agent，按难度顺序组装成 ExerciseList
+
+总耗时约为两次 LLM 调用的延迟。规划的题目数与要求不符时按 fit_slots 调整为要求的数量
+（不足时先重新规划一次）。
+
+超过期限（见 agentDeadline）的题目被丢弃，其余题目照常返回。
+
+传入 validator 时，每道题返回后立即做结构检查（代码题还会在沙箱中运行），
+不通过的题目带着问题说明单独重新生成，不影响同一组的其他题目。
+
+传入 question_index 时，每道新题都会与索引中的已有题目比较，近重复的题目会带着"不要与某题重复"的要求重新生成。
+"""
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from agents import RunConfig
+
+from agentDeadline import DeadlineExceeded
+from agentRegistry import get_agent, lazy_agents
+from agentRunner import run_agent
+from model import ExercisePlan, ExerciseSlot, ExerciseList, Example, QuestionType
+from promptCache import layout_prompt
+from sectionStore import new_id
+
+if TYPE_CHECKING:
+    # questionIndex 依赖 numpy，只在调用方传入索引时才需要导入
+    from questionIndex import QuestionIndex
+    from ExerciseCreator.exerciseValidator import ExerciseValidator
+
+
+logger = logging.getLogger(__name__)
+
+
+# 题型的中文名称，用于拼接子 agent 的输入；生成各题型的 agent 在 agentRegistry 中以题型为名称登记
+QUESTION_TYPE_NAMES: Dict[QuestionType, str] = {
+    "multiple_choice": "选择题",
+    "fill_blank": "填空题",
+    "proof": "证明题",
+    "short_answer": "简答题",
+    "code": "代码题",
+}
+
+
+# 规划的题目不足时补充的题型，依次循环使用（代码题只适用于编程相关的知识点，不用于补充）
+_PAD_TYPES: Tuple[QuestionType, ...] = ("short_answer", "multiple_choice", "fill_blank")
+
+
+PLAN_INSTRUCTIONS = """你是一个专业的出题规划器。你的任务是为给定的知识点规划一组练习题，只需要给出每道题的题型和难度，不需要生成题目内容。
+
+要求：
+1. 按照要求的题目数量规划，如果没有明确说明，默认规划3道
+2. 题目应该由浅入深：level 从 1 开始依次递增，第一道是基础概念题，最后一道是综合应用题
+3. 根据知识点的性质选择题型：
+   - multiple_choice（选择题）：测试对多个选项的理解和区分能力
+   - fill_blank（填空题）：测试对关键概念的记忆
+   - proof（证明题）：需要展示逻辑推理过程，适用于数学等理科知识点
+   - short_answer（简答题）：需要简要回答和解释
+   - code（代码题）：需要编程实现，只用于编程相关的知识点
+4. 尽量包含不同类型的题目
+5. 用 focus 简要说明每道题考察的具体要点，不同题目的要点不要重复
+
+输出格式必须符合 ExercisePlan 模型的要求：
+- slots: 题目列表，每项包含 question_type、level 和 focus"""
+
+
+def build_plan_agent():
+    """构造 plan_agent（由 agentRegistry 在第一次使用时调用）"""
+    from agents import Agent, AgentOutputSchema
+
+    return Agent(
+        name="exercise_planner",
+        instructions=PLAN_INSTRUCTIONS,
+        output_type=AgentOutputSchema(ExercisePlan, strict_json_schema=False),
+    )
+
+
+def _slot_prompt(
+    topic: str,
+    slot: ExerciseSlot,
+    total: int,
+    context: Optional[str],
+    avoid: Optional[List[str]] = None,
+    problems: Optional[List[str]] = None,
+) -> str:
+    """拼接单道题的生成输入；avoid 为需要避免重复的已有题目，problems 为上一次生成的结果未通过检查的原因
+
+    同一组的各道题共享上下文和主题，放在前面；题型、难度等每道题不同的内容放在最后（见 promptCache）。
+    """
+    task = f"为「{topic}」出一组 {total} 道由浅入深的练习题（难度 1 最简单，{total} 最难），每次生成其中一道。"
+    slot_text = f"生成难度为 {slot.level} 的一道{QUESTION_TYPE_NAMES[slot.question_type]}。"
+    if slot.focus:
+        slot_text += f"\n考察要点：{slot.focus}"
+    return layout_prompt(
+        context,
+        task,
+        slot_text,
+        "不要与下面这些已有的题目重复或相似：\n" + "\n".join(f"- {question}" for question in avoid) if avoid else None,
+        "上一次生成的题目没有通过检查，请避免下面的问题：\n" + "\n".join(f"- {problem}" for problem in problems) if problems else None,
+    )
+
+
+def fit_slots(slots: List[ExerciseSlot], count: int) -> List[ExerciseSlot]:
+    """把规划的题目调整为 count 道，按难度排序
+
+    多出的题目按难度均匀选取（保留最简单和最难的题）；不足时在最后补上难度递增的默认题型。
+    """
+    slots = sorted(slots, key=lambda slot: slot.level)
+    if count <= 0:
+        return []
+    if len(slots) > count:
+        if count == 1:
+            return slots[:1]
+        return [slots[round(i * (len(slots) - 1) / (count - 1))] for i in range(count)]
+    level = slots[-1].level if slots else 0
+    for i in range(count - len(slots)):
+        slots.append(ExerciseSlot(question_type=_PAD_TYPES[i % len(_PAD_TYPES)], level=level + i + 1))
+    return slots
+
+
+async def plan_exercises(
+    topic: str,
+    count: int = 3,
+    run_config: Optional[RunConfig] = None,
+) -> ExercisePlan:
+    """第一阶段：规划题目的题型和难度"""
+    return await run_agent(
+        get_agent("plan"),
+        f"为「{topic}」规划{count}道练习题，难度由浅入深，包含不同类型的题目",
+        run_config,
+    )
+
+
+async def generate_exercises(
+    topic: str,
+    count: int = 3,
+    max_concurrency: int = 5,
+    context: Optional[str] = None,
+    run_config: Optional[RunConfig] = None,
+    on_exercise: Optional[Callable[[Example], None]] = None,
+    question_index: Optional["QuestionIndex"] = None,
+    max_attempts: int = 3,
+    validator: Optional["ExerciseValidator"] = None,
+) -> ExerciseList:
+    """两阶段生成练习题：先规划，再在信号量限制下并发生成每道题
+
+    Args:
+        topic: 知识点或上下文
+        count: 题目数量，规划的题目多于或少于这个数量时会被调整
+        max_concurrency: 同时进行的出题调用上限
+        context: 附加到每道题输入中的上下文（如章节定义）
+        run_config: 传给每次 Runner.run 的运行配置
+        on_exercise: 每道题生成完成时的回调（按完成顺序调用，不一定是难度顺序）
+        question_index: 近重复题目索引；通过检查且不重复的题目会加入索引（调用方负责 save），
+            用完 max_attempts 后保留的题目不加入
+        max_attempts: 每道题最多生成的次数（重复和检查不通过共用），用完后保留最后一次的结果
+        validator: 题目检查器；不通过的题目带着问题说明重新生成
+    """
+    plan = await plan_exercises(topic, count, run_config)
+    if len(plan.slots) < count:
+        # 规划的题目不够时重新规划一次，仍然不够时由 fit_slots 补上默认题型
+        logger.warning("Exercise plan for %r has %d of %d slots, planning again", topic, len(plan.slots), count)
+        retry = await plan_exercises(topic, count, run_config)
+        if len(retry.slots) > len(plan.slots):
+            plan = retry
+    elif len(plan.slots) > count:
+        logger.info("Exercise plan for %r has %d slots, keeping %d", topic, len(plan.slots), count)
+    slots = fit_slots(plan.slots, count)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def generate(slot: ExerciseSlot):
+        avoid: List[str] = []
+        problems: List[str] = []
+        # 通过了检查且与索引中的题目不重复，只有这样的题目才加入索引
+        accepted = False
+        async with semaphore:
+            for attempt in range(1, max_attempts + 1):
+                try:
+                    exercise = await run_agent(
+                        get_agent(slot.question_type),
+                        _slot_prompt(topic, slot, len(slots), context, avoid, problems),
+                        run_config,
+                    )
+                except DeadlineExceeded as error:
+                    if attempt == 1:
+                        logger.warning("Dropping %s exercise (level %d): %s", slot.question_type, slot.level, error)
+                        return None
+                    # 重新生成超时时保留上一次的结果，与用完 max_attempts 时相同
+                    logger.warning("Keeping previous %s exercise after regeneration timed out: %s", slot.question_type, error)
+                    break
+                if validator is not None:
+                    problems = await validator.validate(exercise)
+                    if problems:
+                        if attempt == max_attempts:
+                            logger.warning(
+                                "Keeping invalid %s exercise after %d attempts: %s",
+                                slot.question_type, max_attempts, "; ".join(problems),
+                            )
+                            break
+                        logger.info(
+                            "Rejected invalid %s exercise (attempt %d/%d): %s",
+                            slot.question_type, attempt, max_attempts, "; ".join(problems),
+                        )
+                        continue
+                if question_index is None:
+                    break
+                match = question_index.find_duplicate(exercise.question)
+                if match is None:
+                    accepted = True
+                    break
+                if attempt == max_attempts:
+                    logger.warning(
+                        "Keeping near-duplicate question after %d attempts (similarity %.2f): %r",
+                        max_attempts, match.similarity, exercise.question,
+                    )
+                    break
+                logger.info(
+                    "Rejected near-duplicate question (similarity %.2f, attempt %d/%d): %r",
+                    match.similarity, attempt, max_attempts, exercise.question,
+                )
+                avoid.append(match.question)
+        if accepted:
+            # 同一批中后生成的题目也会与先生成的比较；用完次数后保留的无效或近重复题目不加入索引，
+            # 以免之后的题目被要求避开它们
+            exercise.id = exercise.id or new_id("example")
+            question_index.add(exercise.question, exercise.id)
+        if on_exercise is not None:
+            on_exercise(exercise)
+        return exercise
+
+    # gather 按传入顺序返回结果，因此组装后的列表保持难度顺序
+    exercises = await asyncio.gather(*(generate(slot) for slot in slots))
+    return ExerciseList(exercises=[exercise for exercise in exercises if exercise is not None])
+
+
+__getattr__ = lazy_agents(__name__, plan_agent="plan")
@@ -0,0 +1,134 @@
+"""Exercise validator - 出题 agent 返回后立即进行的本地检查
+
+结构检查（纯本地，微秒级）：
+- 所有题型：题干不能为空
+- 选择题：至少两个选项且互不相同；correct_answer 必须对应某个选项（字母标号或选项原文）
+- 填空题：blanks 不能为空，键必须与题干中的占位符（[空1]、blank1 等）一一对应，答案不能为空
+- 证明题 / 简答题：证明或答案不能为空
+- 代码题：code_answer 必须能被解析为 Python 代码（会先去掉 Markdown 代码块标记）
+
+代码题通过结构检查后，再在 CodeSandbox 的受限子进程中实际运行一次，超时、抛出异常或非零退出都视为不通过。
+
+不通过时返回问题列表，exercisePlanner.generate_exercises 只重新生成这一道题，并把问题附加到输入中。
+
+用法：
+    validator = ExerciseValidator(CodeSandbox(max_workers=4, timeout=5))
+    problems = await validator.validate(exercise)
+"""
+
+import ast
+import re
+from collections import defaultdict
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from model import CodeQuestion, FillBlankQuestion, MultipleChoiceQuestion, ProofQuestion, ShortAnswerQuestion
+
+if TYPE_CHECKING:
+    from codeSandbox import CodeSandbox
+
+
+# 题干中的填空占位符：[空1]、【空1】、[blank1]、blank1
+PLACEHOLDER = re.compile(r"\[空\d+\]|【空\d+】|\[blank\d+\]|\bblank\d+\b", re.IGNORECASE)
+# 选项开头的字母标号：A. / A、/ A) / (A) / A：
+_OPTION_LABEL = re.compile(r"^\s*[(（]?([A-Za-z])\s*[.．、:：)）]")
+_CODE_FENCE = re.compile(r"^\s*```[\w+-]*\s*\n(.*?)\n?```\s*$", re.S)
+
+
+def strip_code_fence(code: str) -> str:
+    """去掉包在代码外面的 Markdown 代码块标记"""
+    match = _CODE_FENCE.match(code)
+    return match.group(1) if match else code
+
+
+def _option_label(option: str) -> Optional[str]:
+    match = _OPTION_LABEL.match(option)
+    return match.group(1).upper() if match else None
+
+
+def _check_multiple_choice(exercise: MultipleChoiceQuestion) -> List[str]:
+    problems = []
+    options = [option.strip() for option in exercise.options]
+    if len(options) < 2:
+        problems.append(f"选择题至少需要 2 个选项，实际只有 {len(options)} 个")
+    if len(set(options)) != len(options):
+        problems.append("选项中有重复")
+    answer = exercise.correct_answer.strip()
+    labels = [_option_label(option) for option in options]
+    # 选项没有标号时按顺序对应 A、B、C……
+    labels = [label or chr(ord("A") + i) for i, label in enumerate(labels)]
+    # 正确答案可以是单个字母、带标号的选项或选项原文（带或不带标号）
+    answer_label = _option_label(answer + "." if len(answer) == 1 else answer)
+    texts = options + [_OPTION_LABEL.sub("", option, count=1).strip() for option in options]
+    if answer not in texts and answer_label not in labels:
+        problems.append(f"正确答案 {answer!r} 不对应任何选项（选项标号为 {''.join(labels)}）")
+    return problems
+
+
+def _check_fill_blank(exercise: FillBlankQuestion) -> List[str]:
+    problems = []
+    if not exercise.blanks:
+        return ["填空题的 blanks 为空"]
+    placeholders = PLACEHOLDER.findall(exercise.question)
+    missing = [key for key in exercise.blanks if key not in exercise.question]
+    if missing:
+        problems.append(f"blanks 的键 {missing} 没有出现在题干中")
+    unanswered = [p for p in dict.fromkeys(placeholders) if p not in exercise.blanks]
+    if unanswered:
+        problems.append(f"题干中的占位符 {unanswered} 在 blanks 中没有答案")
+    empty = [key for key, value in exercise.blanks.items() if not value.strip()]
+    if empty:
+        problems.append(f"占位符 {empty} 的答案为空")
+    return problems
+
+
+def _check_code(exercise: CodeQuestion) -> List[str]:
+    code = strip_code_fence(exercise.code_answer)
+    if not code.strip():
+        return ["code_answer 为空"]
+    try:
+        ast.parse(code)
+    except SyntaxError as error:
+        return [f"code_answer 不是合法的 Python 代码：第 {error.lineno} 行 {error.msg}"]
+    return []
+
+
+def check_structure(exercise) -> List[str]:
+    """对一道题做结构检查，返回问题列表（为空表示通过）"""
+    problems = [] if exercise.question.strip() else ["题干为空"]
+    if isinstance(exercise, MultipleChoiceQuestion):
+        problems += _check_multiple_choice(exercise)
+    elif isinstance(exercise, FillBlankQuestion):
+        problems += _check_fill_blank(exercise)
+    elif isinstance(exercise, ProofQuestion):
+        problems += [] if exercise.proof.strip() else ["证明为空"]
+    elif isinstance(exercise, ShortAnswerQuestion):
+        problems += [] if exercise.answer.strip() else ["答案为空"]
+    elif isinstance(exercise, CodeQuestion):
+        problems += _check_code(exercise)
+    return problems
+
+
+class ExerciseValidator:
+    """结构检查加代码题的沙箱运行
+
+    Args:
+        sandbox: 运行代码题答案的沙箱，None 表示只做结构检查
+    """
+
+    def __init__(self, sandbox: Optional["CodeSandbox"] = None):
+        self.sandbox = sandbox
+        self.checked = 0
+        # 题型 -> 不通过的次数
+        self.failures: Dict[str, int] = defaultdict(int)
+
+    async def validate(self, exercise) -> List[str]:
+        """返回问题列表，为空表示通过"""
+        self.checked += 1
+        problems = check_structure(exercise)
+        if not problems and isinstance(exercise, CodeQuestion) and self.sandbox is not None:
+            result = await self.sandbox.run(strip_code_fence(exercise.code_answer))
+            if not result.ok:
+                problems.append(f"code_answer 运行失败：{result.error}")
+        if problems:
+            self.failures[exercise.type] += 1
+        return problems
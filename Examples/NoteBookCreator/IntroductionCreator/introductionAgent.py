@@ -0,0 +1,30 @@
+from model import Introduction
+from agentRegistry import lazy_agents
+
+
+INTRODUCTION_INSTRUCTIONS = """你是一个专业的章节介绍生成器。你的任务是为章节生成标题和介绍。
+
+要求：
+1. 标题应该简洁、准确，直接点明章节的核心知识点
+2. 介绍应该说明本章节要学习的内容、它在学科中的位置以及学习它的意义
+3. 介绍应该简洁明了，通常为一到三段
+4. 不要在介绍中展开定义、定理或练习题，这些内容会由其他部分生成
+5. 确保标题和介绍与给定的知识点或上下文相关
+
+输出格式必须符合 Introduction 模型的要求：
+- section_title: 章节标题（必需，字符串格式）
+- introduction: 章节介绍（必需，字符串格式）"""
+
+
+def build_introduction_agent():
+    """构造 introduction_agent（由 agentRegistry 在第一次使用时调用）"""
+    from agents import Agent, AgentOutputSchema
+
+    return Agent(
+        name="introduction_generator",
+        instructions=INTRODUCTION_INSTRUCTIONS,
+        output_type=AgentOutputSchema(Introduction, strict_json_schema=False),
+    )
+
+
+__getattr__ = lazy_agents(__name__, introduction_agent="introduction")
@@ -1,11 +1,8 @@
-from agents import Agent, Runner, AgentOutputSchema
-
 from model import Summary
+from agentRegistry import lazy_agents
 
 
-summary_agent = Agent(
-    name="summary_generator",
-    instructions="""你是一个专业的章节总结生成器。你的任务是生成高质量的章节总结。
+SUMMARY_INSTRUCTIONS = """你是一个专业的章节总结生成器。你的任务是生成高质量的章节总结。
 
 要求：
 1. 总结应该全面、准确，涵盖章节的核心知识点
@@ -22,7 +19,18 @@ summary_agent = Agent(
 7. 确保总结与给定的章节内容相关
 
 输出格式必须符合 Summary 模型的要求：
-- summary: 总结内容（必需，字符串格式）""",
-    output_type = AgentOutputSchema(Summary, strict_json_schema=False),
-)
+- summary: 总结内容（必需，字符串格式）"""
+
+
+def build_summary_agent():
+    """构造 summary_agent（由 agentRegistry 在第一次使用时调用）"""
+    from agents import Agent, AgentOutputSchema
+
+    return Agent(
+        name="summary_generator",
+        instructions=SUMMARY_INSTRUCTIONS,
+        output_type=AgentOutputSchema(Summary, strict_json_schema=False),
+    )
+
 
+__getattr__ = lazy_agents(__name__, summary_agent="summary")
@@ -1,11 +1,8 @@
-from agents import Agent, Runner, AgentOutputSchema
-
 from model import Theorem
+from agentRegistry import lazy_agents
 
 
-theorem_agent = Agent(
-    name="theorem_generator",
-    instructions="""你是一个专业的定理生成器。你的任务是生成高质量的定理及其证明。
+THEOREM_INSTRUCTIONS = """你是一个专业的定理生成器。你的任务是生成高质量的定理及其证明。
 
 要求：
 1. 定理陈述应该准确、清晰、完整，使用标准的数学符号和术语
@@ -18,7 +15,18 @@ theorem_agent = Agent(
 
 输出格式必须符合 Theorem 模型的要求：
 - theorem: 定理内容（必需）
-- proof: 证明内容（可选，但建议提供）""",
-    output_type = AgentOutputSchema(Theorem, strict_json_schema=False),
-)
+- proof: 证明内容（可选，但建议提供）"""
+
+
+def build_theorem_agent():
+    """构造 theorem_agent（由 agentRegistry 在第一次使用时调用）"""
+    from agents import Agent, AgentOutputSchema
+
+    return Agent(
+        name="theorem_generator",
+        instructions=THEOREM_INSTRUCTIONS,
+        output_type=AgentOutputSchema(Theorem, strict_json_schema=False),
+    )
+
 
+__getattr__ = lazy_agents(__name__, theorem_agent="theorem")
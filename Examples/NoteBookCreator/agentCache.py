@@ -0,0 +1,245 @@
+"""Agent cache - 基于内容寻址的 agent 运行结果持久化缓存
+
+缓存键由以下内容的哈希组成：
+- agent 名称
+- instructions 的哈希
+- output_type 的 JSON Schema
+- 模型名，以及 agent 与 run_config 合并后实际生效的 model settings
+- run_config 中 model provider 的标识（假模型和真实 API 的结果互不混用）
+- 工具集：每个工具的名称、说明和参数 schema；as_tool 包装的子 agent 递归计入它自己的缓存键，
+  因此修改任何一层子 agent 的 instructions 或模型都会使编排 agent 的缓存失效
+- 输入文本
+
+结果以 JSON 形式存入本地 SQLite，读取时用 output_type 重新校验，直接得到 model.py 中的 pydantic 模型。
+淘汰策略：超过 TTL 的条目视为未命中并删除；条目数或总字节数超过上限时按最近访问时间（LRU）淘汰。
+"""
+
+import asyncio
+import dataclasses
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from agents import Agent, ModelProvider, MultiProvider, RunConfig
+from pydantic import TypeAdapter
+
+from artifactTable import assembled_type
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _output_type(agent: Agent) -> Any:
+    """取出 agent 的输出类型（AgentOutputSchema 包装的原始类型），未设置时为纯文本
+
+    编排 agent 输出的引用由 run_agent 组装后才写入缓存，因此缓存的是组装后的类型。
+    """
+    output_type = agent.output_type
+    if output_type is None:
+        return str
+    return assembled_type(getattr(output_type, "output_type", output_type))
+
+
+def _qualname(cls: type) -> str:
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def _provider_identity(provider: Optional[ModelProvider]) -> str:
+    """model provider 的稳定标识：类名，带 OpenAI 客户端时附上 base_url
+
+    只做限流等包装、不改变输出的 provider（如 rateLimit.RateLimitedModelProvider）按内部的 provider 计算。
+    """
+    if provider is None:
+        # 不传 run_config 时 Runner 使用默认的 MultiProvider
+        return _qualname(MultiProvider)
+    while isinstance(getattr(provider, "provider", None), ModelProvider):
+        provider = provider.provider
+    client = getattr(getattr(provider, "openai_provider", provider), "_client", None)
+    base_url = getattr(client, "base_url", None)
+    identity = _qualname(type(provider))
+    return f"{identity}@{base_url}" if base_url is not None else identity
+
+
+def _tool_spec(tool: Any, run_config: Optional[RunConfig]) -> Optional[Dict[str, Any]]:
+    """工具在缓存键中的部分；as_tool 包装的子 agent 无法缓存时返回 None"""
+    spec = {
+        "name": getattr(tool, "name", _qualname(type(tool))),
+        "description": getattr(tool, "description", None),
+        "parameters": getattr(tool, "params_json_schema", None),
+    }
+    # SDK 在 as_tool 返回的工具上记录了被包装的 agent
+    agent = getattr(tool, "_agent_instance", None)
+    if agent is not None:
+        spec["agent"] = _agent_key(agent, run_config)
+        if spec["agent"] is None:
+            return None
+    return spec
+
+
+def _agent_key(agent: Agent, run_config: Optional[RunConfig]) -> Optional[Dict[str, Any]]:
+    """agent 本身（不含输入）在缓存键中的部分；instructions 是动态函数时返回 None"""
+    if agent.instructions is not None and not isinstance(agent.instructions, str):
+        return None
+    tools = [_tool_spec(tool, run_config) for tool in agent.tools]
+    if any(tool is None for tool in tools):
+        return None
+
+    model = run_config.model if run_config is not None and run_config.model is not None else agent.model
+    model_settings = agent.model_settings.resolve(run_config.model_settings if run_config is not None else None)
+    return {
+        "agent": agent.name,
+        "instructions": _sha256(agent.instructions or ""),
+        "output_schema": TypeAdapter(_output_type(agent)).json_schema(),
+        "model": str(model) if model is not None else None,
+        "model_settings": dataclasses.asdict(model_settings),
+        "tools": tools,
+    }
+
+
+def cache_key(agent: Agent, input: str, run_config: Optional[RunConfig] = None) -> Optional[str]:
+    """计算一次 agent 运行的缓存键；agent 或任一层子 agent 的 instructions 是动态函数时无法缓存，返回 None"""
+    parts = _agent_key(agent, run_config)
+    if parts is None:
+        return None
+    parts["provider"] = _provider_identity(run_config.model_provider if run_config is not None else None)
+    parts["input"] = input
+    return _sha256(json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str))
+
+
+class AgentCache:
+    """agent 运行结果的 SQLite 缓存
+
+    Args:
+        path: SQLite 数据库文件路径
+        max_entries: 最多保留的条目数
+        max_bytes: 所有缓存值的总字节数上限
+        ttl: 条目的存活时间（秒），None 表示永不过期
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = "agent_cache.db",
+        max_entries: int = 10000,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: Optional[float] = None,
+    ):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS agent_cache (
+                key TEXT PRIMARY KEY,
+                agent TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_cache_accessed ON agent_cache (accessed_at)")
+        self._conn.commit()
+
+    def _get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM agent_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM agent_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE agent_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return value
+
+    def _set(self, key: str, agent_name: str, value: str) -> None:
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO agent_cache (key, agent, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, agent_name, value, size, now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """删除过期条目，再按 LRU 淘汰直到满足条目数和字节数上限（调用方持有锁）"""
+        if self.ttl is not None:
+            cursor = self._conn.execute("DELETE FROM agent_cache WHERE created_at < ?", (time.time() - self.ttl,))
+            self.evictions += cursor.rowcount
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM agent_cache").fetchone()
+        while count > self.max_entries or total > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT key, size FROM agent_cache ORDER BY accessed_at ASC LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._conn.execute("DELETE FROM agent_cache WHERE key = ?", (row[0],))
+            self.evictions += 1
+            count -= 1
+            total -= row[1]
+
+    async def get(self, agent: Agent, input: str, run_config: Optional[RunConfig] = None) -> Any:
+        """查询缓存，命中时返回反序列化后的 output_type 对象，未命中返回 None"""
+        key = cache_key(agent, input, run_config)
+        if key is None:
+            return None
+        value = await asyncio.to_thread(self._get, key)
+        if value is None:
+            return None
+        return TypeAdapter(_output_type(agent)).validate_json(value)
+
+    async def set(self, agent: Agent, input: str, output: Any, run_config: Optional[RunConfig] = None) -> None:
+        """写入一次 agent 运行的结果"""
+        key = cache_key(agent, input, run_config)
+        if key is None:
+            return
+        value = TypeAdapter(_output_type(agent)).dump_json(output).decode("utf-8")
+        await asyncio.to_thread(self._set, key, agent.name, value)
+
+    def stats(self) -> Dict[str, int]:
+        """返回命中/未命中/淘汰计数以及当前条目数和总字节数"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM agent_cache"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM agent_cache")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,256 @@
+"""Agent deadline - 逐层传递的截止时间、取消和对冲请求
+
+整棵 agent 树中没有任何超时，一次很慢的 proof_agent / code_agent 调用就会拖住整个 section_agent 运行。
+
+截止时间：
+- 截止时间是保存在 contextvar 中的绝对时间。asyncio 任务创建时复制当前 context，
+  因此 section 运行设置的截止时间会自动传到 as_tool 嵌套运行和流水线中并发的子任务
+- DeadlinePolicy.run 为一个 agent 运行设置 min(外层截止时间, 现在 + 本 agent 的期限)，
+  到期时取消进行中的运行（包括其中所有嵌套的子运行），抛出 DeadlineExceeded
+- section_agent / exercise_agent 的工具经过 guard_tool 包装：子 agent 超时时，工具返回一条错误说明，
+  编排 agent 可以在缺少这部分内容的情况下继续；代码驱动流水线则丢弃超时的定理和练习题
+
+对冲请求（hedging）：
+- 对 hedge 中列出的 agent，按名称记录最近的成功耗时；运行超过 p95 仍未完成时，再发起一次相同的运行，
+  取先完成的结果并取消另一个。guard_tool 中的两次尝试各自记录到派生的 ArtifactFork，
+  只有胜出的一次的输出进入运行的 ArtifactTable。只有约 5% 的调用会被对冲，平均成本增加有限，尾延迟则明显降低
+- 样本数少于 min_samples 时还没有可靠的 p95，不做对冲
+
+agent 名称使用 agentRegistry 中的名称（proof、code、section 等）。
+
+用法：
+    from agentDeadline import DeadlinePolicy, set_deadline_policy
+    set_deadline_policy(DeadlinePolicy(
+        deadlines={"section": 300, "proof": 60, "code": 60},
+        default=90,
+        hedge=["proof", "code", "multiple_choice"],
+    ))
+"""
+
+import asyncio
+import copy
+import logging
+import statistics
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Awaitable, Callable, Deque, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+if TYPE_CHECKING:
+    from agents import FunctionTool
+    from artifactTable import ArtifactTable
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 当前运行的截止时间（time.monotonic() 的绝对值），None 表示没有截止时间
+_deadline: ContextVar[Optional[float]] = ContextVar("agent_deadline", default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """agent 运行超过截止时间"""
+
+    def __init__(self, name: str, seconds: float):
+        super().__init__(f"{name} exceeded its deadline after {seconds:.1f}s")
+        self.name = name
+        self.seconds = seconds
+
+
+def remaining() -> Optional[float]:
+    """距当前截止时间的剩余秒数（可能为负），没有截止时间时返回 None"""
+    deadline_at = _deadline.get()
+    return None if deadline_at is None else deadline_at - time.monotonic()
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[Optional[float]]:
+    """在 with 块内把截止时间收紧到 seconds 秒之后（不会放宽外层的截止时间），返回剩余秒数"""
+    current = _deadline.get()
+    if seconds is not None:
+        target = time.monotonic() + seconds
+        current = target if current is None else min(current, target)
+    token = _deadline.set(current)
+    try:
+        yield remaining()
+    finally:
+        _deadline.reset(token)
+
+
+class LatencyTracker:
+    """最近 window 次成功运行的耗时，用于估计对冲阈值
+
+    Args:
+        window: 保留的样本数
+        quantile: 对冲阈值取的分位数
+        min_samples: 样本数达到后才给出阈值
+    """
+
+    def __init__(self, window: int = 200, quantile: float = 0.95, min_samples: int = 20):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.quantile = quantile
+        # statistics.quantiles 至少需要两个样本
+        self.min_samples = max(min_samples, 2)
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def threshold(self) -> Optional[float]:
+        if len(self.samples) < self.min_samples:
+            return None
+        return statistics.quantiles(self.samples, n=100, method="inclusive")[round(self.quantile * 100) - 1]
+
+
+class DeadlinePolicy:
+    """按 agent 名称设置期限，并对指定的 agent 做对冲请求
+
+    Args:
+        deadlines: agent 名称 -> 单次运行的期限（秒）
+        default: 没有单独设置的 agent 的期限，None 表示只受外层截止时间约束
+        hedge: 启用对冲的 agent 名称
+        quantile: 触发对冲的耗时分位数
+        min_samples: 开始对冲前需要的样本数
+        window: 每个 agent 保留的耗时样本数
+    """
+
+    def __init__(
+        self,
+        deadlines: Optional[Dict[str, float]] = None,
+        default: Optional[float] = None,
+        hedge: Iterable[str] = (),
+        quantile: float = 0.95,
+        min_samples: int = 20,
+        window: int = 200,
+    ):
+        self.deadlines = dict(deadlines or {})
+        self.default = default
+        self.hedge = set(hedge)
+        self.trackers: Dict[str, LatencyTracker] = defaultdict(lambda: LatencyTracker(window, quantile, min_samples))
+        # 统计：超时次数、发起的对冲次数、对冲请求先完成的次数
+        self.timeouts: Dict[str, int] = defaultdict(int)
+        self.hedged: Dict[str, int] = defaultdict(int)
+        self.hedge_wins: Dict[str, int] = defaultdict(int)
+
+    def deadline_for(self, name: str) -> Optional[float]:
+        return self.deadlines.get(name, self.default)
+
+    async def run(self, name: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """在 name 的期限内运行 factory() 创建的协程；超时时取消运行并抛出 DeadlineExceeded
+
+        factory 在对冲时会被再调用一次，因此每次调用都要返回一个新的协程。
+        """
+        started = time.monotonic()
+        with deadline(self.deadline_for(name)) as timeout:
+            if timeout is not None and timeout <= 0:
+                # 外层的截止时间已经过了，不再发起运行
+                self.timeouts[name] += 1
+                raise DeadlineExceeded(name, 0.0)
+            try:
+                if name in self.hedge:
+                    result = await self._hedged(name, factory)
+                elif timeout is None:
+                    result = await factory()
+                else:
+                    result = await asyncio.wait_for(factory(), timeout)
+            except asyncio.TimeoutError as error:
+                if isinstance(error, DeadlineExceeded):
+                    raise
+                self.timeouts[name] += 1
+                raise DeadlineExceeded(name, time.monotonic() - started) from None
+        self.trackers[name].add(time.monotonic() - started)
+        return result
+
+    async def _hedged(self, name: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """先发起一次运行，超过 p95 仍未完成时再发起一次，取先成功的结果"""
+        tasks: List[asyncio.Task] = [asyncio.ensure_future(factory())]
+        hedge: Optional[asyncio.Task] = None
+        threshold = self.trackers[name].threshold()
+        error: Optional[BaseException] = None
+        try:
+            if threshold is not None:
+                timeout = remaining()
+                if timeout is None or timeout > threshold:
+                    await asyncio.wait(tasks, timeout=threshold)
+                    if not tasks[0].done():
+                        self.hedged[name] += 1
+                        logger.info("Hedging %s after %.2fs (p95)", name, threshold)
+                        hedge = asyncio.ensure_future(factory())
+                        tasks.append(hedge)
+            while tasks:
+                timeout = remaining()
+                done, _ = await asyncio.wait(
+                    tasks,
+                    timeout=None if timeout is None else max(timeout, 0),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    raise asyncio.TimeoutError
+                for task in done:
+                    tasks.remove(task)
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins[name] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # 取消仍在进行的运行（另一个对冲请求，或超时时的全部请求），并等待它们真正结束
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# run_agent 和 guard_tool 使用的策略；未设置时只执行外层传下来的截止时间
+_policy = DeadlinePolicy()
+
+
+def set_deadline_policy(policy: Optional[DeadlinePolicy]) -> None:
+    """设置全局的期限与对冲策略，传入 None 恢复为不设期限"""
+    global _policy
+    _policy = policy or DeadlinePolicy()
+
+
+def get_deadline_policy() -> DeadlinePolicy:
+    return _policy
+
+
+def guard_tool(tool: "FunctionTool", name: str, run_policy: bool = True) -> "FunctionTool":
+    """让 agent.as_tool 返回的工具遵守 name 的期限和对冲设置
+
+    子 agent 超时时工具返回一条说明而不是抛出异常，编排 agent 可以在缺少这部分结果的情况下继续。
+    工具内部已经通过 agentRunner.run_agent 运行子 agent（期限和对冲在其中执行）时，run_policy 传 False，
+    这里只把超时转换为说明。
+    """
+    from artifactTable import ArtifactTable
+
+    invoke = tool.on_invoke_tool
+
+    async def attempt(context, table: "ArtifactTable", input: str):
+        """一次尝试：记录到从运行的表派生的表中，由调用方在胜出后并入"""
+        fork = table.fork()
+        forked = copy.copy(context)
+        forked.context = fork
+        return await invoke(forked, input), fork
+
+    async def on_invoke_tool(context, input: str):
+        try:
+            if not run_policy:
+                return await invoke(context, input)
+            table = getattr(context, "context", None)
+            if not isinstance(table, ArtifactTable):
+                return await _policy.run(name, lambda: invoke(context, input))
+            # 对冲时两次尝试各用一个派生的表，只有先完成的一次的记录并入运行的表；
+            # 合并之前在最外层的表上标记为进行中，读取整张表的工具（如 generate_summary）会等待
+            with table.root.pending():
+                output, fork = await _policy.run(name, lambda: attempt(context, table, input))
+                fork.merge()
+            return output
+        except DeadlineExceeded as error:
+            logger.warning("Tool %s timed out: %s", tool.name, error)
+            return f"工具 {tool.name} 超时（{error}），没有得到结果。请不要重试，在没有这部分内容的情况下继续。"
+
+    tool.on_invoke_tool = on_invoke_tool
+    return tool
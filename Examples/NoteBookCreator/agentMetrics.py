@@ -0,0 +1,311 @@
+"""Agent metrics - 基于 SDK tracing 的逐 agent / 逐工具耗时、token 与重试统计
+
+MetricsProcessor 是一个 TracingProcessor，通过 SDK 的 tracing 钩子收集每个 span：
+- agent span：每个 agent（包括 as_tool 嵌套运行的子 agent）一次运行的耗时
+- function span：每次工具调用（如 generate_definition、generate_multiple_choice_question）的耗时
+- response / generation span：每次模型调用的输入、输出和缓存 token，归到所属的 agent 上
+- rate_limit_wait / rate_limit_retry 自定义 span（由 rateLimit.RateLimitedModel 发出）：
+  排队等待时间和 429 重试次数，同样归到所属的 agent 上
+
+嵌套的 as_tool 运行和外层运行在同一个 trace 中，通过 parent_id 串成一棵树。
+每个结束的 agent / 工具 span 写一行到 JSONL 文件；write_prometheus 导出 Prometheus 文本格式，
+包括耗时直方图和 token / 重试计数。cache_report 按 agent 汇总缓存命中和未命中的输入 token
+（命中率的含义见 promptCache.py）。
+
+用法：
+    from agents import add_trace_processor
+    metrics = MetricsProcessor("output/metrics.jsonl")
+    add_trace_processor(metrics)
+    ...
+    metrics.write_prometheus("output/metrics.prom")
+"""
+
+import json
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from agents.tracing import (
+    AgentSpanData,
+    CustomSpanData,
+    FunctionSpanData,
+    GenerationSpanData,
+    ResponseSpanData,
+    Span,
+    Trace,
+    TracingProcessor,
+)
+
+from rateLimit import RATE_LIMIT_WAIT, RATE_LIMIT_RETRY
+
+
+# 耗时直方图的桶边界（秒）
+LATENCY_BUCKETS: Tuple[float, ...] = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class _SpanRecord:
+    """一个进行中的 span 的统计信息"""
+
+    __slots__ = (
+        "kind", "name", "parent_id", "trace_id", "started", "queue_time",
+        "input_tokens", "output_tokens", "cached_tokens", "retries", "model_calls",
+    )
+
+    def __init__(self, kind: str, name: str, parent_id: Optional[str], trace_id: str):
+        self.kind = kind
+        self.name = name
+        self.parent_id = parent_id
+        self.trace_id = trace_id
+        self.started = time.monotonic()
+        self.queue_time = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cached_tokens = 0
+        self.retries = 0
+        self.model_calls = 0
+
+
+def _span_kind(span_data: Any) -> Tuple[str, str]:
+    """返回 (类型, 名称)"""
+    if isinstance(span_data, AgentSpanData):
+        return "agent", span_data.name
+    if isinstance(span_data, FunctionSpanData):
+        return "tool", span_data.name
+    if isinstance(span_data, (ResponseSpanData, GenerationSpanData)):
+        return "model", getattr(span_data, "model", None) or "response"
+    if isinstance(span_data, CustomSpanData):
+        return "custom", span_data.name
+    return "other", getattr(span_data, "type", "other")
+
+
+def _usage(span_data: Any) -> Tuple[int, int, int]:
+    """从 response / generation span 中取出 (输入, 输出, 缓存) token 数"""
+    if isinstance(span_data, ResponseSpanData):
+        usage = getattr(span_data.response, "usage", None)
+        if usage is None:
+            return 0, 0, 0
+        details = getattr(usage, "input_tokens_details", None)
+        return usage.input_tokens or 0, usage.output_tokens or 0, getattr(details, "cached_tokens", 0) or 0
+    usage = span_data.usage or {}
+    details = usage.get("input_tokens_details") or {}
+    return usage.get("input_tokens", 0) or 0, usage.get("output_tokens", 0) or 0, details.get("cached_tokens", 0) or 0
+
+
+def format_cache_report(report: Dict[str, Dict[str, Any]]) -> str:
+    """把 MetricsProcessor.cache_report 的结果格式化为表格，最后一行为合计"""
+    lines: List[str] = [f"{'agent':<36}{'input':>10}{'cached':>10}{'uncached':>10}{'hit rate':>10}"]
+    totals = {"input": 0, "cached": 0, "uncached": 0}
+    for name, row in report.items():
+        lines.append(f"{name:<36}{row['input']:>10}{row['cached']:>10}{row['uncached']:>10}{row['hit_rate']:>10.1%}")
+        for field in totals:
+            totals[field] += row[field]
+    hit_rate = totals["cached"] / totals["input"] if totals["input"] else 0.0
+    lines.append(f"{'total':<36}{totals['input']:>10}{totals['cached']:>10}{totals['uncached']:>10}{hit_rate:>10.1%}")
+    return "\n".join(lines)
+
+
+class _Histogram:
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+
+
+class MetricsProcessor(TracingProcessor):
+    """把 agent 和工具 span 的耗时、排队时间、token 与重试导出为 JSONL 和 Prometheus 指标
+
+    Args:
+        jsonl_path: 逐 span 记录的 JSONL 文件路径，None 表示不写文件
+    """
+
+    def __init__(self, jsonl_path: Optional[Union[str, Path]] = None):
+        self.jsonl_path = Path(jsonl_path) if jsonl_path is not None else None
+        self._lock = threading.Lock()
+        self._spans: Dict[str, _SpanRecord] = {}
+        self._file = None
+        if self.jsonl_path is not None:
+            self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.jsonl_path, "a", encoding="utf-8")
+
+        # (类型, 名称) -> 累计指标
+        self.histograms: Dict[Tuple[str, str], _Histogram] = defaultdict(_Histogram)
+        self.tokens: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self.retries: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.queue_seconds: Dict[Tuple[str, str], float] = defaultdict(float)
+        self.errors: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    def _owner(self, parent_id: Optional[str]) -> Optional[_SpanRecord]:
+        """沿 parent_id 向上找到最近的 agent span"""
+        while parent_id is not None:
+            record = self._spans.get(parent_id)
+            if record is None:
+                return None
+            if record.kind == "agent":
+                return record
+            parent_id = record.parent_id
+        return None
+
+    def on_trace_start(self, trace: Trace) -> None:
+        pass
+
+    def on_trace_end(self, trace: Trace) -> None:
+        # 正常情况下 span 结束时已经移除，这里清理异常中断留下的记录
+        with self._lock:
+            for span_id in [key for key, record in self._spans.items() if record.trace_id == trace.trace_id]:
+                del self._spans[span_id]
+
+    def on_span_start(self, span: Span[Any]) -> None:
+        kind, name = _span_kind(span.span_data)
+        with self._lock:
+            self._spans[span.span_id] = _SpanRecord(kind, name, span.parent_id, span.trace_id)
+
+    def on_span_end(self, span: Span[Any]) -> None:
+        with self._lock:
+            record = self._spans.pop(span.span_id, None)
+            if record is None:
+                return
+            wall_time = time.monotonic() - record.started
+            owner = self._owner(record.parent_id)
+
+            if record.kind == "model":
+                input_tokens, output_tokens, cached_tokens = _usage(span.span_data)
+                if owner is not None:
+                    owner.input_tokens += input_tokens
+                    owner.output_tokens += output_tokens
+                    owner.cached_tokens += cached_tokens
+                    owner.model_calls += 1
+                return
+            if record.kind == "custom":
+                if owner is not None and record.name == RATE_LIMIT_WAIT:
+                    owner.queue_time += wall_time
+                elif owner is not None and record.name == RATE_LIMIT_RETRY:
+                    owner.retries += 1
+                return
+            if record.kind not in ("agent", "tool"):
+                return
+
+            key = (record.kind, record.name)
+            self.histograms[key].observe(wall_time)
+            self.queue_seconds[key] += record.queue_time
+            self.retries[key] += record.retries
+            self.tokens[key + ("input",)] += record.input_tokens
+            self.tokens[key + ("output",)] += record.output_tokens
+            self.tokens[key + ("cached",)] += record.cached_tokens
+            if span.error is not None:
+                self.errors[key] += 1
+
+            if self._file is not None:
+                self._file.write(json.dumps({
+                    "trace_id": record.trace_id,
+                    "span_id": span.span_id,
+                    "parent_id": record.parent_id,
+                    "agent": owner.name if owner is not None else None,
+                    "kind": record.kind,
+                    "name": record.name,
+                    "started_at": span.started_at,
+                    "wall_time": round(wall_time, 6),
+                    "queue_time": round(record.queue_time, 6),
+                    "model_calls": record.model_calls,
+                    "input_tokens": record.input_tokens,
+                    "output_tokens": record.output_tokens,
+                    "cached_tokens": record.cached_tokens,
+                    "retries": record.retries,
+                    "error": span.error["message"] if span.error else None,
+                }, ensure_ascii=False) + "\n")
+
+    def cache_report(self) -> Dict[str, Dict[str, Any]]:
+        """按 agent 汇总前缀缓存：agent 名称 -> {input, cached, uncached, hit_rate}
+
+        只统计 agent 自己的模型调用，as_tool 子 agent 的调用归到子 agent 上。
+        """
+        report = {}
+        with self._lock:
+            for (kind, name, token_type), count in self.tokens.items():
+                if kind != "agent" or token_type != "input":
+                    continue
+                cached = self.tokens.get((kind, name, "cached"), 0)
+                report[name] = {
+                    "input": count,
+                    "cached": cached,
+                    "uncached": count - cached,
+                    "hit_rate": cached / count if count else 0.0,
+                }
+        return dict(sorted(report.items()))
+
+    def prometheus_text(self) -> str:
+        """生成 Prometheus 文本格式的指标"""
+        lines = [
+            "# HELP notebook_span_seconds Wall time of agent runs and tool calls.",
+            "# TYPE notebook_span_seconds histogram",
+        ]
+        with self._lock:
+            for (kind, name), histogram in sorted(self.histograms.items()):
+                labels = f'kind="{kind}",name="{name}"'
+                for bound, count in zip(LATENCY_BUCKETS, histogram.buckets):
+                    lines.append(f'notebook_span_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'notebook_span_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"notebook_span_seconds_sum{{{labels}}} {histogram.total:.6f}")
+                lines.append(f"notebook_span_seconds_count{{{labels}}} {histogram.count}")
+
+            lines += [
+                "# HELP notebook_queue_seconds_total Time spent waiting for rate limit capacity.",
+                "# TYPE notebook_queue_seconds_total counter",
+            ]
+            for (kind, name), seconds in sorted(self.queue_seconds.items()):
+                lines.append(f'notebook_queue_seconds_total{{kind="{kind}",name="{name}"}} {seconds:.6f}')
+
+            lines += [
+                "# HELP notebook_tokens_total Model tokens attributed to each agent run.",
+                "# TYPE notebook_tokens_total counter",
+            ]
+            for (kind, name, token_type), count in sorted(self.tokens.items()):
+                lines.append(f'notebook_tokens_total{{kind="{kind}",name="{name}",type="{token_type}"}} {count}')
+
+            lines += [
+                "# HELP notebook_retries_total Rate limit retries attributed to each agent run.",
+                "# TYPE notebook_retries_total counter",
+            ]
+            for (kind, name), count in sorted(self.retries.items()):
+                lines.append(f'notebook_retries_total{{kind="{kind}",name="{name}"}} {count}')
+
+            lines += [
+                "# HELP notebook_errors_total Agent runs and tool calls that ended with an error.",
+                "# TYPE notebook_errors_total counter",
+            ]
+            for (kind, name), count in sorted(self.errors.items()):
+                lines.append(f'notebook_errors_total{{kind="{kind}",name="{name}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write_cache_report(self, path: Union[str, Path]) -> None:
+        """把 cache_report 写成 JSON 文件"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.cache_report(), ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def write_prometheus(self, path: Union[str, Path]) -> None:
+        """把 Prometheus 指标写入文件（可供 node_exporter 的 textfile collector 读取）"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(self.prometheus_text(), encoding="utf-8")
+        tmp_path.replace(path)
+
+    def force_flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,149 @@
+"""Agent registry - 按名称懒加载子 agent
+
+导入 agents SDK 本身就要 2 秒左右，构造 Agent 时 AgentOutputSchema 还会为每个输出模型生成 JSON schema，
+section_agent 又要为每个子 agent 构造 as_tool 包装。以前这些都在导入模块时完成，
+只用到 model / sectionStore / sectionExport 的短生命周期工作进程也要付出这部分开销。
+
+这里登记每个 agent 的工厂函数（"模块:函数"），get_agent 第一次被调用时才导入模块、构造 agent 并缓存，
+之后返回同一个对象。各 agent 模块通过 lazy_agents 定义模块级 __getattr__，
+原有的 `from DefinitionCreator.definationAgent import definition_agent` 写法保持可用，
+只是 agent 在第一次访问这个名字时才构造。
+
+set_model_router 设置路由后，get_agent 构造的每个 agent 都使用 router.model_for(名称) 作为模型，
+按 agent 选择模型档位（见 modelRouting）。get_agent 还会给结构化输出套上本地修复层（见 outputRepair），
+并为每个 agent 设置固定的 prompt_cache_key（见 promptCache）。
+
+用法：
+    from agentRegistry import get_agent
+    result = await Runner.run(get_agent("definition"), "生成函数定义域的定义")
+"""
+
+import importlib
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Union
+
+if TYPE_CHECKING:
+    from agents import Agent
+    from modelRouting import ModelRouter
+
+
+# 名称 -> 工厂函数，或 "模块:函数" 形式的引用（导入推迟到第一次使用）
+_FACTORIES: Dict[str, Union[str, Callable[[], "Agent"]]] = {
+    "introduction": "IntroductionCreator.introductionAgent:build_introduction_agent",
+    "definition": "DefinitionCreator.definationAgent:build_definition_agent",
+    "theorem": "TheoremCreator.theoremAgent:build_theorem_agent",
+    "summary": "SummaryCreator.summaryAgent:build_summary_agent",
+    "exercise": "ExerciseCreator.exerciseAgent:build_exercise_agent",
+    "multiple_choice": "ExerciseCreator.exerciseAgent:build_mc_agent",
+    "fill_blank": "ExerciseCreator.exerciseAgent:build_fb_agent",
+    "proof": "ExerciseCreator.exerciseAgent:build_proof_agent",
+    "short_answer": "ExerciseCreator.exerciseAgent:build_sa_agent",
+    "code": "ExerciseCreator.exerciseAgent:build_code_agent",
+    "plan": "ExerciseCreator.exercisePlanner:build_plan_agent",
+    "section": "sectionAgent:build_section_agent",
+    "chapter_plan": "chapterPipeline:build_chapter_plan_agent",
+}
+
+_agents: Dict[str, "Agent"] = {}
+# get_agent 把注册表中的名称记在 agent 的这个属性上，供 run_agent 按名称查找期限等设置；
+# 记在 agent 自身上，注册表丢弃已构造的 agent 之后，调用方仍然持有的旧 agent 也能查到名称
+_NAME_ATTRIBUTE = "_registry_name"
+_router: Optional["ModelRouter"] = None
+_repair = True
+_prompt_cache_key = True
+# section_agent 的工厂函数会递归调用 get_agent，因此用可重入锁
+_lock = threading.RLock()
+
+
+def register_agent(name: str, factory: Union[str, Callable[[], "Agent"]]) -> None:
+    """登记（或替换）一个 agent 的工厂函数；已构造的同名 agent 会被丢弃"""
+    with _lock:
+        _FACTORIES[name] = factory
+        _agents.pop(name, None)
+
+
+def set_model_router(router: Optional["ModelRouter"]) -> None:
+    """设置（或用 None 取消）模型路由；已构造的 agent 全部丢弃，下次 get_agent 时按新路由重新构造"""
+    global _router
+    with _lock:
+        _router = router
+        _agents.clear()
+
+
+def set_output_repair(enabled: bool) -> None:
+    """打开或关闭输出修复层；已构造的 agent 全部丢弃，下次 get_agent 时重新构造"""
+    global _repair
+    with _lock:
+        _repair = enabled
+        _agents.clear()
+
+
+def set_prompt_cache_key(enabled: bool) -> None:
+    """打开或关闭固定的 prompt_cache_key（服务器不接受这个参数时关闭）；已构造的 agent 全部丢弃"""
+    global _prompt_cache_key
+    with _lock:
+        _prompt_cache_key = enabled
+        _agents.clear()
+
+
+def agent_names() -> List[str]:
+    return sorted(_FACTORIES)
+
+
+def _resolve(factory: Union[str, Callable[[], "Agent"]]) -> Callable[[], "Agent"]:
+    if callable(factory):
+        return factory
+    module_name, _, attribute = factory.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def get_agent(name: str) -> "Agent":
+    """返回名为 name 的 agent，第一次调用时构造"""
+    agent = _agents.get(name)
+    if agent is not None:
+        return agent
+    with _lock:
+        if name not in _agents:
+            if name not in _FACTORIES:
+                raise KeyError(f"Unknown agent {name!r}, expected one of {agent_names()}")
+            agent = _resolve(_FACTORIES[name])()
+            if _router is not None:
+                agent.model = _router.model_for(name)
+            if _repair:
+                # 构造 agent 时已经导入了 agents SDK，这里导入不会增加额外开销
+                from outputRepair import with_output_repair
+                with_output_repair(agent, name)
+            if _prompt_cache_key:
+                # 在修复层之后设置，key 中的前缀哈希与实际发送的 schema 一致
+                from promptCache import with_prompt_cache_key
+                with_prompt_cache_key(agent, name)
+            _agents[name] = agent
+            setattr(agent, _NAME_ATTRIBUTE, name)
+        return _agents[name]
+
+
+def registry_name(agent: "Agent") -> Optional[str]:
+    """get_agent 返回的 agent 在注册表中的名称（包括之后被注册表丢弃的 agent）；
+    不是由注册表构造的 agent（包括它们 clone 出的 agent）返回 None"""
+    return getattr(agent, _NAME_ATTRIBUTE, None)
+
+
+def output_schema(name: str) -> Dict[str, Any]:
+    """agent 输出类型的 JSON schema（随 agent 一起构造和缓存）"""
+    output_type = get_agent(name).output_type
+    return output_type.json_schema() if output_type is not None else {}
+
+
+def lazy_agents(module_name: str, **attributes: str) -> Callable[[str], Any]:
+    """为 agent 模块生成模块级 __getattr__：访问属性时从注册表取出对应的 agent
+
+    Args:
+        module_name: 模块的 __name__，用于错误信息
+        attributes: 属性名 -> 注册表中的名称，如 definition_agent="definition"
+    """
+    def __getattr__(attribute: str) -> Any:
+        if attribute in attributes:
+            return get_agent(attributes[attribute])
+        raise AttributeError(f"module {module_name!r} has no attribute {attribute!r}")
+
+    return __getattr__
@@ -0,0 +1,75 @@
+"""Agent runner - 代码驱动流水线共用的子 agent 调用入口"""
+
+from typing import Optional
+
+from agents import Agent, Runner, RunConfig
+from agents.exceptions import ModelBehaviorError
+
+from agentCache import AgentCache
+from agentDeadline import get_deadline_policy
+from agentRegistry import registry_name
+from artifactTable import assemble, new_context
+from outputRepair import repair_stats
+
+
+# 默认缓存，设置后所有经过 run_agent 的调用都会先查缓存
+_default_cache: Optional[AgentCache] = None
+
+
+def set_default_cache(cache: Optional[AgentCache]) -> None:
+    """设置 run_agent 使用的默认缓存，传入 None 关闭缓存"""
+    global _default_cache
+    _default_cache = cache
+
+
+async def run_agent(
+    agent: Agent,
+    input: str,
+    run_config: Optional[RunConfig] = None,
+    cache: Optional[AgentCache] = None,
+    reasks: int = 1,
+):
+    """运行单个子 agent，返回其 final_output
+
+    每次运行（包括对冲和重新请求）以一个新的 ArtifactTable 作为上下文（new_context）；
+    编排 agent 输出的 SectionRefs / ExerciseRefs 在这里组装成完整的 Section / ExerciseList（见 artifactTable）。
+    运行受 agentDeadline 的期限和对冲策略约束（按注册表中的名称查找），超时抛出 DeadlineExceeded。
+    输出经过本地修复（outputRepair）仍然不合法时，带着错误信息重新请求，最多 reasks 次。
+
+    Args:
+        agent: 要运行的 agent
+        input: 输入文本
+        run_config: 传给 Runner.run 的运行配置
+        cache: 结果缓存，未指定时使用 set_default_cache 设置的默认缓存
+        reasks: 输出不合法时重新请求的次数
+    """
+    cache = cache or _default_cache
+    if cache is not None:
+        cached = await cache.get(agent, input, run_config)
+        if cached is not None:
+            return cached
+
+    name = registry_name(agent) or agent.name
+    prompt = input
+    for attempt in range(reasks + 1):
+        try:
+            result = await get_deadline_policy().run(
+                name,
+                lambda: Runner.run(
+                    agent, prompt, context=new_context(agent.output_type, run_config), run_config=run_config,
+                ),
+            )
+            output = assemble(result.final_output, result.context_wrapper.context)
+            break
+        except ModelBehaviorError as error:
+            if attempt == reasks:
+                raise
+            repair_stats.reasked[name] += 1
+            prompt = (
+                f"{input}\n\n上一次的输出无法解析为要求的格式：{str(error)[:300]}\n"
+                "请只输出一个符合 schema 的 JSON 对象，不要附加任何说明文字。"
+            )
+
+    if cache is not None:
+        await cache.set(agent, input, output, run_config)
+    return output
@@ -0,0 +1,247 @@
+"""Artifact table - 编排 agent 按 ID 引用子 agent 的输出，由代码组装最终结果
+
+以前 section_agent 和 exercise_agent 要求编排 LLM "直接使用工具返回的对象"，
+也就是把每个定义、证明和练习题原样重新写进最终的 Section / ExerciseList JSON：
+这些内容的输出 token 要付两次，这也是每次运行中最慢的一步，而且重写的内容可能与原文不一致。
+
+这里改为按引用传递：
+- 每次运行以一个 ArtifactTable 作为运行上下文（as_tool 的子运行共用同一个上下文）
+- 子 agent 工具的输出由 store_output 记录到表中，并按 model.py 中的 ID 字段分配 ID
+  （定理和题目的 id、definition_id、summary_id），工具返回带 ID 的对象 JSON
+- 编排 agent 只输出 SectionRefs / ExerciseRefs：自己撰写的标题和介绍，加上按顺序排列的 ID
+- assemble 在本地从表中取出对象，组装成完整的 Section / ExerciseList
+
+编排 agent 必须带着 ArtifactTable 上下文运行，agentRunner.run_agent 会自动创建（new_context）并在结束后组装。
+表中带有这次运行的 run_config，在工具中运行嵌套 agent（如 sectionDigest.generate_summary）时沿用它。
+对冲的工具调用（agentDeadline.guard_tool）每次尝试记录到各自的 ArtifactFork 中，只有胜出的一次并入运行的表。
+
+用法：
+    from agentRunner import run_agent
+    section = await run_agent(get_agent("section"), "创建一个关于函数定义域的章节")
+"""
+
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type, TypeVar
+
+from agents import RunConfig
+from agents.exceptions import ModelBehaviorError
+from pydantic import BaseModel
+
+from model import BaseExample, Definition, ExerciseList, ExerciseRefs, Section, SectionRefs, Summary, Theorem
+from sectionStore import new_id
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=BaseModel)
+
+# 模型类型 -> (作为引用键的 ID 字段, 新 ID 的前缀)，前缀与 sectionStore.assign_ids 一致
+_KEY_FIELDS: Dict[Type[BaseModel], Tuple[str, str]] = {
+    Definition: ("definition_id", "definition"),
+    Theorem: ("id", "theorem"),
+    BaseExample: ("id", "example"),
+    Summary: ("summary_id", "summary"),
+}
+
+
+def _key_field(value: BaseModel) -> Optional[Tuple[str, str]]:
+    for cls, key in _KEY_FIELDS.items():
+        if isinstance(value, cls):
+            return key
+    return None
+
+
+class ArtifactTable:
+    """一次运行中子 agent 输出的表：ID -> 模型对象（按记录顺序）
+
+    Args:
+        run_config: 这次运行的运行配置，工具中的嵌套运行沿用它
+    """
+
+    def __init__(self, run_config: Optional[RunConfig] = None):
+        self.run_config = run_config
+        self._items: Dict[str, BaseModel] = {}
+        # 正在进行的工具调用数；_idle 在第一次 settled 时创建
+        self._pending = 0
+        self._idle: Optional[asyncio.Event] = None
+
+    def __contains__(self, id: str) -> bool:
+        return id in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def root(self) -> "ArtifactTable":
+        """运行上下文中最外层的表（对 ArtifactFork 而言是派生它的表）"""
+        return self
+
+    def fork(self) -> "ArtifactFork":
+        """派生一个暂存记录的表，见 ArtifactFork"""
+        return ArtifactFork(self)
+
+    @contextmanager
+    def pending(self) -> Iterator[None]:
+        """标记一次正在进行、结束后会记录到表中的工具调用（见 agentDeadline.guard_tool）"""
+        self._pending += 1
+        if self._idle is not None:
+            self._idle.clear()
+        try:
+            yield
+        finally:
+            self._pending -= 1
+            if self._pending == 0 and self._idle is not None:
+                self._idle.set()
+
+    async def settled(self) -> None:
+        """等待所有 pending 的工具调用结束，例如编排 agent 在同一轮中并行调用的其他工具"""
+        if self._pending == 0:
+            return
+        if self._idle is None:
+            self._idle = asyncio.Event()
+        await self._idle.wait()
+
+    def put(self, value: BaseModel) -> str:
+        """记录一个对象并返回它的 ID；ID 为空或与表中另一个对象冲突时分配新的 ID（原地修改）"""
+        field, prefix = _key_field(value)
+        id = getattr(value, field)
+        if id is None or self._items.get(id, value) is not value:
+            id = new_id(prefix)
+            setattr(value, field, id)
+        self._items[id] = value
+        return id
+
+    def record(self, value: Any) -> Any:
+        """记录子 agent 的输出（ExerciseList 中的题目逐个记录），返回原对象"""
+        if isinstance(value, ExerciseList):
+            for exercise in value.exercises:
+                self.put(exercise)
+        elif isinstance(value, BaseModel) and _key_field(value) is not None:
+            self.put(value)
+        return value
+
+    def get(self, id: str, cls: Type[T]) -> Optional[T]:
+        value = self._items.get(id)
+        return value if isinstance(value, cls) else None
+
+    def of_type(self, cls: Type[T]) -> List[T]:
+        """表中所有 cls 类型的对象，按记录顺序"""
+        return [value for value in self._items.values() if isinstance(value, cls)]
+
+    def resolve(self, ids: List[str], cls: Type[T]) -> List[T]:
+        """按顺序取出 ids 引用的对象；不存在、类型不符或重复的 ID 记录警告后跳过"""
+        values, seen = [], set()
+        for id in ids:
+            value = self.get(id, cls)
+            if value is None or id in seen:
+                logger.warning("Skipping unknown or repeated %s reference %r", cls.__name__, id)
+                continue
+            seen.add(id)
+            values.append(value)
+        return values
+
+    def resolve_one(self, id: str, cls: Type[T]) -> T:
+        """取出 id 引用的对象；引用无效时退回表中最后记录的同类对象，表中没有时抛出 ModelBehaviorError"""
+        value = self.get(id, cls)
+        if value is None:
+            recorded = self.of_type(cls)
+            if not recorded:
+                raise ModelBehaviorError(f"{cls.__name__} reference {id!r} does not match any tool output")
+            logger.warning("Unknown %s reference %r, using the last one recorded", cls.__name__, id)
+            value = recorded[-1]
+        return value
+
+
+class ArtifactFork(ArtifactTable):
+    """一次工具调用尝试使用的表：记录先暂存在这里，merge 时按记录顺序并入派生它的表
+
+    对冲请求会同时运行同一个工具两次，两次都使用原来的表时，落败的一次也可能留下记录。
+    每次尝试使用各自的 ArtifactFork，只对胜出的一次调用 merge。
+    """
+
+    def __init__(self, parent: ArtifactTable):
+        super().__init__(parent.run_config)
+        self.parent = parent
+        self._recorded: List[Any] = []
+
+    @property
+    def root(self) -> ArtifactTable:
+        return self.parent.root
+
+    def record(self, value: Any) -> Any:
+        value = super().record(value)
+        self._recorded.append(value)
+        return value
+
+    def merge(self) -> None:
+        """把暂存的记录依次交给上层表的 record（上层表的子类可以据此更新自己的状态）"""
+        for value in self._recorded:
+            self.parent.record(value)
+        self._recorded = []
+
+
+def assemble_exercises(refs: ExerciseRefs, table: ArtifactTable) -> ExerciseList:
+    return ExerciseList(exercises=table.resolve(refs.exercise_ids, BaseExample))
+
+
+def assemble_section(refs: SectionRefs, table: ArtifactTable) -> Section:
+    definition = table.resolve_one(refs.definition_id, Definition)
+    summary = table.resolve_one(refs.summary_id, Summary)
+    return Section(
+        section_title=refs.section_title,
+        introduction=refs.introduction,
+        definition=definition.definition,
+        definition_id=definition.definition_id,
+        theorems=table.resolve(refs.theorem_ids, Theorem),
+        examples=table.resolve(refs.example_ids, BaseExample),
+        summary=summary.summary,
+        summary_id=summary.summary_id,
+    )
+
+
+# 编排 agent 的输出类型 -> 组装后的类型
+ASSEMBLED_TYPES: Dict[Any, Any] = {SectionRefs: Section, ExerciseRefs: ExerciseList}
+
+
+# 编排 agent 的输出类型 -> 运行上下文使用的表类型（默认 ArtifactTable），
+# 工具需要额外状态的编排 agent 在定义子类的模块中登记（如 sectionDigest 为 SectionRefs 登记 SectionArtifacts）
+CONTEXT_TYPES: Dict[Any, Callable[[Optional[RunConfig]], ArtifactTable]] = {}
+
+
+def new_context(output_type: Any, run_config: Optional[RunConfig] = None) -> ArtifactTable:
+    """为输出类型是 output_type（可以是 AgentOutputSchema 包装的类型）的 agent 创建一次运行的上下文"""
+    output_type = getattr(output_type, "output_type", output_type)
+    return CONTEXT_TYPES.get(output_type, ArtifactTable)(run_config)
+
+
+def assembled_type(output_type: Any) -> Any:
+    """输出类型组装后对应的类型（如 SectionRefs -> Section），不需要组装的类型原样返回"""
+    return ASSEMBLED_TYPES.get(output_type, output_type)
+
+
+def assemble(output: Any, table: Any) -> Any:
+    """把编排 agent 输出的 SectionRefs / ExerciseRefs 组装成完整对象，其余输出原样返回"""
+    if not isinstance(output, (SectionRefs, ExerciseRefs)):
+        return output
+    if not isinstance(table, ArtifactTable):
+        raise TypeError(f"{type(output).__name__} can only be assembled from a run with an ArtifactTable context")
+    if isinstance(output, SectionRefs):
+        return assemble_section(output, table)
+    return assemble_exercises(output, table)
+
+
+async def store_output(result: Any) -> str:
+    """as_tool 的 custom_output_extractor：把子 agent 的输出记录到运行上下文的表中，返回带 ID 的对象 JSON
+
+    子 agent 本身是编排 agent（如 section_agent 中的 exercise_agent）时，先把它输出的引用组装成完整对象。
+    运行上下文不是 ArtifactTable 时只返回对象 JSON，不做记录。
+    """
+    value = result.final_output
+    table = result.context_wrapper.context
+    if isinstance(table, ArtifactTable):
+        value = table.record(assemble(value, table))
+    if isinstance(value, BaseModel):
+        return value.model_dump_json(exclude_none=True)
+    return str(value)
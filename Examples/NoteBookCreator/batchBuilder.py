@@ -0,0 +1,269 @@
+"""Batch builder - 批量并发生成章节，支持限流和断点续跑
+
+用法：
+    python batchBuilder.py topics.txt --out-dir output/batch --concurrency 8 --rpm 500 --tpm 200000
+    cat topics.txt | python batchBuilder.py - --out-dir output/batch
+    python batchBuilder.py topics.txt --stub --stub-latency 0.5 --stub-429-rate 0.1   # 离线测试
+    python batchBuilder.py topics.txt --question-index output/question_index         # 跨章节去除近重复题目
+    python batchBuilder.py topics.txt --concept-index output/concept_index           # 复用相似主题的定义和定理
+    python batchBuilder.py topics.txt --routing default                              # 按 agent 选择模型档位
+    python batchBuilder.py topics.txt --validate                                     # 检查练习题，代码题在沙箱中运行
+    python batchBuilder.py topics.txt --max-connections 32 --read-timeout 120        # 共用客户端的连接池和超时
+    python batchBuilder.py topics.txt --metrics-dir output/metrics                   # 逐 agent 的耗时、token 和缓存命中率
+
+topics 文件每行一个主题，空行和以 # 开头的行会被忽略。
+每个主题完成后立即写入 <out-dir>/<slug>.json 检查点；再次运行时已完成的主题会被跳过，
+失败的主题会重新生成，因此中断的批量任务可以从中断处继续。
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from agents import RunConfig, add_trace_processor, set_trace_processors, set_tracing_disabled
+
+from agentMetrics import MetricsProcessor, format_cache_report
+from agentRegistry import set_model_router
+from modelRouting import DEFAULT_ROUTING, ModelRouter
+from openaiClient import ClientSettings, configure_client, make_provider
+from rateLimit import RateLimiter, RateLimitedModelProvider
+from sectionPipeline import build_section
+from stubModel import StubModelProvider
+
+
+logger = logging.getLogger(__name__)
+
+
+def read_topics(lines: Iterable[str]) -> List[str]:
+    """读取主题列表，去掉空行、注释和重复项（保持原有顺序）"""
+    topics: Dict[str, None] = {}
+    for line in lines:
+        topic = line.strip()
+        if topic and not topic.startswith("#"):
+            topics.setdefault(topic, None)
+    return list(topics)
+
+
+def checkpoint_path(out_dir: Path, topic: str) -> Path:
+    """主题对应的检查点文件：可读的标题前缀 + 主题哈希，避免不同主题清理后重名"""
+    safe_title = "".join(c if c.isalnum() or c in (" ", "-", "_") else "_" for c in topic)
+    safe_title = safe_title.replace(" ", "_")[:50]
+    digest = hashlib.sha1(topic.encode("utf-8")).hexdigest()[:8]
+    return out_dir / f"{safe_title}_{digest}.json"
+
+
+def load_checkpoint(path: Path) -> Optional[dict]:
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        # 写了一半的文件视为不存在
+        return None
+
+
+def write_checkpoint(path: Path, data: dict) -> None:
+    """先写临时文件再原子替换，进程崩溃时不会留下损坏的检查点"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+async def build_one(
+    topic: str,
+    out_dir: Path,
+    run_config: RunConfig,
+    **section_kwargs,
+) -> str:
+    """生成单个主题并写入检查点，返回 skipped / done / failed 之一"""
+    path = checkpoint_path(out_dir, topic)
+    checkpoint = load_checkpoint(path)
+    if checkpoint is not None and checkpoint.get("status") == "done":
+        return "skipped"
+    attempts = (checkpoint or {}).get("attempts", 0) + 1
+
+    started = time.perf_counter()
+    try:
+        section = await build_section(topic, run_config=run_config, **section_kwargs)
+    except Exception as error:
+        logger.exception("Failed to build section for %r", topic)
+        write_checkpoint(path, {
+            "topic": topic,
+            "status": "failed",
+            "attempts": attempts,
+            "error": f"{type(error).__name__}: {error}",
+        })
+        return "failed"
+
+    write_checkpoint(path, {
+        "topic": topic,
+        "status": "done",
+        "attempts": attempts,
+        "elapsed": round(time.perf_counter() - started, 3),
+        "section": section.model_dump(mode="json"),
+    })
+    logger.info("Built %r in %.1fs", topic, time.perf_counter() - started)
+    return "done"
+
+
+async def build_batch(
+    topics: List[str],
+    out_dir: Path,
+    concurrency: int = 8,
+    run_config: Optional[RunConfig] = None,
+    **section_kwargs,
+) -> Dict[str, int]:
+    """并发生成所有主题，返回各状态的数量
+
+    concurrency 个 worker 依次从主题列表中取下一个主题，章节写入检查点后即被释放，
+    进程的内存只与并发数有关，不随主题总数增长。
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    run_config = run_config or RunConfig()
+    counts = {"done": 0, "skipped": 0, "failed": 0}
+    pending = iter(topics)
+
+    async def worker() -> None:
+        # 所有 worker 在同一个事件循环中共用一个迭代器，不会取到同一个主题
+        for topic in pending:
+            counts[await build_one(topic, out_dir, run_config, **section_kwargs)] += 1
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(topics))))))
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="批量生成章节")
+    parser.add_argument("topics", help="主题列表文件，每行一个主题；使用 - 从标准输入读取")
+    parser.add_argument("--out-dir", default="output/batch", help="检查点输出目录")
+    parser.add_argument("--concurrency", type=int, default=8, help="同时生成的章节数")
+    parser.add_argument("--rpm", type=float, default=None, help="每分钟请求数上限")
+    parser.add_argument("--tpm", type=float, default=None, help="每分钟 token 数上限")
+    parser.add_argument("--max-retries", type=int, default=6, help="遇到 429 时的最大重试次数")
+    parser.add_argument("--theorems", type=int, default=1, help="每个章节的定理数量")
+    parser.add_argument("--exercises", type=int, default=4, help="每个章节的练习题数量")
+    parser.add_argument("--stub", action="store_true", help="使用本地假模型（不访问网络）")
+    parser.add_argument("--stub-latency", type=float, default=0.2, help="假模型每次调用的延迟（秒）")
+    parser.add_argument("--stub-429-rate", type=float, default=0.0, help="假模型注入 429 错误的比例")
+    parser.add_argument("--metrics-dir", default=None, help="写入 metrics.jsonl、metrics.prom 和 cache.json 的目录")
+    parser.add_argument("--question-index", default=None, help="近重复题目索引目录，运行结束后保存新题目")
+    parser.add_argument("--concept-index", default=None, help="定义和定理的相似度索引目录，运行结束后保存新结果")
+    parser.add_argument(
+        "--routing", default=None,
+        help="模型路由配置（JSON 文件，或 default 使用内置路由）",
+    )
+    parser.add_argument(
+        "--routing-log", default=None,
+        help="路由记录的 JSONL 文件，默认为 <metrics-dir>/routing.jsonl（没有 --metrics-dir 时只记日志）；"
+             "不能放在 --out-dir 中，否则会被 sectionExport 当作章节读取",
+    )
+    parser.add_argument("--validate", action="store_true", help="检查每道练习题，不通过的题目单独重新生成")
+    parser.add_argument("--sandbox-timeout", type=float, default=5.0, help="代码题答案在沙箱中的运行时间上限（秒）")
+    parser.add_argument("--base-url", default=None, help="OpenAI 兼容 API 的地址，例如 stubServer.py 的 http://127.0.0.1:8765/v1")
+    parser.add_argument("--max-connections", type=int, default=ClientSettings.max_connections, help="共用客户端的连接数上限")
+    parser.add_argument("--read-timeout", type=float, default=ClientSettings.read_timeout, help="等待模型响应的超时（秒）")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.topics == "-":
+        topics = read_topics(sys.stdin)
+    else:
+        with open(args.topics, "r", encoding="utf-8") as f:
+            topics = read_topics(f)
+
+    metrics = None
+    if args.metrics_dir:
+        metrics = MetricsProcessor(Path(args.metrics_dir) / "metrics.jsonl")
+        if args.stub:
+            # 离线运行时只保留本地指标，不向 OpenAI 上报 trace
+            set_trace_processors([metrics])
+        else:
+            add_trace_processor(metrics)
+
+    provider = None
+    if args.stub:
+        set_tracing_disabled(metrics is None)
+        provider = StubModelProvider(
+            latency=args.stub_latency, jitter=0.5, rate_limit_rate=args.stub_429_rate, prefix_cache=True,
+        )
+    else:
+        # 所有 agent（包括 as_tool 子运行和路由的各档位）共用一个连接池
+        provider = make_provider(configure_client(ClientSettings(
+            base_url=args.base_url,
+            max_connections=args.max_connections,
+            max_keepalive_connections=args.max_connections,
+            read_timeout=args.read_timeout,
+        )))
+    limiter = RateLimiter(args.rpm, args.tpm, max_retries=args.max_retries)
+    run_config = RunConfig(model_provider=RateLimitedModelProvider(limiter, provider))
+    if args.routing:
+        routing = DEFAULT_ROUTING if args.routing == "default" else json.loads(Path(args.routing).read_text(encoding="utf-8"))
+        # 路由记录不写入检查点目录，检查点目录中只有章节文件
+        log_path = args.routing_log or (Path(args.metrics_dir) / "routing.jsonl" if args.metrics_dir else None)
+        # 各档位的模型同样经过限流器
+        set_model_router(ModelRouter(routing, provider=run_config.model_provider, log_path=log_path))
+
+    # 两个索引都依赖 numpy，只在用到时才导入
+    question_index = concept_index = None
+    if args.question_index:
+        from questionIndex import QuestionIndex
+        question_index = QuestionIndex.open(args.question_index)
+    if args.concept_index:
+        from conceptIndex import ConceptIndex
+        concept_index = ConceptIndex.open(args.concept_index)
+    validator = None
+    if args.validate:
+        from codeSandbox import CodeSandbox
+        from ExerciseCreator.exerciseValidator import ExerciseValidator
+        validator = ExerciseValidator(CodeSandbox(timeout=args.sandbox_timeout))
+
+    started = time.perf_counter()
+    try:
+        counts = asyncio.run(build_batch(
+            topics,
+            Path(args.out_dir),
+            concurrency=args.concurrency,
+            run_config=run_config,
+            theorem_count=args.theorems,
+            exercise_count=args.exercises,
+            question_index=question_index,
+            concept_index=concept_index,
+            validator=validator,
+        ))
+    finally:
+        # 中断时也保存已接受的题目和已生成的定义、定理，续跑时可以直接使用
+        if question_index is not None:
+            question_index.save()
+        if concept_index is not None:
+            concept_index.save()
+    if metrics is not None:
+        metrics.write_prometheus(Path(args.metrics_dir) / "metrics.prom")
+        metrics.write_cache_report(Path(args.metrics_dir) / "cache.json")
+        metrics.shutdown()
+        print(format_cache_report(metrics.cache_report()))
+    print(
+        f"完成 {counts['done']}，跳过 {counts['skipped']}，失败 {counts['failed']}，"
+        f"429 重试 {limiter.retries} 次，用时 {time.perf_counter() - started:.1f}s"
+    )
+    if validator is not None:
+        print(f"检查练习题 {validator.checked} 道，不通过 {sum(validator.failures.values())} 次：{dict(validator.failures)}")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
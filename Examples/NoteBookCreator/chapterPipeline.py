@@ -0,0 +1,249 @@
+"""Chapter pipeline - 一次规划整章，共享概念只定义一次，各节并发生成
+
+逐节独立运行 section_agent 或 build_section 时，每一节都会重新生成相互重叠的定义和背景介绍。
+build_chapter 改为：
+
+1. 规划：chapter_planner 一次调用给出章标题、章介绍、共享概念，以及各节的主题、概念和简短介绍（ChapterPlan）
+2. 概念：每个共享概念只调用一次 definition_agent，生成 ConceptBlock
+3. 各节：在信号量限制下并发调用 build_section。规划中已有的介绍不再单独生成；
+   核心概念是共享概念的节直接使用概念块中的定义；每节的介绍和定理输入只附带几行紧凑的引用
+  （本节用到的其他共享概念的名称和摘要、前两节的标题），不重复前面的内容，练习题只带本节的定义
+
+各节只依赖规划和概念块，不依赖其他节的生成结果，因此可以完全并发。
+所有节共用同一个 run_config，限流由其中的 RateLimitedModelProvider 统一负责（见 batchBuilder）。
+
+用法：
+    chapter = await build_chapter("函数", section_count=8, section_concurrency=4)
+    print(chapter_to_markdown(chapter))
+"""
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Awaitable, Dict, List, Optional, Sequence
+
+from agents import RunConfig, trace
+from agents.tracing import get_current_trace
+
+from agentRegistry import get_agent, lazy_agents
+from agentRunner import run_agent
+from model import Chapter, ChapterPlan, ConceptBlock, Definition, Introduction, Notebook, Section, SectionPlan
+from promptCache import layout_prompt
+from sectionDigest import truncate
+from sectionPipeline import build_section
+from sectionStore import assign_chapter_ids, assign_notebook_ids, new_id
+
+if TYPE_CHECKING:
+    from conceptIndex import ConceptIndex
+    from questionIndex import QuestionIndex
+    from ExerciseCreator.exerciseValidator import ExerciseValidator
+
+
+CHAPTER_PLAN_INSTRUCTIONS = """你是一个专业的课程规划器。你的任务是为给定的主题规划一章内容，只需要给出结构，不需要生成各节的正文。
+
+要求：
+1. 按照要求的节数规划，各节按学习顺序排列，由浅入深
+2. chapter_title 和 introduction：章标题和一到两段的章介绍
+3. concepts：在两个或更多节中都会用到的概念，整章只定义一次，名称要简短（如 "定义域"）
+4. 每一节给出：
+   - title：本节主题
+   - concepts：本节涉及的概念名称，第一个为本节的核心概念；共享概念使用与 concepts 中完全相同的名称
+   - focus：本节的侧重点，不同节的侧重点不要重复
+   - introduction：一到两句话的本节介绍，说明本节在章中的位置，不要重复章介绍
+
+输出格式必须符合 ChapterPlan 模型的要求。"""
+
+
+def build_chapter_plan_agent():
+    """构造 chapter_plan_agent（由 agentRegistry 在第一次使用时调用）"""
+    from agents import Agent, AgentOutputSchema
+
+    return Agent(
+        name="chapter_planner",
+        instructions=CHAPTER_PLAN_INSTRUCTIONS,
+        output_type=AgentOutputSchema(ChapterPlan, strict_json_schema=False),
+    )
+
+
+# 引用中每个共享概念只给出截短的定义作为摘要，最多保留的字符数
+_DIGEST_CHARS = 24
+
+
+async def plan_chapter(topic: str, section_count: int = 6, run_config: Optional[RunConfig] = None) -> ChapterPlan:
+    """第一阶段：规划章的结构"""
+    return await run_agent(
+        get_agent("chapter_plan"),
+        f"为「{topic}」规划一章内容，共 {section_count} 节",
+        run_config,
+    )
+
+
+async def build_concept_blocks(
+    plan: ChapterPlan,
+    run_config: Optional[RunConfig] = None,
+) -> List[ConceptBlock]:
+    """第二阶段：每个共享概念并发调用一次 definition_agent"""
+    async def build(name: str) -> ConceptBlock:
+        definition: Definition = await run_agent(
+            get_agent("definition"),
+            # 整章共享的说明在前，各概念的名称在后
+            layout_prompt(f"这个定义会在「{plan.chapter_title}」一章的多个节中共用，只给出定义本身。", f"生成「{name}」的定义。"),
+            run_config,
+        )
+        return ConceptBlock(id=new_id("concept_block"), name=name, definition=definition.definition)
+
+    return list(await asyncio.gather(*(build(name) for name in dict.fromkeys(plan.concepts))))
+
+
+def section_context(
+    plan: ChapterPlan,
+    index: int,
+    blocks: Dict[str, ConceptBlock],
+    max_previous: int = 2,
+) -> str:
+    """第 index 节（从 0 开始）输入中附带的紧凑引用：本节用到的共享概念的摘要和前面几节的标题
+
+    本节的介绍和定理的输入会带上这段引用（练习题只拿到本节的定义，不带引用），因此只保留几行：
+    核心概念（section.concepts[0]）的完整定义已经作为本节的定义传入，不再重复列出；
+    其他共享概念只给出名称和截短的定义，完整定义在章的概念块中。
+    """
+    section = plan.sections[index]
+    lines = [f"本节属于「{plan.chapter_title}」一章，下列内容在本章其他部分讲解，直接引用，不要重新定义或推导。"]
+    shared = [blocks[name] for name in section.concepts[1:] if name in blocks]
+    if shared:
+        lines.append("共享概念：" + "；".join(
+            f"{block.name}（{truncate(block.definition, _DIGEST_CHARS)}）" for block in shared
+        ))
+    previous = plan.sections[max(0, index - max_previous):index]
+    if previous:
+        lines.append("前面几节：" + "；".join(item.title for item in previous))
+    return "\n".join(lines)
+
+
+def _section_inputs(
+    plan: ChapterPlan,
+    index: int,
+    blocks: Dict[str, ConceptBlock],
+    context: Optional[str] = None,
+) -> Dict[str, Any]:
+    """build_section 的 introduction / definition / context 参数；context 为调用方给出的更大范围的内容，放在最前"""
+    section: SectionPlan = plan.sections[index]
+    inputs: Dict[str, Any] = {"context": layout_prompt(context, section_context(plan, index, blocks))}
+    if section.introduction:
+        inputs["introduction"] = Introduction(section_title=section.title, introduction=section.introduction)
+    if section.concepts and section.concepts[0] in blocks:
+        inputs["definition"] = Definition(definition=blocks[section.concepts[0]].definition)
+    return inputs
+
+
+async def build_chapter(
+    topic: str,
+    section_count: int = 6,
+    plan: Optional[ChapterPlan] = None,
+    section_concurrency: int = 4,
+    run_config: Optional[RunConfig] = None,
+    context: Optional[str] = None,
+    theorem_count: int = 1,
+    exercise_count: int = 4,
+    exercise_concurrency: int = 5,
+    summary_token_budget: int = 800,
+    question_index: Optional["QuestionIndex"] = None,
+    concept_index: Optional["ConceptIndex"] = None,
+    validator: Optional["ExerciseValidator"] = None,
+) -> Chapter:
+    """规划并生成一整章
+
+    所有节放在同一个 trace 中（已有 trace 时沿用外层 trace）。
+
+    Args:
+        topic: 章的主题，如 "函数"
+        section_count: 规划的节数（传入 plan 时忽略）
+        plan: 已有的规划，传入时跳过规划阶段
+        section_concurrency: 同时生成的节数
+        run_config: 传给每次 Runner.run 的运行配置，所有节共用
+        context: 附加到每一节引用之前的内容（如整本笔记本的说明），与各节的引用合并后传给 build_section
+        theorem_count, exercise_count, exercise_concurrency, summary_token_budget, question_index,
+        concept_index, validator: 原样传给每一节的 build_section
+    """
+    def run() -> Awaitable[Chapter]:
+        return _build_chapter(
+            topic, section_count, plan, section_concurrency, run_config, context, theorem_count, exercise_count,
+            exercise_concurrency, summary_token_budget, question_index, concept_index, validator,
+        )
+
+    if get_current_trace() is not None:
+        return await run()
+    with trace("build_chapter"):
+        return await run()
+
+
+async def _build_chapter(
+    topic: str,
+    section_count: int,
+    plan: Optional[ChapterPlan],
+    section_concurrency: int,
+    run_config: Optional[RunConfig],
+    context: Optional[str],
+    theorem_count: int,
+    exercise_count: int,
+    exercise_concurrency: int,
+    summary_token_budget: int,
+    question_index: Optional["QuestionIndex"],
+    concept_index: Optional["ConceptIndex"],
+    validator: Optional["ExerciseValidator"],
+) -> Chapter:
+    """build_chapter 的实现，参数见 build_chapter"""
+    plan = plan or await plan_chapter(topic, section_count, run_config)
+    concepts = await build_concept_blocks(plan, run_config)
+    blocks = {block.name: block for block in concepts}
+    semaphore = asyncio.Semaphore(section_concurrency)
+
+    async def build(index: int) -> Section:
+        async with semaphore:
+            section = await build_section(
+                plan.sections[index].title,
+                theorem_count=theorem_count,
+                exercise_count=exercise_count,
+                exercise_concurrency=exercise_concurrency,
+                summary_token_budget=summary_token_budget,
+                run_config=run_config,
+                question_index=question_index,
+                concept_index=concept_index,
+                validator=validator,
+                **_section_inputs(plan, index, blocks, context),
+            )
+        section.concept_ids = [blocks[name].id for name in plan.sections[index].concepts if name in blocks]
+        return section
+
+    sections = await asyncio.gather(*(build(i) for i in range(len(plan.sections))))
+    return assign_chapter_ids(Chapter(
+        chapter_title=plan.chapter_title,
+        introduction=plan.introduction,
+        concepts=concepts,
+        sections=list(sections),
+    ))
+
+
+async def build_notebook(
+    title: str,
+    topics: Sequence[str],
+    chapter_concurrency: int = 2,
+    **chapter_kwargs,
+) -> Notebook:
+    """为每个主题生成一章，组成笔记本；各章共用 chapter_kwargs 中的 run_config
+
+    Args:
+        title: 笔记本标题
+        topics: 每章的主题
+        chapter_concurrency: 同时生成的章数（每章内部还有 section_concurrency 的并发）
+        chapter_kwargs: 传给 build_chapter 的其他参数
+    """
+    semaphore = asyncio.Semaphore(chapter_concurrency)
+
+    async def build(topic: str) -> Chapter:
+        async with semaphore:
+            return await build_chapter(topic, **chapter_kwargs)
+
+    chapters = await asyncio.gather(*(build(topic) for topic in topics))
+    return assign_notebook_ids(Notebook(title=title, chapters=list(chapters)))
+
+
+__getattr__ = lazy_agents(__name__, chapter_plan_agent="chapter_plan")
@@ -0,0 +1,163 @@
+"""Code sandbox - 在受限的子进程中运行生成的代码
+
+每段代码写入独立的临时目录，用 `python -I` 启动一个子进程运行：
+- 隔离模式（-I）：不读取 PYTHON* 环境变量和用户 site-packages，当前目录不加入 sys.path
+- 资源限制（仅 POSIX，通过 resource 模块）：CPU 时间、地址空间、写入文件大小、打开文件数，不生成 core 文件
+- 超时：超过 timeout 秒时结束整个进程组
+- 并发：同时运行的子进程数不超过 max_workers，相当于一个按需启动的进程池；
+  每次运行都是新进程，上一段代码留下的状态不会影响下一段
+
+代码以 run_name="__sandbox__" 运行，`if __name__ == "__main__":` 中的示例不会执行；
+stdin 为空，顶层读取输入时的 EOFError 视为正常结束。
+
+用法：
+    sandbox = CodeSandbox(max_workers=4, timeout=5)
+    result = await sandbox.run("def f(x):\\n    return x + 1\\n")
+    if not result.ok:
+        print(result.error)
+"""
+
+import asyncio
+import os
+import signal
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，只做超时限制
+    resource = None
+
+
+# 在子进程中运行代码的入口脚本
+_RUNNER = """import runpy
+try:
+    runpy.run_path("answer.py", run_name="__sandbox__")
+except EOFError:
+    pass
+"""
+
+# stdout / stderr 最多保留的字符数
+_OUTPUT_CHARS = 4000
+
+
+@dataclass
+class SandboxResult:
+    """一次运行的结果"""
+    returncode: Optional[int]
+    stdout: str
+    stderr: str
+    seconds: float
+    timed_out: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return not self.timed_out and self.returncode == 0
+
+    @property
+    def error(self) -> str:
+        """失败原因：超时，或 stderr 的最后一行（通常是异常类型和信息）"""
+        if self.timed_out:
+            return f"运行超过 {self.seconds:.1f} 秒"
+        lines = [line for line in self.stderr.splitlines() if line.strip()]
+        return lines[-1] if lines else f"退出码 {self.returncode}"
+
+
+class CodeSandbox:
+    """受限子进程中的代码运行器
+
+    Args:
+        max_workers: 同时运行的子进程数，默认为 CPU 核数
+        timeout: 每次运行的墙钟时间上限（秒）
+        memory_mb: 地址空间上限（MB）
+        cpu_seconds: CPU 时间上限（秒），默认为 timeout 向上取整
+        file_size_mb: 可写入文件的大小上限（MB）
+        python: 运行代码的解释器，默认为当前解释器
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        timeout: float = 5.0,
+        memory_mb: int = 512,
+        cpu_seconds: Optional[int] = None,
+        file_size_mb: int = 10,
+        python: Optional[str] = None,
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.cpu_seconds = cpu_seconds or max(1, int(timeout + 0.999))
+        self.file_size_mb = file_size_mb
+        self.python = python or sys.executable
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.runs = 0
+        self.failures = 0
+
+    def _limit_resources(self) -> None:
+        """在子进程 exec 之前设置资源限制"""
+        resource.setrlimit(resource.RLIMIT_CPU, (self.cpu_seconds, self.cpu_seconds))
+        memory = self.memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+        file_size = self.file_size_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_FSIZE, (file_size, file_size))
+        resource.setrlimit(resource.RLIMIT_NOFILE, (64, 64))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+    async def run(self, code: str) -> SandboxResult:
+        """运行一段 Python 代码，返回退出码和输出"""
+        # 信号量要在事件循环中创建，这里延迟到第一次运行
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        async with self._semaphore:
+            result = await self._run(code)
+        self.runs += 1
+        if not result.ok:
+            self.failures += 1
+        return result
+
+    async def _run(self, code: str) -> SandboxResult:
+        with tempfile.TemporaryDirectory(prefix="sandbox_") as workdir:
+            Path(workdir, "answer.py").write_text(code, encoding="utf-8")
+            started = time.monotonic()
+            process = await asyncio.create_subprocess_exec(
+                self.python, "-I", "-c", _RUNNER,
+                cwd=workdir,
+                env={"PATH": os.environ.get("PATH", ""), "PYTHONIOENCODING": "utf-8", "HOME": workdir},
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                preexec_fn=self._limit_resources if resource is not None else None,
+                start_new_session=True,
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), self.timeout)
+            except asyncio.TimeoutError:
+                self._kill(process)
+                await process.wait()
+                return SandboxResult(None, "", "", time.monotonic() - started, timed_out=True)
+            except BaseException:
+                # 调用方被取消（例如 agentDeadline 的期限到了）时也要结束子进程
+                self._kill(process)
+                raise
+            return SandboxResult(
+                process.returncode,
+                stdout.decode("utf-8", "replace")[-_OUTPUT_CHARS:],
+                stderr.decode("utf-8", "replace")[-_OUTPUT_CHARS:],
+                time.monotonic() - started,
+            )
+
+    @staticmethod
+    def _kill(process: asyncio.subprocess.Process) -> None:
+        """结束子进程及其创建的所有进程（子进程在独立的进程组中）"""
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except ProcessLookupError:
+            pass
@@ -0,0 +1,351 @@
+"""Concept index - 基于字符 n-gram TF-IDF 的本地相似度索引，复用已生成的定义和定理
+
+主题列表中经常出现高度重叠的主题（"函数定义域"、"求函数定义域"、"函数的定义域与值域"），
+definition_agent 和 theorem_agent 每次都从头生成。ConceptIndex 以主题文本为键保存已生成的
+Definition / Theorem，在子 agent 运行前查找相似的主题：
+- 相似度不低于 reuse_threshold：直接复用已有结果，不调用模型
+- 相似度不低于 reference_threshold：作为参考示例放入输入，模型可以沿用其写法，输出更短
+
+向量化完全在本地完成，不依赖嵌入模型：
+- 特征：NFKC 归一化后的字符 n-gram（默认 1-3 字，单字的权重由 IDF 压低），crc32 哈希到 dim 维，词频取 1 + log(tf)
+- 权重：平滑 IDF，log((1 + n) / (1 + df)) + 1，插入新记录后在下一次查询时惰性重算
+- 存储：稀疏矩阵以 CSR 形式保存在三个 NumPy 数组中（indptr / cols / tf），
+  查询时使用按列排序的倒排表，只访问与查询有相同 n-gram 的记录
+
+持久化目录中，记录追加在 records.jsonl 中，CSR 数组按块保存（每块是连续若干行的 chunk_*.npz，
+包含每行的非零项数、列号和词频）。save 只把新增的行写成一个新块，相邻两块大小接近时
+（较旧的一块不超过较新一块的 2 倍）合并，因此每行平均只被重写 O(log N) 次。
+config.json 记录块列表、记录数和 records.jsonl 的有效长度，原子替换它即为提交：
+提交之前崩溃时，多写的记录和块都会被忽略；open 会检查块中的行数与记录数是否一致。
+
+用法：
+    index = ConceptIndex.open("output/concept_index")
+    matches = index.search(["求函数定义域", "函数单调性"], k=3, kind="definition")
+    index.add("definition", "函数定义域", definition.model_dump(mode="json"))
+    index.save()
+"""
+
+import json
+import os
+import tempfile
+import uuid
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from questionIndex import normalize
+
+
+def ngrams(text: str, ngram_range: Tuple[int, int] = (1, 3)) -> List[str]:
+    """归一化后的字符 n-gram；文本比最短的 n 还短时整体作为一个 n-gram"""
+    text = normalize(text)
+    low, high = ngram_range
+    if len(text) < low:
+        return [text] if text else []
+    return [text[i:i + n] for n in range(low, high + 1) for i in range(len(text) - n + 1)]
+
+
+# 旧版本布局中整体保存的 CSR 数组
+_LEGACY_FILES = ("indptr.npy", "cols.npy", "tf.npy")
+
+
+def _write_atomic(path: Path, write) -> None:
+    """用 write(f) 写入临时文件，再原子替换 path"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _read_records(path: Path, size: Optional[int] = None) -> Tuple[List[dict], List[int]]:
+    """读取 records.jsonl 的前 size 个字节（None 表示整个文件），返回 (记录, 每条记录结束处的字节偏移)"""
+    with open(path, "rb") as f:
+        data = f.read() if size is None else f.read(size)
+    records, ends, position = [], [], 0
+    for line in data.splitlines(keepends=True):
+        position += len(line)
+        if line.strip():
+            records.append(json.loads(line))
+            ends.append(position)
+    return records, ends
+
+
+@dataclass
+class ConceptMatch:
+    """search 的一条结果"""
+    row: int
+    score: float
+    kind: str
+    key: str
+    record: dict
+
+
+class ConceptIndex:
+    """定义、定理等记录的 TF-IDF 相似度索引
+
+    Args:
+        path: 持久化目录，None 表示只在内存中使用
+        dim: 哈希特征的维数
+        ngram_range: 字符 n-gram 的长度范围（闭区间）
+        reuse_threshold: lookup 中直接复用的相似度下限
+        reference_threshold: lookup 中作为参考示例的相似度下限
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        dim: int = 2**18,
+        ngram_range: Tuple[int, int] = (1, 3),
+        reuse_threshold: float = 0.8,
+        reference_threshold: float = 0.35,
+    ):
+        self.path = Path(path) if path is not None else None
+        self.dim = dim
+        self.ngram_range = tuple(ngram_range)
+        self.reuse_threshold = reuse_threshold
+        self.reference_threshold = reference_threshold
+
+        # 已合并的 CSR 数据
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._cols = np.zeros(0, dtype=np.int32)
+        self._tf = np.zeros(0, dtype=np.float32)
+        self._df = np.zeros(dim, dtype=np.int32)
+        self._kinds = np.zeros(0, dtype=object)
+        self._records: List[dict] = []  # {"kind", "key", "record"}
+        # 已提交的行数、records.jsonl 的有效长度，以及按行号顺序排列的块 {"name", "rows"}；
+        # _legacy 表示目录还是旧版本的布局，下一次 save 时转换
+        self._saved_count = 0
+        self._records_bytes = 0
+        self._chunks: List[Dict[str, Union[str, int]]] = []
+        self._legacy = False
+
+        # add 之后、下一次查询之前尚未合并的行
+        self._pending: List[Tuple[np.ndarray, np.ndarray]] = []
+        # 依赖文档频率的缓存（IDF 和倒排表），插入后失效
+        self._idf: Optional[np.ndarray] = None
+        self._post_cols = np.zeros(0, dtype=np.int32)
+        self._post_rows = np.zeros(0, dtype=np.int64)
+        self._post_weights = np.zeros(0, dtype=np.float32)
+
+    # ---------- 加载与保存 ----------
+
+    @classmethod
+    def open(cls, path: Union[str, Path], **kwargs) -> "ConceptIndex":
+        """打开持久化目录中的索引；目录中还没有索引时新建
+
+        块中的行数与记录数不一致（目录被部分复制或手动修改过）时抛出 ValueError。
+        """
+        path = Path(path)
+        config_path = path / "config.json"
+        if not config_path.exists():
+            return cls(path, **kwargs)
+        config = json.loads(config_path.read_text(encoding="utf-8"))
+        index = cls(path, **{**kwargs, "dim": config["dim"], "ngram_range": config["ngram_range"]})
+        if "chunks" in config:
+            index._chunks = config["chunks"]
+            index._records_bytes = config["records_bytes"]
+            chunks = [np.load(path / chunk["name"]) for chunk in index._chunks]
+            lengths = np.concatenate([np.zeros(0, dtype=np.int64)] + [chunk["lengths"] for chunk in chunks])
+            index._cols = np.concatenate([index._cols] + [chunk["cols"] for chunk in chunks])
+            index._tf = np.concatenate([index._tf] + [chunk["tf"] for chunk in chunks])
+            index._records, _ = _read_records(path / "records.jsonl", index._records_bytes)
+            if not len(index._records) == len(lengths) == config["records"]:
+                raise ValueError(
+                    f"ConceptIndex at {path} is inconsistent: {config['records']} records committed, "
+                    f"{len(index._records)} in records.jsonl, {len(lengths)} rows in chunks"
+                )
+        else:
+            # 旧版本布局：先追加记录再写数组，崩溃时记录可能多于数组中的行，多出的记录没有提交
+            index._legacy = True
+            index._indptr = np.load(path / "indptr.npy")
+            index._cols = np.load(path / "cols.npy")
+            index._tf = np.load(path / "tf.npy")
+            lengths = np.diff(index._indptr)
+            records, ends = _read_records(path / "records.jsonl")
+            if len(records) < len(lengths):
+                raise ValueError(
+                    f"ConceptIndex at {path} is inconsistent: {len(records)} records, {len(lengths)} rows in arrays"
+                )
+            index._records = records[:len(lengths)]
+            index._records_bytes = ends[len(lengths) - 1] if len(lengths) else 0
+        index._indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        index._kinds = np.array([r["kind"] for r in index._records], dtype=object)
+        np.add.at(index._df, index._cols, 1)
+        index._saved_count = len(index._records)
+        return index
+
+    def _write_chunk(self, start: int, end: int) -> Dict[str, Union[str, int]]:
+        """把第 [start, end) 行的 CSR 数据写成一个新块"""
+        name = f"chunk_{uuid.uuid4().hex[:12]}.npz"
+        low, high = self._indptr[start], self._indptr[end]
+        _write_atomic(self.path / name, lambda f: np.savez(
+            f, lengths=np.diff(self._indptr[start:end + 1]), cols=self._cols[low:high], tf=self._tf[low:high],
+        ))
+        return {"name": name, "rows": end - start}
+
+    def save(self, path: Optional[Union[str, Path]] = None) -> None:
+        """写入持久化目录：记录追加到 records.jsonl，新增的行写成一个新块，最后替换 config.json 提交"""
+        if path is not None and Path(path) != self.path:
+            self.path, self._saved_count, self._records_bytes, self._chunks = Path(path), 0, 0, []
+            self._legacy = False
+        if self.path is None:
+            raise ValueError("ConceptIndex has no path to save to")
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._merge_pending()
+        count = len(self._records)
+        if count == self._saved_count and (self.path / "config.json").exists():
+            return
+
+        # 从上次提交的末尾开始追加，覆盖崩溃时多写的、没有提交的记录
+        records_path = self.path / "records.jsonl"
+        with open(records_path, "r+b" if records_path.exists() else "wb") as f:
+            f.seek(self._records_bytes)
+            f.truncate()
+            for record in self._records[self._saved_count:]:
+                f.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+            records_bytes = f.tell()
+
+        # 新增的行与末尾大小接近的块（不超过新块的 2 倍）合并成一个新块，只写一次；
+        # 旧版本布局的数组整体转换成一块（只发生一次）
+        chunks = [] if self._legacy else list(self._chunks)
+        rows = count - (0 if self._legacy else self._saved_count)
+        obsolete = []
+        while chunks and chunks[-1]["rows"] <= 2 * rows:
+            obsolete.append(chunks.pop())
+            rows += obsolete[-1]["rows"]
+        if rows:
+            chunks.append(self._write_chunk(count - rows, count))
+
+        config = {
+            "dim": self.dim,
+            "ngram_range": list(self.ngram_range),
+            "records": count,
+            "records_bytes": records_bytes,
+            "chunks": chunks,
+        }
+        _write_atomic(self.path / "config.json", lambda f: f.write(json.dumps(config).encode("utf-8")))
+        # 提交之后才删除被合并的块和旧版本的数组
+        for chunk in obsolete:
+            (self.path / chunk["name"]).unlink(missing_ok=True)
+        if self._legacy:
+            for name in _LEGACY_FILES:
+                (self.path / name).unlink(missing_ok=True)
+        self._saved_count, self._records_bytes, self._chunks, self._legacy = count, records_bytes, chunks, False
+
+    # ---------- 向量化 ----------
+
+    def _vectorize(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """文本 -> (列号, 1 + log(tf))，列号升序且不重复"""
+        hashes = np.fromiter(
+            (zlib.crc32(gram.encode("utf-8")) % self.dim for gram in ngrams(text, self.ngram_range)),
+            dtype=np.int64,
+        )
+        cols, counts = np.unique(hashes, return_counts=True)
+        return cols.astype(np.int32), (1.0 + np.log(counts)).astype(np.float32)
+
+    def _merge_pending(self) -> None:
+        if not self._pending:
+            return
+        lengths = [len(cols) for cols, _ in self._pending]
+        self._indptr = np.concatenate([self._indptr, self._indptr[-1] + np.cumsum(lengths)])
+        self._cols = np.concatenate([self._cols] + [cols for cols, _ in self._pending])
+        self._tf = np.concatenate([self._tf] + [tf for _, tf in self._pending])
+        self._kinds = np.array([r["kind"] for r in self._records], dtype=object)
+        self._pending = []
+
+    def _postings(self) -> np.ndarray:
+        """按列排序的倒排表，插入后惰性重算
+
+        非零项按 IDF 加权并按行归一化后，按列号稳定排序；查询只需访问与其 n-gram 相同的列，
+        再用 np.bincount 按行累加，耗时与命中的非零项数成正比，而不是与记录总数成正比。
+        """
+        self._merge_pending()
+        if self._idf is None:
+            n = len(self._records)
+            self._idf = (np.log((1.0 + n) / (1.0 + self._df)) + 1.0).astype(np.float32)
+            rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(self._indptr))
+            weights = self._tf * self._idf[self._cols]
+            norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n))
+            weights = weights / np.where(norms > 0, norms, 1.0)[rows]
+            order = np.argsort(self._cols, kind="stable")
+            self._post_cols = self._cols[order]
+            self._post_rows = rows[order]
+            self._post_weights = weights[order].astype(np.float32)
+        return self._idf
+
+    # ---------- 查询与添加 ----------
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def add(self, kind: str, key: str, record: dict) -> int:
+        """添加一条记录，返回其行号
+
+        Args:
+            kind: 记录类型，如 "definition" / "theorem"，查询时可按类型过滤
+            key: 用于相似度匹配的文本（通常是主题）
+            record: 要保存的数据（如 Definition.model_dump(mode="json")）
+        """
+        cols, tf = self._vectorize(key)
+        self._pending.append((cols, tf))
+        self._records.append({"kind": kind, "key": key, "record": record})
+        np.add.at(self._df, cols, 1)
+        self._idf = None
+        return len(self._records) - 1
+
+    def search(
+        self,
+        queries: Sequence[str],
+        k: int = 5,
+        kind: Optional[str] = None,
+        threshold: float = 0.0,
+    ) -> List[List[ConceptMatch]]:
+        """批量查询，每个查询返回余弦相似度最高的至多 k 条记录（按相似度降序，且不低于 threshold）"""
+        if not self._records:
+            return [[] for _ in queries]
+        idf = self._postings()
+        excluded = None if kind is None else self._kinds != kind
+        results: List[List[ConceptMatch]] = []
+        for query in queries:
+            cols, tf = self._vectorize(query)
+            values = tf * idf[cols]
+            norm = np.linalg.norm(values)
+            if norm > 0:
+                values /= norm
+            # 查询的每一列在倒排表中对应一段 [starts, ends)，把这些段拼成一个下标数组
+            starts = np.searchsorted(self._post_cols, cols, side="left")
+            lengths = np.searchsorted(self._post_cols, cols, side="right") - starts
+            offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            scores = np.bincount(
+                self._post_rows[offsets],
+                weights=self._post_weights[offsets] * np.repeat(values, lengths),
+                minlength=len(self._records),
+            )
+            if excluded is not None:
+                scores[excluded] = -1.0
+            results.append(self._top_k(scores, k, threshold))
+        return results
+
+    def _top_k(self, scores: np.ndarray, k: int, threshold: float) -> List[ConceptMatch]:
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            ConceptMatch(int(row), min(float(scores[row]), 1.0), **self._records[row])
+            for row in top
+            if scores[row] >= threshold and scores[row] > 0
+        ]
+
+    def lookup(self, kind: str, key: str, k: int = 3) -> Tuple[List[ConceptMatch], List[ConceptMatch]]:
+        """返回 (可直接复用的记录, 只作参考示例的记录)，两者互不重叠，均按相似度降序"""
+        matches = self.search([key], k=k, kind=kind, threshold=self.reference_threshold)[0]
+        reused = [m for m in matches if m.score >= self.reuse_threshold]
+        return reused, matches[len(reused):]
+
@@ -2,8 +2,12 @@
 
 from __future__ import annotations
 
-from typing import Optional, List, Literal, Dict, Union
-from pydantic import BaseModel, ConfigDict
+from typing import Annotated, Any, Optional, List, Literal, Dict, Union
+from pydantic import BaseModel, ConfigDict, Discriminator, Tag
+
+
+# 题型（同时作为 Example 各子类型的 type 标签）
+QuestionType = Literal["multiple_choice", "fill_blank", "proof", "short_answer", "code"]
 
 
 class BaseExample(BaseModel):
@@ -20,6 +24,8 @@ class MultipleChoiceQuestion(BaseExample):
     """选择题"""
     model_config = ConfigDict(strict=False)
     
+    type: Literal["multiple_choice"] = "multiple_choice"  # 题型标签，用于区分联合类型
+    
     answer_id: Optional[str] = None  # answer字段的ID
     explanation_id: Optional[str] = None  # explanation字段的ID
     
@@ -32,6 +38,8 @@ class FillBlankQuestion(BaseExample):
     """填空题"""
     model_config = ConfigDict(strict=False)
     
+    type: Literal["fill_blank"] = "fill_blank"  # 题型标签，用于区分联合类型
+    
     answer_id: Optional[str] = None  # answer字段的ID
     explanation_id: Optional[str] = None  # explanation字段的ID
     
@@ -45,6 +53,8 @@ class ProofQuestion(BaseExample):
     """证明题"""
     model_config = ConfigDict(strict=False)
     
+    type: Literal["proof"] = "proof"  # 题型标签，用于区分联合类型
+    
     proof_id: Optional[str] = None  # proof字段的ID
     proof: str  # 证明步骤（必需）
 
@@ -53,6 +63,8 @@ class ShortAnswerQuestion(BaseExample):
     """简答题"""
     model_config = ConfigDict(strict=False)
     
+    type: Literal["short_answer"] = "short_answer"  # 题型标签，用于区分联合类型
+    
     answer_id: Optional[str] = None  # answer字段的ID
     explanation_id: Optional[str] = None  # explanation字段的ID
     
@@ -64,6 +76,8 @@ class CodeQuestion(BaseExample):
     """代码题"""
     model_config = ConfigDict(strict=False)
     
+    type: Literal["code"] = "code"  # 题型标签，用于区分联合类型
+    
     answer_id: Optional[str] = None  # answer字段的ID
     explanation_id: Optional[str] = None  # explanation字段的ID
     
@@ -71,13 +85,41 @@ class CodeQuestion(BaseExample):
     explanation: Optional[str] = None  # 解释（可选）
 
 
+# 旧数据没有 type 字段时，按各题型特有的必需字段推断题型（按顺序检查）
+_LEGACY_TYPE_FIELDS = (
+    ("options", "multiple_choice"),
+    ("blanks", "fill_blank"),
+    ("code_answer", "code"),
+    ("proof", "proof"),
+    ("answer", "short_answer"),
+)
+
+
+def _example_type(value: Any) -> Optional[str]:
+    """取出题目的 type 标签，没有标签时根据字段推断"""
+    if isinstance(value, dict):
+        tag, has_field = value.get("type"), value.__contains__
+    else:
+        tag, has_field = getattr(value, "type", None), lambda name: hasattr(value, name)
+    if tag is not None:
+        return tag
+    for field, question_type in _LEGACY_TYPE_FIELDS:
+        if has_field(field):
+            return question_type
+    return None
+
+
 # 类型别名：Example 可以是任意一种题目类型
-Example = Union[
-    MultipleChoiceQuestion,
-    FillBlankQuestion,
-    ProofQuestion,
-    ShortAnswerQuestion,
-    CodeQuestion
+# 按 type 标签直接选择子类型（带标签的联合类型），不再逐个尝试；没有标签的旧数据由 _example_type 推断
+Example = Annotated[
+    Union[
+        Annotated[MultipleChoiceQuestion, Tag("multiple_choice")],
+        Annotated[FillBlankQuestion, Tag("fill_blank")],
+        Annotated[ProofQuestion, Tag("proof")],
+        Annotated[ShortAnswerQuestion, Tag("short_answer")],
+        Annotated[CodeQuestion, Tag("code")],
+    ],
+    Discriminator(_example_type),
 ]
 
 
@@ -88,6 +130,29 @@ class ExerciseList(BaseModel):
     exercises: List[Example]  # 练习题列表（必需）
 
 
+class ExerciseRefs(BaseModel):
+    """exercise_agent 的输出：按顺序列出出题工具返回的题目 ID，题目内容由代码从运行中的 ArtifactTable 取出"""
+    model_config = ConfigDict(strict=False)
+    
+    exercise_ids: List[str]  # 题目的 id（必需，按难度递增排列）
+
+
+class ExerciseSlot(BaseModel):
+    """出题计划中的一道题：题型 + 难度"""
+    model_config = ConfigDict(strict=False)
+    
+    question_type: QuestionType  # 题型（必需）
+    level: int  # 难度等级（必需，从 1 开始，数字越大越难）
+    focus: Optional[str] = None  # 这道题考察的具体要点（可选，用于避免并发生成的题目重复）
+
+
+class ExercisePlan(BaseModel):
+    """出题计划"""
+    model_config = ConfigDict(strict=False)
+    
+    slots: List[ExerciseSlot]  # 题目列表（必需）
+
+
 class Definition(BaseModel):
     """定义"""
     model_config = ConfigDict(strict=False)
@@ -117,6 +182,17 @@ class Summary(BaseModel):
     summary: str  # 总结内容（必需）
 
 
+class Introduction(BaseModel):
+    """章节标题与介绍"""
+    model_config = ConfigDict(strict=False)
+    
+    section_title_id: Optional[str] = None  # section_title字段的ID
+    introduction_id: Optional[str] = None  # introduction字段的ID
+    
+    section_title: str  # 章节标题（必需）
+    introduction: str  # 章节介绍（必需）
+
+
 class ConceptBlock(BaseModel):
     """概念块：一个定义及其相关的例子、笔记、定理等"""
     model_config = ConfigDict(strict=False)
@@ -125,6 +201,7 @@ class ConceptBlock(BaseModel):
     id: Optional[str] = None  # 唯一ID，如 "concept_block_ghi789"
     definition_id: Optional[str] = None  # definition字段的ID
     
+    name: Optional[str] = None  # 概念名称，如 "定义域"（可选）
     definition: str  # 定义（必需）
     examples: List[Example] = []  # 相关例子列表
     notes: List[str] = []  # 相关笔记/注意点（可选）
@@ -148,5 +225,64 @@ class Section(BaseModel):
     theorems: List[Theorem] = []  # 定理列表（0到多个）
     examples: List[Example] = []  # 例子/练习题列表（3-5个）
     summary: str  # 总结
+    concept_ids: List[str] = []  # 引用的共享概念块 ID（见 Chapter.concepts）
+
+
+class SectionRefs(BaseModel):
+    """section_agent 的输出：标题和介绍由编排 agent 撰写，其余部分只引用工具返回结果的 ID，由代码组装成 Section"""
+    model_config = ConfigDict(strict=False)
+    
+    section_title: str  # 章节标题（必需）
+    introduction: str  # 章节介绍（必需）
+    definition_id: str  # generate_definition 返回的 definition_id（必需）
+    theorem_ids: List[str] = []  # generate_theorem 返回的 id 列表（0到多个）
+    example_ids: List[str] = []  # generate_exercises 返回的各题目的 id（3-5个，由浅入深）
+    summary_id: str  # generate_summary 返回的 summary_id（必需）
+
+
+class SectionPlan(BaseModel):
+    """章的规划中的一节"""
+    model_config = ConfigDict(strict=False)
+    
+    title: str  # 本节主题（必需）
+    concepts: List[str] = []  # 本节涉及的概念名称，第一个为本节的核心概念
+    focus: Optional[str] = None  # 本节的侧重点（可选）
+    introduction: Optional[str] = None  # 本节的简短介绍（可选，给出时不再单独生成）
+
+
+class ChapterPlan(BaseModel):
+    """章的规划：标题、介绍、共享概念和各节主题"""
+    model_config = ConfigDict(strict=False)
+    
+    chapter_title: str  # 章标题（必需）
+    introduction: str  # 章介绍（必需）
+    concepts: List[str] = []  # 在多个节中用到、整章只定义一次的概念
+    sections: List[SectionPlan]  # 各节（必需，按学习顺序排列）
+
+
+class Chapter(BaseModel):
+    """章：共享的概念块和若干节"""
+    model_config = ConfigDict(strict=False)
+    
+    # ID字段（用于精确定位，支持向后兼容）
+    id: Optional[str] = None  # 唯一ID，如 "chapter_mno345"
+    chapter_title_id: Optional[str] = None  # chapter_title字段的ID
+    introduction_id: Optional[str] = None  # introduction字段的ID
+    
+    chapter_title: str
+    introduction: str  # 介绍
+    concepts: List[ConceptBlock] = []  # 共享概念块，各节通过 Section.concept_ids 引用
+    sections: List[Section] = []  # 节列表
+
+
+class Notebook(BaseModel):
+    """笔记本：若干章"""
+    model_config = ConfigDict(strict=False)
+    
+    id: Optional[str] = None  # 唯一ID，如 "notebook_pqr678"
+    title_id: Optional[str] = None  # title字段的ID
+    
+    title: str
+    chapters: List[Chapter] = []  # 章列表
 
 
@@ -0,0 +1,320 @@
+"""Model routing - 按 agent 选择模型档位，超出延迟预算或出错时降级到更快的档位
+
+所有 agent 默认使用同一个模型，但 fill_blank / multiple_choice 的输出很短，不需要
+proof / theorem 所用的重型模型。ModelRouter 按路由配置为每个 agent（注册表中的名称）指定：
+- tier：首选的模型档位
+- budget：每次调用的延迟预算（秒），首选档位超出预算或抛出异常时，依次改用更快的档位；
+  最后一个档位不设预算，保证总能得到结果
+- fallback：降级顺序，默认取 order 中排在 tier 之后的档位（order 按从慢到快排列）
+
+每次尝试都记录一条 RouteDecision（agent、档位、模型、结果、耗时、token），写入日志、
+model_route 自定义 span，以及可选的 JSONL 文件，便于按 agent 比较各档位的质量与延迟。
+内存中只保留最近 keep_decisions 条记录，summary 的统计在记录时累加，长时间运行的批量任务内存不会随调用次数增长。
+
+配置格式（JSON）：
+    {
+      "order": ["heavy", "standard", "fast"],
+      "tiers": {"heavy": {"model": "gpt-4.1"}, "standard": {"model": null}, "fast": {"model": "gpt-4.1-nano"}},
+      "default": {"tier": "standard", "budget": 60},
+      "agents": {"fill_blank": {"tier": "fast", "budget": 20}, "proof": {"tier": "heavy", "budget": 90}}
+    }
+tiers 中 model 为 null 表示 SDK 的默认模型。
+
+用法：
+    from agentRegistry import set_model_router
+    router = ModelRouter.from_file("routing.json", provider=provider, log_path="output/routing.jsonl")
+    set_model_router(router)  # 之后 get_agent 返回的 agent 都经过路由
+
+离线测试时可以为每个档位指定不同速度的假模型：
+    ModelRouter(config, providers={"heavy": StubModelProvider(latency=2.0), "fast": StubModelProvider(latency=0.1)})
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+from agents import Model, ModelProvider, ModelResponse, MultiProvider
+from agents.tracing import custom_span, get_current_trace
+
+
+logger = logging.getLogger(__name__)
+
+# 自定义 span 名称
+MODEL_ROUTE = "model_route"
+
+# 默认路由：题干简短的题型和总结走快速档位，证明和定理走重型档位
+DEFAULT_ROUTING: Dict[str, Any] = {
+    "order": ["heavy", "standard", "fast"],
+    "tiers": {
+        "heavy": {"model": "gpt-4.1"},
+        "standard": {"model": "gpt-4.1-mini"},
+        "fast": {"model": "gpt-4.1-nano"},
+    },
+    "default": {"tier": "standard", "budget": 60},
+    "agents": {
+        "fill_blank": {"tier": "fast", "budget": 20},
+        "multiple_choice": {"tier": "fast", "budget": 20},
+        "short_answer": {"tier": "fast", "budget": 30},
+        "summary": {"tier": "fast", "budget": 30},
+        "introduction": {"tier": "fast", "budget": 30},
+        "theorem": {"tier": "heavy", "budget": 90},
+        "proof": {"tier": "heavy", "budget": 90},
+    },
+}
+
+
+@dataclass
+class Route:
+    """一个 agent 的路由：首选档位、每次尝试的延迟预算和降级顺序"""
+    tier: str
+    budget: Optional[float] = None
+    fallback: Optional[List[str]] = None
+
+
+@dataclass
+class RouteDecision:
+    """一次模型调用尝试的记录"""
+    agent: str
+    tier: str
+    model: Optional[str]
+    attempt: int
+    outcome: str  # ok / timeout / error
+    seconds: float
+    budget: Optional[float] = None
+    error: Optional[str] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    trace_id: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+
+
+class ModelRouter:
+    """按 agent 名称选择模型档位并在超时或出错时降级
+
+    Args:
+        config: 路由配置，格式见模块文档
+        provider: 把档位的模型名解析为 Model 的 provider，默认为 SDK 的 MultiProvider；
+            需要限流时传入 RateLimitedModelProvider
+        providers: 按档位覆盖 provider，用于离线测试不同速度的假模型
+        log_path: 追加写入 RouteDecision 的 JSONL 文件，None 表示只记日志
+        keep_decisions: decisions 中保留的最近记录数；完整记录见 log_path
+    """
+
+    def __init__(
+        self,
+        config: Optional[Dict[str, Any]] = None,
+        provider: Optional[ModelProvider] = None,
+        providers: Optional[Dict[str, ModelProvider]] = None,
+        log_path: Optional[Union[str, Path]] = None,
+        keep_decisions: int = 1000,
+    ):
+        config = config or DEFAULT_ROUTING
+        self.tiers: Dict[str, Optional[str]] = {name: tier.get("model") for name, tier in config["tiers"].items()}
+        self.order: List[str] = list(config.get("order") or self.tiers)
+        self.default = Route(**config.get("default", {"tier": self.order[0]}))
+        self.routes: Dict[str, Route] = {name: Route(**route) for name, route in config.get("agents", {}).items()}
+        for route in [self.default, *self.routes.values()]:
+            unknown = [tier for tier in [route.tier, *(route.fallback or [])] if tier not in self.tiers]
+            if unknown:
+                raise ValueError(f"Unknown model tier(s) {unknown}, expected one of {sorted(self.tiers)}")
+
+        self.provider = provider or MultiProvider()
+        self.providers = providers or {}
+        self.log_path = Path(log_path) if log_path is not None else None
+        self.decisions: Deque[RouteDecision] = deque(maxlen=keep_decisions)
+        # (agent, 档位) -> 累计统计，见 summary
+        self._stats: Dict[Tuple[str, str], Dict[str, float]] = defaultdict(
+            lambda: {"attempts": 0, "ok": 0, "timeout": 0, "error": 0, "seconds": 0.0}
+        )
+        self._models: Dict[str, Model] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path], **kwargs) -> "ModelRouter":
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")), **kwargs)
+
+    def route(self, agent_name: str) -> Route:
+        return self.routes.get(agent_name, self.default)
+
+    def chain(self, agent_name: str) -> List[str]:
+        """agent 依次尝试的档位：首选档位加降级顺序"""
+        route = self.route(agent_name)
+        if route.fallback is not None:
+            fallback = route.fallback
+        elif route.tier in self.order:
+            fallback = self.order[self.order.index(route.tier) + 1:]
+        else:
+            fallback = []
+        return list(dict.fromkeys([route.tier, *fallback]))
+
+    def tier_model(self, tier: str) -> Model:
+        """档位对应的 Model，每个档位只解析一次"""
+        model = self._models.get(tier)
+        if model is None:
+            with self._lock:
+                if tier not in self._models:
+                    provider = self.providers.get(tier, self.provider)
+                    self._models[tier] = provider.get_model(self.tiers[tier])
+                model = self._models[tier]
+        return model
+
+    def model_for(self, agent_name: str) -> "RoutedModel":
+        """agent 使用的路由模型（由 agentRegistry.get_agent 设置到 agent.model 上）"""
+        return RoutedModel(self, agent_name)
+
+    # ---------- 记录 ----------
+
+    def record(self, decision: RouteDecision) -> None:
+        with self._lock:
+            self.decisions.append(decision)
+            item = self._stats[(decision.agent, decision.tier)]
+            item["attempts"] += 1
+            item[decision.outcome] += 1
+            if decision.outcome == "ok":
+                item["seconds"] += decision.seconds
+        data = asdict(decision)
+        # span 只作为携带路由记录的标记，调用耗时见 data 中的 seconds
+        with custom_span(MODEL_ROUTE, data=data):
+            pass
+        if decision.outcome == "ok":
+            # 首选档位直接成功的调用很多，只在降级后成功时记 info
+            logger.log(
+                logging.INFO if decision.attempt > 1 else logging.DEBUG,
+                "Routed %s to %s (attempt %d) in %.2fs",
+                decision.agent, decision.tier, decision.attempt, decision.seconds,
+            )
+        else:
+            logger.warning(
+                "Route %s -> %s failed with %s after %.2fs%s",
+                decision.agent, decision.tier, decision.outcome, decision.seconds,
+                f": {decision.error}" if decision.error else "",
+            )
+        if self.log_path is not None:
+            line = json.dumps(data, ensure_ascii=False) + "\n"
+            with self._lock:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(line)
+
+    def summary(self) -> Dict[Tuple[str, str], Dict[str, float]]:
+        """(agent, 档位) -> 尝试次数、成功次数、超时次数、出错次数和成功调用的平均耗时"""
+        with self._lock:
+            stats = {key: dict(item) for key, item in self._stats.items()}
+        for item in stats.values():
+            item["mean_seconds"] = item.pop("seconds") / item["ok"] if item["ok"] else 0.0
+        return stats
+
+
+class RoutedModel(Model):
+    """按 ModelRouter 的路由依次尝试各档位的 Model"""
+
+    def __init__(self, router: ModelRouter, agent_name: str):
+        self.router = router
+        self.agent_name = agent_name
+
+    def __repr__(self) -> str:
+        # agentCache 用 str(model) 作为缓存键的一部分，这里保证跨进程稳定
+        return f"RoutedModel({self.agent_name}: {' -> '.join(self.router.chain(self.agent_name))})"
+
+    def _decision(self, tier: str, attempt: int, outcome: str, started: float, **kwargs) -> RouteDecision:
+        trace = get_current_trace()
+        return RouteDecision(
+            agent=self.agent_name,
+            tier=tier,
+            model=self.router.tiers[tier],
+            attempt=attempt,
+            outcome=outcome,
+            seconds=time.monotonic() - started,
+            budget=self.router.route(self.agent_name).budget,
+            trace_id=trace.trace_id if trace is not None else None,
+            **kwargs,
+        )
+
+    async def get_response(
+        self,
+        system_instructions,
+        input,
+        model_settings,
+        tools,
+        output_schema,
+        handoffs,
+        tracing,
+        **kwargs,
+    ) -> ModelResponse:
+        chain = self.router.chain(self.agent_name)
+        budget = self.router.route(self.agent_name).budget
+        for attempt, tier in enumerate(chain, 1):
+            last = attempt == len(chain)
+            started = time.monotonic()
+            call = self.router.tier_model(tier).get_response(
+                system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs
+            )
+            try:
+                if budget is None or last:
+                    response = await call
+                else:
+                    response = await asyncio.wait_for(call, budget)
+            except asyncio.TimeoutError:
+                self.router.record(self._decision(tier, attempt, "timeout", started))
+                continue
+            except Exception as error:
+                self.router.record(self._decision(tier, attempt, "error", started, error=repr(error)))
+                if last:
+                    raise
+                continue
+            self.router.record(self._decision(
+                tier, attempt, "ok", started,
+                input_tokens=response.usage.input_tokens,
+                output_tokens=response.usage.output_tokens,
+            ))
+            return response
+        raise AssertionError("unreachable: the last tier has no budget")
+
+    async def stream_response(
+        self,
+        system_instructions,
+        input,
+        model_settings,
+        tools,
+        output_schema,
+        handoffs,
+        tracing,
+        **kwargs,
+    ):
+        # 已经开始输出的流不能再换档位，因此预算只约束第一个事件到达之前的时间
+        chain = self.router.chain(self.agent_name)
+        budget = self.router.route(self.agent_name).budget
+        for attempt, tier in enumerate(chain, 1):
+            last = attempt == len(chain)
+            started = time.monotonic()
+            stream = self.router.tier_model(tier).stream_response(
+                system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs
+            )
+            try:
+                if budget is None or last:
+                    first = await stream.__anext__()
+                else:
+                    first = await asyncio.wait_for(stream.__anext__(), budget)
+            except StopAsyncIteration:
+                self.router.record(self._decision(tier, attempt, "ok", started))
+                return
+            except asyncio.TimeoutError:
+                await stream.aclose()
+                self.router.record(self._decision(tier, attempt, "timeout", started))
+                continue
+            except Exception as error:
+                self.router.record(self._decision(tier, attempt, "error", started, error=repr(error)))
+                if last:
+                    raise
+                continue
+            self.router.record(self._decision(tier, attempt, "ok", started))
+            yield first
+            async for event in stream:
+                yield event
+            return
@@ -0,0 +1,146 @@
+"""OpenAI client - 所有 agent 共用的 HTTP 连接池和 RunConfig 工厂
+
+不做配置时，每个 Runner.run（包括 as_tool 嵌套的子运行）都使用 SDK 默认创建的客户端，
+连接数、keep-alive 和超时都是 openai 库的默认值：空闲连接 5 秒就被关闭，读超时长达 10 分钟。
+几十个子 agent 同时发起请求时，这会导致连接频繁重建，卡住的请求也要很久才会失败。
+
+这里用 ClientSettings 显式设置连接池上限、keep-alive 时长和各阶段超时：
+- configure_client 创建共用的 AsyncOpenAI 客户端，并设为 SDK 的默认客户端，
+  notebook 中不传 run_config 的 Runner.run 也会使用它
+- make_run_config 返回使用这个客户端的 RunConfig；as_tool 的子运行继承父运行的 run_config，
+  因此整棵 agent 树共用同一个连接池
+
+HTTP/2 需要安装 h2（pip install httpx[http2]），没有安装时退回 HTTP/1.1。
+
+用法：
+    from openaiClient import ClientSettings, configure_client, make_run_config
+    configure_client(ClientSettings(max_connections=64, read_timeout=120))
+    section = await build_section("函数的定义域", run_config=make_run_config())
+"""
+
+import importlib.util
+import logging
+from dataclasses import dataclass
+from typing import Any, Optional
+
+try:  # openai 3.x 基于 httpx2，之前的版本基于 httpx
+    import httpx2 as httpx
+except ImportError:
+    import httpx
+from openai import AsyncOpenAI
+
+from agents import ModelProvider, MultiProvider, RunConfig, set_default_openai_client
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ClientSettings:
+    """共用客户端的连接池和超时设置
+
+    Args:
+        base_url: API 地址，None 表示使用 OPENAI_BASE_URL 或官方地址
+        api_key: API Key，None 表示使用 OPENAI_API_KEY
+        max_connections: 同时打开的连接数上限，超出的请求在池中排队
+        max_keepalive_connections: 保持空闲的连接数上限；不小于并发数时，突发的并发请求不会反复建连
+        keepalive_expiry: 空闲连接保留的时间（秒）
+        connect_timeout: 建立连接的超时（秒）
+        read_timeout: 等待响应数据的超时（秒）
+        write_timeout: 发送请求的超时（秒）
+        pool_timeout: 在池中等待空闲连接的超时（秒）
+        http2: 是否启用 HTTP/2（同一连接上多路复用请求）
+        max_retries: openai 库自带的重试次数（连接错误、5xx 等）
+    """
+    base_url: Optional[str] = None
+    api_key: Optional[str] = None
+    max_connections: int = 64
+    max_keepalive_connections: int = 64
+    keepalive_expiry: float = 60.0
+    connect_timeout: float = 10.0
+    read_timeout: float = 180.0
+    write_timeout: float = 30.0
+    pool_timeout: float = 60.0
+    http2: bool = False
+    max_retries: int = 2
+
+
+def create_http_client(settings: ClientSettings, **kwargs: Any) -> httpx.AsyncClient:
+    """按 settings 创建 httpx.AsyncClient，kwargs 原样传给 httpx（如 event_hooks）"""
+    http2 = settings.http2
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP/2 requested but h2 is not installed, falling back to HTTP/1.1 (pip install httpx[http2])")
+        http2 = False
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.connect_timeout,
+            read=settings.read_timeout,
+            write=settings.write_timeout,
+            pool=settings.pool_timeout,
+        ),
+        http2=http2,
+        **kwargs,
+    )
+
+
+def create_client(settings: Optional[ClientSettings] = None, **kwargs: Any) -> AsyncOpenAI:
+    """按 settings 创建一个独立的 AsyncOpenAI 客户端（不修改共用客户端）"""
+    settings = settings or ClientSettings()
+    return AsyncOpenAI(
+        api_key=settings.api_key,
+        base_url=settings.base_url,
+        max_retries=settings.max_retries,
+        http_client=create_http_client(settings, **kwargs),
+    )
+
+
+# configure_client 创建的共用客户端
+_client: Optional[AsyncOpenAI] = None
+
+
+def configure_client(settings: Optional[ClientSettings] = None, set_default: bool = True) -> AsyncOpenAI:
+    """创建共用客户端；set_default 为 True 时同时设为 SDK 的默认客户端"""
+    global _client
+    _client = create_client(settings)
+    if set_default:
+        # trace 上报有自己的客户端，这里只替换模型请求使用的客户端
+        set_default_openai_client(_client, use_for_tracing=False)
+    return _client
+
+
+def get_client() -> AsyncOpenAI:
+    """返回共用客户端，尚未配置时按默认设置创建"""
+    return _client if _client is not None else configure_client()
+
+
+def make_provider(client: Optional[AsyncOpenAI] = None) -> ModelProvider:
+    """使用 client（默认为共用客户端）的 MultiProvider，保留 SDK 按模型名前缀选择 provider 的行为"""
+    return MultiProvider(openai_client=client or get_client())
+
+
+def make_run_config(
+    client: Optional[AsyncOpenAI] = None,
+    provider: Optional[ModelProvider] = None,
+    **kwargs: Any,
+) -> RunConfig:
+    """返回使用共用客户端的 RunConfig
+
+    Args:
+        client: 使用的客户端，默认为共用客户端
+        provider: 直接指定 model_provider（例如包装过的 RateLimitedModelProvider），此时忽略 client
+        kwargs: 其余 RunConfig 参数
+    """
+    return RunConfig(model_provider=provider or make_provider(client), **kwargs)
+
+
+async def close_client() -> None:
+    """关闭共用客户端的连接池"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,345 @@
+"""Output repair - 在 pydantic 校验之前修复结构化输出中常见的小错误
+
+所有子 agent 都使用 strict_json_schema=False 的输出 schema，模型经常给出"差一点"合法的输出：
+JSON 前后带说明文字或代码块标记、proof 中的 LaTeX 反斜杠没有转义、options 是一整个字符串、
+blanks 是列表等。以前这些都会让整个运行失败（或在 section_agent 中多一轮工具调用）。
+
+RepairingOutputSchema 包装 agent 的输出 schema，在 SDK 校验模型输出之前先在本地修复：
+- 提取：去掉 JSON 前后的说明文字和代码块标记，去掉对象和数组末尾多余的逗号
+- 转义：字符串中非法的反斜杠转义（\\alpha、\\( 等）改为字面反斜杠；\\frac、\\theta、\\neq 这类
+  恰好以合法转义字符开头的 LaTeX 命令也按 LaTeX 处理（否则会被解析成换页符、制表符、换行符）；
+  字符串中未转义的换行符改为 \\n
+- 类型：按目标 JSON schema 转换类型——字符串拆成列表（options）、列表转成字典（blanks）、
+  数字转成字符串、字符串列表合并成一段文字、"3" 转成 3，以及拆掉多余的一层包装对象
+
+合法的输出直接交给原 schema 校验，只有校验失败（或含有会被解析成控制字符的 LaTeX 命令）时才做修复；
+修复后仍然无法通过校验的输出才算失败；agentRunner.run_agent 会带着错误信息重新请求一次模型。
+修复和重新请求的次数按 agent 名称记录在 repair_stats 中，并发出 output_repair 自定义 span。
+
+agentRegistry.get_agent 构造的所有 agent 都会自动包装，不需要修改各 agent 的定义。
+"""
+
+import json
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from agents import AgentOutputSchemaBase
+from agents.exceptions import ModelBehaviorError
+from agents.tracing import custom_span
+
+from ExerciseCreator.exerciseValidator import PLACEHOLDER
+
+
+# 自定义 span 名称
+OUTPUT_REPAIR = "output_repair"
+
+# JSON 字符串字面量（允许其中有非法转义和未转义的换行）
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.S)
+_ESCAPE = re.compile(r"\\(u[0-9a-fA-F]{4}|[A-Za-z]+|.)", re.S)
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+_FENCE = re.compile(r"^\s*```[\w-]*\s*\n?|\n?```\s*$")
+# 以 \n、\r、\t 开头的常见 LaTeX 命令（\b、\f 后面跟字母时一律按 LaTeX 处理）
+_LATEX_NRT = {
+    "ne", "neq", "neg", "nabla", "not", "notin", "nu", "nmid", "nleq", "ngeq", "nexists", "newline",
+    "right", "rightarrow", "rho", "rangle", "rfloor", "rceil",
+    "theta", "times", "tau", "tan", "tanh", "text", "textbf", "textit", "textrm", "to", "top",
+    "triangle", "tfrac", "tilde", "therefore",
+}
+# JSON 合法、但其中的 LaTeX 命令会被解析成控制字符（如 "\frac" 中的 \f）；反斜杠个数为奇数时才是转义
+_LATEX_CONTROL = re.compile(
+    r"(\\+)(?:[bf][A-Za-z]|(?:" + "|".join(sorted(_LATEX_NRT)) + r")(?![A-Za-z]))"
+)
+# 选项开头的字母标号，用于把一整个字符串拆成选项
+_OPTION_START = re.compile(r"\s+(?=[A-H]\s*[.．、:：)）])")
+
+
+class RepairStats:
+    """按 agent 名称统计修复、失败和重新请求的次数"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.repaired: Dict[str, int] = defaultdict(int)
+        self.failed: Dict[str, int] = defaultdict(int)
+        self.reasked: Dict[str, int] = defaultdict(int)
+        # 修复类型 -> 次数
+        self.fixes: Dict[str, int] = defaultdict(int)
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        return {
+            "repaired": dict(self.repaired),
+            "failed": dict(self.failed),
+            "reasked": dict(self.reasked),
+            "fixes": dict(self.fixes),
+        }
+
+
+# 全进程共用的统计
+repair_stats = RepairStats()
+
+
+def _has_latex_control(text: str) -> bool:
+    if "\\" not in text:
+        return False
+    return any(len(match.group(1)) % 2 for match in _LATEX_CONTROL.finditer(text))
+
+
+def _fix_escape(match: "re.Match", fixes: List[str]) -> str:
+    escape = match.group(1)
+    head = escape[0]
+    if escape.startswith("u") and len(escape) == 5 and re.fullmatch(r"u[0-9a-fA-F]{4}", escape):
+        return match.group(0)
+    if head in "\"\\/":
+        return match.group(0)
+    if head in "bf" and len(escape) > 1:
+        fixes.append("latex_escape")
+        return "\\\\" + escape
+    if head in "nrt" and escape in _LATEX_NRT:
+        fixes.append("latex_escape")
+        return "\\\\" + escape
+    if head in "bfnrt":
+        return match.group(0)
+    fixes.append("invalid_escape")
+    return "\\\\" + escape
+
+
+def _fix_string(literal: str, fixes: List[str]) -> str:
+    body = _ESCAPE.sub(lambda match: _fix_escape(match, fixes), literal[1:-1])
+    if any(char in body for char in "\n\r\t"):
+        fixes.append("control_char")
+        body = body.replace("\n", "\\n").replace("\r", "\\r").replace("\t", "\\t")
+    return f'"{body}"'
+
+
+def normalize_json(text: str) -> Tuple[str, List[str]]:
+    """修复字符串中的转义和控制字符，去掉字符串外多余的逗号，返回 (新文本, 修复类型列表)"""
+    fixes: List[str] = []
+    parts = []
+    position = 0
+    for match in [*_STRING.finditer(text), None]:
+        # 字符串之间的部分只需要去掉多余的逗号
+        gap, removed = _TRAILING_COMMA.subn(r"\1", text[position:match.start() if match else len(text)])
+        parts.append(gap)
+        if removed:
+            fixes.append("trailing_comma")
+        if match is not None:
+            parts.append(_fix_string(match.group(0), fixes))
+            position = match.end()
+    return "".join(parts), fixes
+
+
+def extract_json(text: str) -> Tuple[Any, List[str]]:
+    """从模型输出中取出第一个 JSON 对象或数组，返回 (解析结果, 修复类型列表)；找不到时抛出 ValueError"""
+    stripped = _FENCE.sub("", text.strip())
+    fixes = ["code_fence"] if stripped != text.strip() else []
+    normalized, escape_fixes = normalize_json(stripped)
+    fixes += escape_fixes
+    starts = [index for index in (normalized.find("{"), normalized.find("[")) if index >= 0]
+    if not starts:
+        raise ValueError("no JSON object found in output")
+    start = min(starts)
+    value, end = json.JSONDecoder().raw_decode(normalized, start)
+    if normalized[:start].strip() or normalized[end:].strip():
+        fixes.append("extra_text")
+    return value, fixes
+
+
+def _resolve(schema: Dict[str, Any], root: Dict[str, Any]) -> Dict[str, Any]:
+    while "$ref" in schema:
+        name = schema["$ref"].rsplit("/", 1)[-1]
+        schema = root.get("$defs", {}).get(name, {})
+    return schema
+
+
+def _pick_branch(value: Dict[str, Any], branches: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """联合类型中按 type 标签选择分支，没有标签时选择必需字段重合最多的分支"""
+    tag = value.get("type")
+    for branch in branches:
+        if tag is not None and branch.get("properties", {}).get("type", {}).get("const") == tag:
+            return branch
+    return max(branches, key=lambda branch: len(set(branch.get("required", [])) & set(value)))
+
+
+def _split_text(text: str) -> List[str]:
+    """把一整个字符串拆成列表：按行、分号或选项标号拆分"""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if len(lines) > 1:
+        return lines
+    parts = [part.strip() for part in re.split(r"[;；]", text) if part.strip()]
+    if len(parts) > 1:
+        return parts
+    parts = [part.strip() for part in _OPTION_START.split(text.strip()) if part.strip()]
+    return parts if len(parts) > 1 else [text]
+
+
+def _list_to_map(value: List[Any], context: Optional[str]) -> Optional[Dict[str, Any]]:
+    """把列表转成字典：[{"[空1]": "x"}, ...]、[{"key": ..., "value": ...}, ...] 或按题干中的占位符对应的答案列表"""
+    if all(isinstance(item, dict) and len(item) == 1 for item in value):
+        return {key: item[key] for item in value for key in item}
+    if all(isinstance(item, dict) and len(item) == 2 for item in value):
+        return {str(list(item.values())[0]): list(item.values())[1] for item in value}
+    if all(not isinstance(item, (dict, list)) for item in value):
+        keys = list(dict.fromkeys(PLACEHOLDER.findall(context or "")))
+        if len(keys) != len(value):
+            keys = [f"[空{i}]" for i in range(1, len(value) + 1)]
+        return dict(zip(keys, value))
+    return None
+
+
+def coerce(value: Any, schema: Dict[str, Any], root: Dict[str, Any], fixes: List[str], context: Optional[str] = None) -> Any:
+    """按 JSON schema 转换 value 的类型，转换记录在 fixes 中；无法转换的部分原样返回"""
+    schema = _resolve(schema, root)
+    branches = schema.get("anyOf") or schema.get("oneOf")
+    if branches:
+        branches = [_resolve(branch, root) for branch in branches]
+        if value is None and any(branch.get("type") == "null" for branch in branches):
+            return None
+        branches = [branch for branch in branches if branch.get("type") != "null"]
+        if len(branches) == 1:
+            return coerce(value, branches[0], root, fixes, context)
+        if isinstance(value, dict):
+            return coerce(value, _pick_branch(value, branches), root, fixes, context)
+        return value
+
+    expected = schema.get("type")
+    if expected == "object":
+        properties = schema.get("properties", {})
+        additional = schema.get("additionalProperties")
+        if isinstance(value, list) and not properties and isinstance(additional, dict):
+            mapped = _list_to_map(value, context)
+            if mapped is not None:
+                fixes.append("list_to_object")
+                value = mapped
+        elif isinstance(value, list) and properties:
+            # 整个输出只是对象中唯一的数组字段（如 ExerciseList 只给出了 exercises 的内容）
+            arrays = [name for name in schema.get("required", []) if _resolve(properties[name], root).get("type") == "array"]
+            if len(schema.get("required", [])) == 1 and arrays:
+                fixes.append("wrap_object")
+                value = {arrays[0]: value}
+        if isinstance(value, dict) and properties:
+            required = schema.get("required", [])
+            if required and not any(name in value for name in required) and len(value) == 1:
+                inner = next(iter(value.values()))
+                if isinstance(inner, dict) and any(name in inner for name in required):
+                    # 多了一层包装，如 {"MultipleChoiceQuestion": {...}}
+                    fixes.append("unwrap_object")
+                    value = inner
+        if isinstance(value, dict):
+            question = value.get("question") if isinstance(value.get("question"), str) else context
+            value = dict(value)
+            for name, item in value.items():
+                if name in properties:
+                    value[name] = coerce(item, properties[name], root, fixes, question)
+                elif isinstance(additional, dict):
+                    value[name] = coerce(item, additional, root, fixes, question)
+        return value
+
+    if expected == "array":
+        items = schema.get("items", {})
+        if isinstance(value, str):
+            fixes.append("string_to_list")
+            value = _split_text(value)
+        elif isinstance(value, dict) and _resolve(items, root).get("type") == "string":
+            # {"A": "R", "B": "..."} 形式的选项
+            fixes.append("object_to_list")
+            value = [f"{key}. {item}" if re.fullmatch(r"[A-Ha-h]", str(key)) else item for key, item in value.items()]
+        if isinstance(value, list):
+            value = [coerce(item, items, root, fixes, context) for item in value]
+        return value
+
+    if expected == "string":
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            fixes.append("number_to_string")
+            return str(value)
+        if isinstance(value, list) and all(isinstance(item, str) for item in value):
+            fixes.append("list_to_string")
+            return "\n".join(value)
+        return value
+
+    if expected in ("integer", "number") and isinstance(value, str):
+        try:
+            number = float(value.strip())
+        except ValueError:
+            return value
+        fixes.append("string_to_number")
+        return int(number) if expected == "integer" and number.is_integer() else number
+    if expected == "integer" and isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def repair_json(text: str, schema: Dict[str, Any]) -> Tuple[str, List[str]]:
+    """修复模型输出，返回 (修复后的 JSON 文本, 修复类型列表)；没有需要修复的地方时修复列表为空"""
+    value, fixes = extract_json(text)
+    value = coerce(value, schema, schema, fixes)
+    return json.dumps(value, ensure_ascii=False), fixes
+
+
+class RepairingOutputSchema(AgentOutputSchemaBase):
+    """在 SDK 校验之前先在本地修复输出的 schema 包装
+
+    Args:
+        schema: 被包装的输出 schema（通常是 AgentOutputSchema）
+        agent_name: 统计使用的 agent 名称
+    """
+
+    def __init__(self, schema: AgentOutputSchemaBase, agent_name: str):
+        self.schema = schema
+        self.agent_name = agent_name
+
+    @property
+    def output_type(self) -> Any:
+        # agentCache 按原始输出类型计算缓存键
+        return getattr(self.schema, "output_type", None)
+
+    def is_plain_text(self) -> bool:
+        return self.schema.is_plain_text()
+
+    def name(self) -> str:
+        return self.schema.name()
+
+    def json_schema(self) -> Dict[str, Any]:
+        return self.schema.json_schema()
+
+    def is_strict_json_schema(self) -> bool:
+        return self.schema.is_strict_json_schema()
+
+    def validate_json(self, json_str: str) -> Any:
+        if not _has_latex_control(json_str):
+            try:
+                return self.schema.validate_json(json_str)
+            except ModelBehaviorError:
+                pass
+        try:
+            repaired, fixes = repair_json(json_str, self.json_schema())
+        except ValueError:
+            # 连 JSON 都找不到，交给原 schema 报告错误
+            repaired, fixes = json_str, []
+        if not fixes:
+            try:
+                return self.schema.validate_json(json_str)
+            except ModelBehaviorError:
+                repair_stats.failed[self.agent_name] += 1
+                raise
+        try:
+            result = self.schema.validate_json(repaired)
+        except ModelBehaviorError:
+            repair_stats.failed[self.agent_name] += 1
+            raise
+        repair_stats.repaired[self.agent_name] += 1
+        for fix in set(fixes):
+            repair_stats.fixes[fix] += 1
+        with custom_span(OUTPUT_REPAIR, {"agent": self.agent_name, "fixes": sorted(set(fixes))}):
+            pass
+        return result
+
+
+def with_output_repair(agent: Any, name: str) -> Any:
+    """把 agent 的输出 schema 换成 RepairingOutputSchema（纯文本输出和已经包装过的 agent 不变）"""
+    output_type = agent.output_type
+    if isinstance(output_type, AgentOutputSchemaBase) and not isinstance(output_type, RepairingOutputSchema):
+        if not output_type.is_plain_text():
+            agent.output_type = RepairingOutputSchema(output_type, name)
+    return agent
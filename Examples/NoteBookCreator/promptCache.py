@@ -0,0 +1,91 @@
+"""Prompt cache - 让每个 agent 的请求带有逐字节稳定的静态前缀，便于服务端的前缀缓存命中
+
+服务端的前缀缓存（OpenAI 等）只在请求开头逐字节相同时命中，并按固定粒度（OpenAI 为 1024 token 起、
+每 128 token 一档）计算缓存的 token 数。同一个 agent 在一批任务中会运行成千上万次，请求的布局是：
+
+    工具定义 → 输出 schema → instructions → 输入
+
+前三部分只取决于 agent 本身（prefix_text / static_prefix），输入中的内容则按共享范围从大到小排列
+（layout_prompt）：整章共享的上下文在前（调用方的 context 和 chapterPipeline.section_context 的引用），
+其次是整节共享的定义，然后是带有主题的任务说明（如「为某主题出一组练习题」），
+每次调用特有的内容（题目难度、要避免的题目、上一次的检查问题等）放在最后，使并发的同类调用共享尽可能长的前缀。
+
+此外，SDK 默认为每次 Runner.run 生成一个随机的 prompt_cache_key（只在官方 OpenAI 客户端上生效），
+同一个 agent 的不同运行因此被当作互不相关的请求分散到不同的缓存分组。with_prompt_cache_key 为每个 agent
+设置固定的 key（agent 名称 + 静态前缀的哈希），agentRegistry.get_agent 会自动设置；
+服务器不接受 prompt_cache_key 参数时用 set_prompt_cache_key(False) 关闭。
+
+缓存命中的 token 数在响应的 usage.input_tokens_details.cached_tokens 中，
+由 agentMetrics.MetricsProcessor 按 agent 汇总（cache_report）。
+"""
+
+import dataclasses
+import hashlib
+import json
+from typing import TYPE_CHECKING, Any, Optional, Sequence
+
+if TYPE_CHECKING:
+    from agents import Agent
+
+
+CACHE_KEY_FIELD = "prompt_cache_key"
+CACHE_KEY_PREFIX = "notebook-creator"
+
+
+def _tool_spec(tool: Any) -> Any:
+    if hasattr(tool, "params_json_schema"):
+        return {"name": tool.name, "description": tool.description, "parameters": tool.params_json_schema}
+    return {"name": getattr(tool, "name", type(tool).__name__)}
+
+
+def prefix_text(instructions: Optional[str], tools: Sequence[Any], output_schema: Any) -> str:
+    """请求中只取决于 agent 的静态部分，按 工具定义 → 输出 schema → instructions 的顺序拼成文本
+
+    output_schema 为 AgentOutputSchemaBase（或 None / 纯文本输出）。
+    """
+    parts = [json.dumps([_tool_spec(tool) for tool in tools], ensure_ascii=False)]
+    if output_schema is not None and not output_schema.is_plain_text():
+        parts.append(json.dumps(output_schema.json_schema(), ensure_ascii=False))
+    parts.append(instructions or "")
+    return "\n".join(parts)
+
+
+def static_prefix(agent: "Agent") -> str:
+    """agent 请求的静态前缀；instructions 是动态函数时前缀无法保持稳定，抛出 ValueError"""
+    from agents import AgentOutputSchema, AgentOutputSchemaBase
+
+    if agent.instructions is not None and not isinstance(agent.instructions, str):
+        raise ValueError(f"Agent {agent.name!r} has dynamic instructions, its request prefix is not stable")
+    output_schema = agent.output_type
+    if output_schema is not None and not isinstance(output_schema, AgentOutputSchemaBase):
+        output_schema = AgentOutputSchema(output_schema)
+    return prefix_text(agent.instructions, agent.tools, output_schema)
+
+
+def prefix_digest(agent: "Agent") -> str:
+    """静态前缀的哈希（16 位十六进制），前缀内容变化时随之变化"""
+    return hashlib.sha256(static_prefix(agent).encode("utf-8")).hexdigest()[:16]
+
+
+def with_prompt_cache_key(agent: "Agent", name: str) -> "Agent":
+    """为 agent 设置固定的 prompt_cache_key（原地修改）
+
+    model_settings 中已有调用方自己设置的 key 时保持不变；从其他 agent clone 时继承来的 key 会被替换。
+    """
+    settings = agent.model_settings
+    extra_args = dict(settings.extra_args or {})
+    existing = extra_args.get(CACHE_KEY_FIELD, (settings.extra_body or {}).get(CACHE_KEY_FIELD))
+    if existing is not None and not str(existing).startswith(f"{CACHE_KEY_PREFIX}:"):
+        return agent
+    extra_args[CACHE_KEY_FIELD] = f"{CACHE_KEY_PREFIX}:{name}:{prefix_digest(agent)}"
+    agent.model_settings = dataclasses.replace(settings, extra_args=extra_args)
+    return agent
+
+
+def layout_prompt(*parts: Optional[str]) -> str:
+    """按给定顺序用空行拼接输入的各部分，跳过空的部分
+
+    调用方按共享范围从大到小传入：整章共享的上下文、整节共享的定义、带有主题的任务说明、本次调用特有的内容，
+    例如 sectionPipeline._theorem_prompt 和 exercisePlanner._slot_prompt。
+    """
+    return "\n\n".join(part for part in parts if part)
@@ -0,0 +1,343 @@
+"""Question index - 基于 MinHash / LSH 的近重复题目索引
+
+不同章节反复生成几乎相同的题目（例如同一个定义域选择题题干、只是选项顺序不同）。
+QuestionIndex 对 BaseExample.question 的文本建立 MinHash 签名和 LSH 分桶，新题目生成后立即检查，
+近重复的题目在组装前被拒绝并重新生成（见 exercisePlanner.generate_exercises 的 question_index 参数）。
+
+- 分词：先做 NFKC 归一化、转小写、去掉空白和标点；中日韩字符逐字切分，连续的英文字母或数字作为一个词，
+  再取 shingle_size 个连续词作为 shingle，因此中文题干不依赖分词器
+- 签名：每个 shingle 用 crc32 得到 32 位哈希，再用 num_perm 个 multiply-shift 哈希函数取最小值
+- LSH：签名分成 bands 段，每段合成一个 64 位键（不同段加上不同的盐），任意一段的键相同即为候选，
+  再用签名估计的 Jaccard 相似度与 threshold 比较
+
+持久化目录由若干个不可变的段（segment）组成，每段是一个子目录，包含一批连续行的签名、
+所有 band 的键（加盐后放在同一个有序数组中）及对应的行号、元数据在 meta.jsonl 中的偏移；
+segments.json 按行号顺序列出各段，写入它即为提交。数组用 np.save 保存，加载时用 mmap 映射，
+不需要把索引读入内存，一次查询在每段中做两次向量化的二分查找。
+
+加载后新增的题目先放在内存中，save 只把新增的题目写成一个新段（只对新增的键排序），
+meta.jsonl 只追加，不重写已有数据。相邻两段大小接近时（较旧的一段不超过较新一段的 2 倍）合并为一段，
+合并时对两个有序数组做归并；段的大小因此按 2 的幂递增，段数为 O(log N)，
+每道题在整个生命周期中平均只被重写 O(log N) 次，可以扩展到数百万道题。
+
+用法：
+    index = QuestionIndex.open("output/question_index")
+    match = index.find_duplicate("函数 f(x) = 1/(x-1) 的定义域是？")
+    if match is None:
+        index.add("函数 f(x) = 1/(x-1) 的定义域是？", id="example_abc123")
+    index.save()
+"""
+
+import json
+import os
+import re
+import shutil
+import tempfile
+import unicodedata
+import uuid
+import zlib
+from bisect import bisect_right
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+
+_TOKEN = re.compile(r"[a-z]+|[0-9]+|.")
+
+# 64 位乘法与加法在 uint64 上按 2^64 取模回绕，这里是预期行为
+_IGNORE_OVERFLOW = {"over": "ignore"}
+
+
+def normalize(text: str) -> str:
+    """NFKC 归一化、转小写，并去掉空白、标点和控制字符"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return "".join(c for c in text if unicodedata.category(c)[0] not in ("P", "Z", "C"))
+
+
+def shingles(text: str, size: int = 3) -> List[str]:
+    """把题目文本切成 shingle：中日韩字符逐字、英文单词和数字整体作为一个词"""
+    tokens = _TOKEN.findall(normalize(text))
+    if len(tokens) <= size:
+        return ["".join(tokens)] if tokens else []
+    return ["".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+
+
+@dataclass
+class IndexConfig:
+    num_perm: int = 128
+    bands: int = 16
+    threshold: float = 0.7
+    shingle_size: int = 3
+    seed: int = 1
+
+
+@dataclass
+class DuplicateMatch:
+    """find_duplicate 的结果"""
+    row: int
+    similarity: float
+    id: Optional[str]
+    question: str
+
+
+def _write_array(path: Path, array: np.ndarray) -> None:
+    """先写临时文件再原子替换"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _merge_sorted(keys_a: np.ndarray, rows_a: np.ndarray, keys_b: np.ndarray, rows_b: np.ndarray):
+    """归并两个按键升序排列的 (键, 行号) 数组；键相同时 a 在前"""
+    positions = np.searchsorted(keys_a, keys_b, side="right") + np.arange(len(keys_b))
+    from_b = np.zeros(len(keys_a) + len(keys_b), dtype=bool)
+    from_b[positions] = True
+    keys = np.empty(len(from_b), dtype=np.uint64)
+    rows = np.empty(len(from_b), dtype=np.int64)
+    keys[from_b], rows[from_b] = keys_b, rows_b
+    keys[~from_b], rows[~from_b] = keys_a, rows_a
+    return keys, rows
+
+
+class _Segment:
+    """磁盘上的一段：从 start 开始的连续若干行（数组以 mmap 方式加载）"""
+
+    FILES = ("signatures.npy", "lsh_keys.npy", "lsh_rows.npy", "meta_offsets.npy")
+
+    def __init__(self, name: str, directory: Path, start: int):
+        self.name = name
+        self.directory = directory
+        self.start = start
+        self.signatures = np.load(directory / "signatures.npy", mmap_mode="r")
+        self.lsh_keys = np.load(directory / "lsh_keys.npy", mmap_mode="r")  # 所有 band 的键，升序
+        self.lsh_rows = np.load(directory / "lsh_rows.npy", mmap_mode="r")  # 每个键对应的全局行号
+        self.meta_offsets = np.load(directory / "meta_offsets.npy", mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    @staticmethod
+    def write(directory: Path, signatures: np.ndarray, keys: np.ndarray, rows: np.ndarray, offsets: np.ndarray) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, array in zip(_Segment.FILES, (signatures, keys, rows, offsets)):
+            _write_array(directory / name, array)
+
+    def remove(self) -> None:
+        if self.name == ".":
+            # 旧版本的单段布局：数组直接放在索引目录中
+            for name in self.FILES:
+                (self.directory / name).unlink(missing_ok=True)
+        else:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class QuestionIndex:
+    """题目文本的 MinHash / LSH 近重复索引
+
+    Args:
+        path: 持久化目录，None 表示只在内存中使用
+        config: 索引参数；从磁盘加载时使用保存的参数
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, config: Optional[IndexConfig] = None):
+        self.path = Path(path) if path is not None else None
+        self.config = config or IndexConfig()
+        if self.config.num_perm % self.config.bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.rows_per_band = self.config.num_perm // self.config.bands
+
+        rng = np.random.default_rng(self.config.seed)
+        # multiply-shift 哈希：((a * x + b) mod 2^64) >> 32，a 为奇数
+        self._a = rng.integers(0, 2**63, self.config.num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 2**63, self.config.num_perm, dtype=np.uint64)
+        # 把一个 band 的若干行合成一个 64 位键，再加上该 band 的盐，使所有 band 的键可以放在同一个数组中
+        self._band_mix = rng.integers(0, 2**63, self.rows_per_band, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._band_salt = rng.integers(0, 2**63, self.config.bands, dtype=np.uint64)
+
+        # 磁盘上的数据（按行号顺序排列的段）
+        self._segments: List[_Segment] = []
+        self._segment_starts: List[int] = []
+        self._base_count = 0
+
+        # 加载后新增、尚未保存的数据
+        self._new_signatures: List[np.ndarray] = []
+        self._new_meta: List[dict] = []
+        self._new_buckets: Dict[int, List[int]] = {}
+
+    # ---------- 加载与保存 ----------
+
+    @classmethod
+    def open(cls, path: Union[str, Path], config: Optional[IndexConfig] = None) -> "QuestionIndex":
+        """打开持久化目录中的索引；目录中还没有索引时新建"""
+        path = Path(path)
+        config_path = path / "config.json"
+        if not config_path.exists():
+            return cls(path, config)
+        index = cls(path, IndexConfig(**json.loads(config_path.read_text(encoding="utf-8"))))
+        index._load_arrays()
+        return index
+
+    def _segment_names(self) -> List[str]:
+        manifest = self.path / "segments.json"
+        if manifest.exists():
+            return json.loads(manifest.read_text(encoding="utf-8"))
+        # 旧版本的单段布局
+        return ["."] if (self.path / "signatures.npy").exists() else []
+
+    def _load_arrays(self) -> None:
+        self._segments, self._segment_starts = [], []
+        start = 0
+        for name in self._segment_names():
+            segment = _Segment(name, self.path / name, start)
+            self._segments.append(segment)
+            self._segment_starts.append(start)
+            start += len(segment)
+        self._base_count = start
+        self._new_signatures = []
+        self._new_meta = []
+        self._new_buckets = {}
+
+    def _merge(self, older: _Segment, newer: _Segment) -> str:
+        """把相邻的两段合并为一个新段，返回新段的名称"""
+        keys, rows = _merge_sorted(older.lsh_keys, older.lsh_rows, newer.lsh_keys, newer.lsh_rows)
+        name = f"segment_{uuid.uuid4().hex[:12]}"
+        _Segment.write(
+            self.path / name,
+            np.concatenate([older.signatures, newer.signatures]),
+            keys,
+            rows,
+            np.concatenate([older.meta_offsets, newer.meta_offsets]),
+        )
+        return name
+
+    def save(self, path: Optional[Union[str, Path]] = None) -> None:
+        """把新增的题目写成一个新段（必要时与相邻的段合并），然后重新以 mmap 方式加载"""
+        if path is not None and self.path is not None and Path(path) != self.path and self._base_count:
+            raise ValueError("A loaded QuestionIndex can only be saved to its own path")
+        self.path = Path(path) if path is not None else self.path
+        if self.path is None:
+            raise ValueError("QuestionIndex has no path to save to")
+        self.path.mkdir(parents=True, exist_ok=True)
+        (self.path / "config.json").write_text(json.dumps(asdict(self.config)), encoding="utf-8")
+        if not self._new_signatures:
+            return
+
+        # 元数据追加写入 meta.jsonl，每行的起始位置记录在所在段的 meta_offsets 中
+        offsets = []
+        with open(self.path / "meta.jsonl", "ab" if self._base_count else "wb") as f:
+            for meta in self._new_meta:
+                offsets.append(f.tell())
+                f.write(json.dumps(meta, ensure_ascii=False).encode("utf-8") + b"\n")
+
+        # 新段只包含新增的行，只对这些行的键排序
+        signatures = np.stack(self._new_signatures)
+        keys = self._band_keys_of(signatures).ravel()
+        order = np.argsort(keys, kind="stable")
+        rows = np.tile(np.arange(self._base_count, self._base_count + len(signatures), dtype=np.int64), self.config.bands)
+        name = f"segment_{uuid.uuid4().hex[:12]}"
+        _Segment.write(self.path / name, signatures, keys[order], rows[order], np.asarray(offsets, dtype=np.int64))
+
+        segments = self._segments + [_Segment(name, self.path / name, self._base_count)]
+        obsolete: List[_Segment] = []
+        while len(segments) >= 2 and len(segments[-2]) <= 2 * len(segments[-1]):
+            older, newer = segments[-2], segments.pop()
+            merged = self._merge(older, newer)
+            segments[-1] = _Segment(merged, self.path / merged, older.start)
+            obsolete += [older, newer]
+
+        # 写入段列表即为提交，之后才删除被合并的段
+        manifest = json.dumps([segment.name for segment in segments]).encode("utf-8")
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(manifest)
+        os.replace(tmp_path, self.path / "segments.json")
+        for segment in obsolete:
+            segment.remove()
+        self._load_arrays()
+
+    # ---------- 签名 ----------
+
+    def signature(self, question: str) -> np.ndarray:
+        """题目文本的 MinHash 签名（uint32，长度 num_perm）"""
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles(question, self.config.shingle_size)),
+            dtype=np.uint64,
+        )
+        if hashes.size == 0:
+            return np.full(self.config.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        with np.errstate(**_IGNORE_OVERFLOW):
+            values = (hashes[:, None] * self._a[None, :] + self._b[None, :]) >> np.uint64(32)
+        return values.min(axis=0).astype(np.uint32)
+
+    def _band_keys_of(self, signatures: np.ndarray) -> np.ndarray:
+        """签名 (n, num_perm) -> 各 band 加盐后的键 (bands, n)"""
+        bands = signatures.astype(np.uint64).reshape(len(signatures), self.config.bands, self.rows_per_band)
+        with np.errstate(**_IGNORE_OVERFLOW):
+            return ((bands * self._band_mix).sum(axis=2, dtype=np.uint64) + self._band_salt).T
+
+    # ---------- 查询与添加 ----------
+
+    def __len__(self) -> int:
+        return self._base_count + len(self._new_signatures)
+
+    def _segment_of(self, row: int) -> _Segment:
+        return self._segments[bisect_right(self._segment_starts, row) - 1]
+
+    def _row_signature(self, row: int) -> np.ndarray:
+        if row < self._base_count:
+            segment = self._segment_of(row)
+            return segment.signatures[row - segment.start]
+        return self._new_signatures[row - self._base_count]
+
+    def _candidates(self, keys: np.ndarray) -> set:
+        """与任意一个 band 键相同的所有行"""
+        candidates = set()
+        for segment in self._segments:
+            starts = np.searchsorted(segment.lsh_keys, keys, side="left")
+            ends = np.searchsorted(segment.lsh_keys, keys, side="right")
+            for i in np.flatnonzero(ends > starts):
+                candidates.update(segment.lsh_rows[starts[i]:ends[i]].tolist())
+        for key in keys.tolist():
+            candidates.update(self._new_buckets.get(key, ()))
+        return candidates
+
+    def meta(self, row: int) -> dict:
+        """第 row 道题的元数据（id 和题目文本）"""
+        if row >= self._base_count:
+            return self._new_meta[row - self._base_count]
+        segment = self._segment_of(row)
+        with open(self.path / "meta.jsonl", "rb") as f:
+            f.seek(int(segment.meta_offsets[row - segment.start]))
+            return json.loads(f.readline())
+
+    def find_duplicate(self, question: str, threshold: Optional[float] = None) -> Optional[DuplicateMatch]:
+        """返回与 question 最相似且相似度不低于 threshold 的已有题目，没有时返回 None"""
+        threshold = self.config.threshold if threshold is None else threshold
+        signature = self.signature(question)
+        keys = self._band_keys_of(signature[None, :])[:, 0]
+        best_row, best_similarity = None, threshold
+        for row in self._candidates(keys):
+            similarity = float(np.mean(self._row_signature(row) == signature))
+            if similarity >= best_similarity:
+                best_row, best_similarity = row, similarity
+        if best_row is None:
+            return None
+        meta = self.meta(best_row)
+        return DuplicateMatch(best_row, best_similarity, meta.get("id"), meta.get("question", ""))
+
+    def add(self, question: str, id: Optional[str] = None) -> int:
+        """添加一道题，返回其行号（在 save 之前只保存在内存中）"""
+        signature = self.signature(question)
+        row = len(self)
+        self._new_signatures.append(signature)
+        self._new_meta.append({"id": id, "question": question})
+        for key in self._band_keys_of(signature[None, :])[:, 0].tolist():
+            self._new_buckets.setdefault(key, []).append(row)
+        return row
@@ -0,0 +1,204 @@
+"""Rate limit - 基于令牌桶的请求限流与 429 指数退避
+
+RateLimitedModel 包装任意 Model，在每次请求前从两个令牌桶中扣除额度：
+- 请求桶：每分钟请求数（RPM）
+- token 桶：每分钟 token 数（TPM），请求前按输入长度预估，拿到 usage 后按实际用量补扣
+
+遇到 429 时按指数退避（带随机抖动）重试。通过 RateLimitedModelProvider 放进 RunConfig 后，
+嵌套的 as_tool 子运行也共享同一组令牌桶。
+等待令牌和退避重试分别记录为 rate_limit_wait / rate_limit_retry 自定义 span，供 agentMetrics 统计。
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Any, Optional
+
+from openai import APIStatusError
+
+from agents import Model, ModelProvider, ModelResponse, MultiProvider
+from agents.tracing import custom_span
+
+
+logger = logging.getLogger(__name__)
+
+# 自定义 span 名称
+RATE_LIMIT_WAIT = "rate_limit_wait"
+RATE_LIMIT_RETRY = "rate_limit_retry"
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中文约每字 1 个 token，英文约每 4 个字符 1 个 token，这里统一取每 2 个字符 1 个"""
+    return max(1, len(text) // 2)
+
+
+class TokenBucket:
+    """令牌桶：容量为 capacity，每秒补充 rate 个令牌
+
+    Args:
+        per_minute: 每分钟允许的额度，同时作为桶容量
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated_at = time.monotonic()
+        # 锁要在事件循环中创建（Python 3.9 的 asyncio.Lock 在构造时绑定事件循环），这里延迟到第一次 acquire
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        """等待直到桶内有足够的令牌并扣除；超过容量的请求按容量扣除，避免永远等待"""
+        amount = min(amount, self.capacity)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def debit(self, amount: float) -> None:
+        """直接扣除（允许为负），用于按实际用量补扣"""
+        self._refill()
+        self.tokens -= amount
+
+
+class RateLimiter:
+    """RPM + TPM 两个令牌桶，以及 429 的重试参数
+
+    Args:
+        requests_per_minute: 每分钟请求数上限，None 表示不限
+        tokens_per_minute: 每分钟 token 数上限，None 表示不限
+        max_retries: 遇到 429 时的最大重试次数
+        base_delay: 第一次重试前的等待时间（秒），之后每次翻倍
+        max_delay: 单次等待时间上限（秒）
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        if self.requests is not None:
+            await self.requests.acquire(1)
+        if self.tokens is not None:
+            await self.tokens.acquire(estimated_tokens)
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """拿到实际用量后，把预估与实际的差额记到 token 桶上"""
+        if self.tokens is not None and actual_tokens:
+            self.tokens.debit(actual_tokens - estimated_tokens)
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次重试前的等待时间：指数增长 + 全抖动"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    return isinstance(error, APIStatusError) and error.status_code == 429
+
+
+class RateLimitedModel(Model):
+    """在请求前经过限流器、遇到 429 时退避重试的 Model 包装"""
+
+    def __init__(self, model: Model, limiter: RateLimiter):
+        self.model = model
+        self.limiter = limiter
+
+    @staticmethod
+    def _estimate(system_instructions: Optional[str], input: Any) -> int:
+        return estimate_tokens((system_instructions or "") + json.dumps(input, ensure_ascii=False, default=str))
+
+    async def get_response(
+        self,
+        system_instructions,
+        input,
+        model_settings,
+        tools,
+        output_schema,
+        handoffs,
+        tracing,
+        **kwargs,
+    ) -> ModelResponse:
+        estimated = self._estimate(system_instructions, input)
+        attempt = 0
+        while True:
+            with custom_span(RATE_LIMIT_WAIT):
+                await self.limiter.acquire(estimated)
+            try:
+                response = await self.model.get_response(
+                    system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs
+                )
+            except Exception as error:
+                if not _is_rate_limit(error) or attempt >= self.limiter.max_retries:
+                    raise
+                delay = self.limiter.backoff(attempt)
+                attempt += 1
+                self.limiter.retries += 1
+                logger.warning("Rate limited (attempt %d), retrying in %.2fs", attempt, delay)
+                with custom_span(RATE_LIMIT_RETRY, data={"attempt": attempt, "delay": delay}):
+                    await asyncio.sleep(delay)
+                continue
+            self.limiter.settle(estimated, response.usage.total_tokens)
+            return response
+
+    async def stream_response(
+        self,
+        system_instructions,
+        input,
+        model_settings,
+        tools,
+        output_schema,
+        handoffs,
+        tracing,
+        **kwargs,
+    ):
+        # 流式响应一旦开始输出就不能透明重试，这里只做限流，并在 response.completed 事件中按实际用量补扣
+        estimated = self._estimate(system_instructions, input)
+        with custom_span(RATE_LIMIT_WAIT):
+            await self.limiter.acquire(estimated)
+        async for event in self.model.stream_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs
+        ):
+            if getattr(event, "type", None) == "response.completed":
+                usage = getattr(event.response, "usage", None)
+                if usage is not None:
+                    self.limiter.settle(estimated, usage.total_tokens)
+            yield event
+
+
+class RateLimitedModelProvider(ModelProvider):
+    """为内部 provider 返回的每个模型套上共享同一个限流器的 RateLimitedModel
+
+    Args:
+        limiter: 共享的限流器
+        provider: 实际提供模型的 provider，默认为 SDK 的 MultiProvider
+    """
+
+    def __init__(self, limiter: RateLimiter, provider: Optional[ModelProvider] = None):
+        self.limiter = limiter
+        self.provider = provider or MultiProvider()
+
+    def get_model(self, model_name: Optional[str]) -> Model:
+        return RateLimitedModel(self.provider.get_model(model_name), self.limiter)
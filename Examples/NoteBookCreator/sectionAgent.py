@@ -1,20 +1,13 @@
-from agents import Agent, Runner, AgentOutputSchema
+from model import SectionRefs
+from agentRegistry import get_agent, lazy_agents
 
-from model import Section
-from DefinitionCreator.definationAgent import definition_agent
-from TheoremCreator.theoremAgent import theorem_agent
-from SummaryCreator.summaryAgent import summary_agent
-from ExerciseCreator.exerciseAgent import exercise_agent
 
-
-section_agent = Agent(
-    name="section_generator",
-    instructions="""你是一个专业的章节生成器。你的任务是根据给定的知识点和上下文，创建完整的章节内容。
+SECTION_INSTRUCTIONS = """你是一个专业的章节生成器。你的任务是根据给定的知识点和上下文，创建完整的章节内容。
 
                     重要提示：
-                    - 当你调用工具函数时，这些工具已经返回了完整的内容对象
-                    - 你不需要重新生成或格式化这些内容，只需要直接使用工具返回的结果
-                    - 将所有工具调用的结果直接组织到 Section 结构中即可
+                    - 当你调用工具函数时，这些工具已经返回了完整的内容对象，并且已经被记录下来
+                    - 每个对象都带有 ID：定义的 definition_id、每个定理和每道题目的 id、总结的 summary_id
+                    - 最终输出只需要按顺序列出这些 ID，不要复制定义、定理、题目或总结的内容，程序会根据 ID 组装完整章节
 
                     章节结构要求（按顺序）：
                     1. 一个定义（Definition）：使用 definition_agent 生成定义
@@ -33,44 +26,66 @@ section_agent = Agent(
                        - 题目应该由浅入深，难度逐步递增
                        - 可以从基础概念题开始，逐步过渡到综合应用题
                     6. 调用 summary_agent 生成章节总结：
-                       - 重要：在调用 summary_agent 时，必须将之前生成的定义、定理和练习题的内容作为上下文传递给 summary_agent
-                       - 总结应该基于完整的章节内容（定义、定理、练习题）来生成
-                       - 在调用 generate_summary 工具时，在输入中明确说明：
-                         * 章节的定义是什么
-                         * 章节包含哪些定理（如果有）
-                         * 章节包含哪些练习题
-                         * 总结应该涵盖这些内容
-                    7. 将所有内容组织到 Section 结构中（按顺序）：
+                       - 必须在定义、定理和练习题都生成之后再调用 generate_summary
+                       - 调用 generate_summary 时只需要传入章节主题（topic），已生成的定义、定理和练习题会由工具自动作为上下文
+                       - 不要在参数中重复定义、定理或练习题的内容
+                    7. 按顺序列出各部分的 ID，组织成 SectionRefs 结构：
                        - section_title: 章节标题（根据上下文生成）
                        - introduction: 章节介绍（根据上下文生成）
-                       - definition: 使用 definition_agent 生成的结果中的 definition 字段
-                       - theorems: 使用 theorem_agent 生成的所有定理（列表，0到多个）
-                       - examples: 使用 exercise_agent 生成的结果中的 exercises 列表（3-5个）
-                       - summary: 使用 summary_agent 生成的结果中的 summary 字段
+                       - definition_id: generate_definition 返回结果中的 definition_id
+                       - theorem_ids: generate_theorem 返回的所有定理的 id（列表，0到多个）
+                       - example_ids: generate_exercises 返回的 exercises 中各题目的 id（3-5个，由浅入深）
+                       - summary_id: generate_summary 返回结果中的 summary_id
 
                     输出格式：
-                    - 输出必须符合 Section 模型的要求
-                    - 直接使用工具返回的对象，不要重新创建或修改它们
+                    - 输出必须符合 SectionRefs 模型的要求
+                    - 只输出 ID，不要重新写出或修改工具返回的内容
                     - 组织结构顺序：definition → theorems → examples → summary
-                    - examples 应该包含3-5道由浅入深的题目""",
-    output_type = AgentOutputSchema(Section, strict_json_schema=False),
-    tools=[
-        definition_agent.as_tool(
-            tool_name="generate_definition",
-            tool_description="生成定义。定义应该准确、清晰、完整，能够准确描述概念的本质特征。每个章节需要一个定义。",
-        ),
-        theorem_agent.as_tool(
-            tool_name="generate_theorem",
-            tool_description="生成定理。定理包含定理陈述和证明。每个章节可以有0到多个定理，关联到概念块中。不需要生成例子，章节有统一的例子。",
-        ),
-        exercise_agent.as_tool(
-            tool_name="generate_exercises",
-            tool_description="生成练习题列表。必须生成3-5道题目，题目应该由浅入深，难度逐步递增。",
-        ),
-        summary_agent.as_tool(
-            tool_name="generate_summary",
-            tool_description="生成章节总结。总结应该全面、准确，涵盖章节的核心知识点。每个章节需要一个总结。在调用此工具时，必须将之前生成的定义、定理和练习题的内容作为输入的一部分，以便生成准确的总结。",
-        ),
-    ],
-)
+                    - example_ids 应该包含3-5道由浅入深的题目"""
+
+
+def build_section_agent():
+    """构造 section_agent（由 agentRegistry 在第一次使用时调用）"""
+    from agents import Agent, AgentOutputSchema, function_tool
+
+    from agentDeadline import guard_tool
+    from artifactTable import store_output
+    from sectionDigest import generate_summary
+
+    return Agent(
+        name="section_generator",
+        instructions=SECTION_INSTRUCTIONS,
+        output_type=AgentOutputSchema(SectionRefs, strict_json_schema=False),
+        tools=[
+            guard_tool(
+                get_agent("definition").as_tool(
+                    tool_name="generate_definition",
+                    tool_description="生成定义。定义应该准确、清晰、完整，能够准确描述概念的本质特征。每个章节需要一个定义。",
+                    custom_output_extractor=store_output,
+                ),
+                "definition",
+            ),
+            guard_tool(
+                get_agent("theorem").as_tool(
+                    tool_name="generate_theorem",
+                    tool_description="生成定理。定理包含定理陈述和证明。每个章节可以有0到多个定理，关联到概念块中。不需要生成例子，章节有统一的例子。",
+                    custom_output_extractor=store_output,
+                ),
+                "theorem",
+            ),
+            guard_tool(
+                get_agent("exercise").as_tool(
+                    tool_name="generate_exercises",
+                    tool_description="生成练习题列表。必须生成3-5道题目，题目应该由浅入深，难度逐步递增。",
+                    custom_output_extractor=store_output,
+                ),
+                "exercise",
+            ),
+            # 总结的输入由工具在本地从已生成的内容构建（见 sectionDigest），编排 agent 只传主题；
+            # 工具内部经过 run_agent 运行 summary_agent，期限和对冲在其中执行，这里只把超时转换为说明
+            guard_tool(function_tool(generate_summary, name_override="generate_summary"), "summary", run_policy=False),
+        ],
+    )
+
 
+__getattr__ = lazy_agents(__name__, section_agent="section")
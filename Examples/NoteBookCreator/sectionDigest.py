@@ -0,0 +1,133 @@
+"""Section digest - 为总结阶段构建有 token 上限的紧凑上下文
+
+以前 section_agent 要求编排 LLM 把完整的定义、每个定理及其证明、每道练习题重新写进 generate_summary 的参数，
+这些内容编排 agent 已经读过一遍，又要作为输出 token 再写一遍。这里改为在本地构建摘要：
+- 定义原文
+- 定理陈述（不含证明）
+- 练习题的题型和题干
+
+摘要不超过给定的 token 预算，超出时先截短过长的条目，再省略末尾的条目。
+
+两种用法：
+- 代码驱动流水线：sectionPipeline.build_section 直接用 build_digest 生成 summary_agent 的输入
+- 编排 agent：section_agent 的工具会把子 agent 的输出记录到运行上下文中（见 artifactTable），
+  输出 SectionRefs 的 agent 以 SectionArtifacts 作为上下文（run_agent 通过 new_context 自动创建），
+  generate_summary 工具只需要编排 agent 传入主题，摘要由工具在本地构建
+"""
+
+from typing import Any, List, Optional
+
+from agents import RunConfig, RunContextWrapper
+
+from agentRunner import run_agent
+from artifactTable import CONTEXT_TYPES, ArtifactTable
+from model import Definition, Theorem, ExerciseList, Example, SectionRefs
+from rateLimit import estimate_tokens
+from agentRegistry import get_agent
+from ExerciseCreator.exercisePlanner import QUESTION_TYPE_NAMES
+
+
+# 每个条目至少保留的字符数，截短时不会低于这个长度
+_MIN_ITEM_CHARS = 40
+
+
+def truncate(text: str, max_chars: int) -> str:
+    """合并空白并截短到 max_chars 个字符，截短时加省略号"""
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars] + "……"
+
+
+def build_digest(
+    definition: Optional[str],
+    theorems: List[Theorem],
+    exercises: List[Example],
+    max_tokens: int = 800,
+) -> str:
+    """构建总结阶段使用的章节摘要，估算的 token 数不超过 max_tokens（定义本身过长时除外）"""
+    header = f"章节的定义：\n{truncate(definition, max_tokens)}" if definition else ""
+    items = [f"定理 {i}：{theorem.theorem}" for i, theorem in enumerate(theorems, 1)]
+    items += [
+        f"第 {i} 题（{QUESTION_TYPE_NAMES[exercise.type]}）：{exercise.question}"
+        for i, exercise in enumerate(exercises, 1)
+    ]
+
+    def render(lines: List[str], omitted: int = 0) -> str:
+        parts = [header] if header else []
+        parts += lines
+        if omitted:
+            parts.append(f"……另有 {omitted} 项未列出")
+        return "\n\n".join(parts)
+
+    # 逐步缩短每个条目的长度，直到满足预算或达到最短长度
+    max_chars = max((len(item) for item in items), default=0)
+    lines = items
+    while estimate_tokens(render(lines)) > max_tokens and max_chars > _MIN_ITEM_CHARS:
+        max_chars = max(_MIN_ITEM_CHARS, max_chars * 2 // 3)
+        lines = [truncate(item, max_chars) for item in items]
+
+    # 仍然超出时从末尾省略条目
+    kept = len(lines)
+    while kept > 0 and estimate_tokens(render(lines[:kept], len(lines) - kept)) > max_tokens:
+        kept -= 1
+    return render(lines[:kept], len(lines) - kept)
+
+
+def summary_prompt(topic: str, digest: str) -> str:
+    """summary_agent 的输入"""
+    return f"为「{topic}」这一章节生成总结，总结应该涵盖以下内容。\n\n{digest}"
+
+
+class SectionArtifacts(ArtifactTable):
+    """一次 section_agent 运行中各子 agent 的输出，作为运行上下文在工具间共享
+
+    除了按 ID 记录所有输出，还单独记下章节级的定义、定理和 generate_exercises 返回的题目，用于构建摘要
+    （exercise_agent 内部各出题工具的输出也会记录到表中，但不一定都被选进题目列表）。
+    """
+
+    def __init__(self, run_config: Optional[RunConfig] = None, summary_token_budget: int = 800):
+        super().__init__(run_config)
+        self.summary_token_budget = summary_token_budget
+        self.definition: Optional[Definition] = None
+        self.theorems: List[Theorem] = []
+        self.exercises: List[Example] = []
+
+    def record(self, value: Any) -> Any:
+        value = super().record(value)
+        if isinstance(value, Definition):
+            self.definition = value
+        elif isinstance(value, Theorem):
+            self.theorems.append(value)
+        elif isinstance(value, ExerciseList):
+            self.exercises.extend(value.exercises)
+        return value
+
+    def digest(self) -> str:
+        return build_digest(
+            self.definition.definition if self.definition else None,
+            self.theorems,
+            self.exercises,
+            self.summary_token_budget,
+        )
+
+
+# 输出 SectionRefs 的编排 agent（section_agent）以 SectionArtifacts 作为运行上下文
+CONTEXT_TYPES[SectionRefs] = SectionArtifacts
+
+
+async def generate_summary(ctx: RunContextWrapper[SectionArtifacts], topic: str) -> str:
+    """生成章节总结。只需要传入章节主题，已生成的定义、定理和练习题会自动作为上下文，不要在参数中重复这些内容。
+
+    Args:
+        topic: 章节主题
+    """
+    table = ctx.context
+    # 被对冲时运行上下文是派生的 ArtifactFork：摘要读取最外层的 SectionArtifacts，总结记录到当前的表
+    if not isinstance(table, ArtifactTable) or not isinstance(table.root, SectionArtifacts):
+        raise TypeError("generate_summary can only be used in a run with a SectionArtifacts context")
+    # 编排 agent 可能在同一轮中并行调用了其他工具，等它们的结果都记录到表中之后再构建摘要
+    await table.root.settled()
+    # 嵌套运行使用表中记下的外层 run_config（模型、provider 和限流与外层一致）；
+    # 经过 run_agent，与流水线中的子 agent 一样使用缓存、期限和重新请求
+    summary = await run_agent(get_agent("summary"), summary_prompt(topic, table.root.digest()), table.run_config)
+    # 与其他工具一样记录总结并返回带 summary_id 的 JSON，编排 agent 只需要在输出中引用这个 ID
+    return table.record(summary).model_dump_json(exclude_none=True)
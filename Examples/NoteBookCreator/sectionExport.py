@@ -0,0 +1,315 @@
+"""Section export - 把任意数量的已保存章节流式导出为 Markdown、JSONL 或静态 HTML
+
+输入可以是：
+- batchBuilder 的检查点或 SectionStore 的 JSON 文件（取其中的 "section"，未完成的检查点会被跳过）
+- 直接保存的 Section JSON 文件
+- 每行一个 Section 的 JSONL 文件
+- 包含 JSON 章节文件的目录（递归查找 *.json，即 batchBuilder 和 SectionStore 写出的文件；
+  同一目录下的路由记录、指标等 *.jsonl 文件不会被读取）
+
+不是章节的记录（目录中的其他 JSON 文件、格式不对的行）以及无法读取或不是 UTF-8 编码的文件
+会记录警告并跳过，不会中断导出。
+
+章节按 chunk_size 分块交给进程池渲染，父进程只负责读取原始文本和按顺序写出结果。
+同时在途的块数有上限，因此内存占用与章节总数无关，渲染吞吐随 CPU 核数增加。
+
+用法（在 NoteBookCreator 目录下）：
+    python sectionExport.py output/batch --format html --out output/all.html
+    python sectionExport.py sections.jsonl --format markdown --out output/all.md --workers 8
+"""
+
+import argparse
+import html
+import io
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from model import Example, Section
+from sectionMarkdown import write_markdown
+
+
+logger = logging.getLogger(__name__)
+
+
+# ---------- HTML ----------
+
+def _paragraphs(text: str) -> str:
+    """把纯文本转成 HTML 段落：空行分段，段内换行转成 <br>"""
+    blocks = [block.strip() for block in text.split("\n\n") if block.strip()]
+    return "".join(f"<p>{html.escape(block).replace(chr(10), '<br>')}</p>\n" for block in blocks)
+
+
+def _multiple_choice_html(exercise: Any) -> str:
+    options = "".join(f"<li>{html.escape(option)}</li>" for option in exercise.options)
+    return f"<p><strong>选项：</strong></p>\n<ul>{options}</ul>\n<p><strong>正确答案：</strong> {html.escape(exercise.correct_answer)}</p>\n"
+
+
+def _fill_blank_html(exercise: Any) -> str:
+    blanks = "".join(
+        f"<li>{html.escape(blank)}: {html.escape(answer)}</li>" for blank, answer in exercise.blanks.items()
+    )
+    return f"<p><strong>答案：</strong></p>\n<ul>{blanks}</ul>\n"
+
+
+def _proof_html(exercise: Any) -> str:
+    return f"<p><strong>证明：</strong></p>\n{_paragraphs(exercise.proof)}"
+
+
+def _short_answer_html(exercise: Any) -> str:
+    return f"<p><strong>答案：</strong></p>\n{_paragraphs(exercise.answer)}"
+
+
+def _code_html(exercise: Any) -> str:
+    return (
+        f"<p><strong>代码答案：</strong></p>\n"
+        f'<pre><code class="language-python">{html.escape(exercise.code_answer)}</code></pre>\n'
+    )
+
+
+# 题型 -> 题目正文之后、解释之前的部分
+_EXERCISE_HTML: Dict[str, Callable[[Any], str]] = {
+    "multiple_choice": _multiple_choice_html,
+    "fill_blank": _fill_blank_html,
+    "proof": _proof_html,
+    "short_answer": _short_answer_html,
+    "code": _code_html,
+}
+
+HTML_HEADER = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<title>Notebook</title>
+<style>
+body { max-width: 860px; margin: 2em auto; padding: 0 1em; font-family: sans-serif; line-height: 1.6; }
+article { border-bottom: 1px solid #ddd; padding-bottom: 2em; margin-bottom: 2em; }
+pre { background: #f6f8fa; padding: 1em; overflow-x: auto; }
+</style>
+</head>
+<body>
+"""
+
+HTML_FOOTER = "</body>\n</html>\n"
+
+
+def _exercise_html(exercise: Example, index: int) -> str:
+    parts = [f"<h3>第 {index} 题</h3>\n", f"<p><strong>题目：</strong> {html.escape(exercise.question)}</p>\n"]
+    parts.append(_EXERCISE_HTML[exercise.type](exercise))
+    explanation = getattr(exercise, "explanation", None)
+    if explanation:
+        parts.append(f"<p><strong>解释：</strong> {html.escape(explanation)}</p>\n")
+    return "".join(parts)
+
+
+def write_html(section: Section, write: Callable[[str], Any]) -> None:
+    """把一个章节渲染为 <article> 片段，逐部分调用 write"""
+    anchor = f' id="{html.escape(section.id)}"' if section.id else ""
+    write(f"<article{anchor}>\n<h1>{html.escape(section.section_title)}</h1>\n")
+    write(f"<h2>介绍</h2>\n{_paragraphs(section.introduction)}")
+    write(f"<h2>定义</h2>\n{_paragraphs(section.definition)}")
+
+    if section.theorems:
+        write("<h2>定理</h2>\n")
+    for i, theorem in enumerate(section.theorems, 1):
+        write(f"<h3>定理 {i}</h3>\n{_paragraphs(theorem.theorem)}")
+        if theorem.proof:
+            write(f"<p><strong>证明：</strong></p>\n{_paragraphs(theorem.proof)}")
+
+    if section.examples:
+        write("<h2>练习题</h2>\n")
+    for i, exercise in enumerate(section.examples, 1):
+        write(_exercise_html(exercise, i))
+
+    write(f"<h2>总结</h2>\n{_paragraphs(section.summary)}</article>\n")
+
+
+# ---------- 格式 ----------
+
+def _write_markdown_record(section: Section, write: Callable[[str], Any]) -> None:
+    write_markdown(section, write)
+    write("\n---\n\n")
+
+
+def _write_jsonl_record(section: Section, write: Callable[[str], Any]) -> None:
+    write(section.model_dump_json())
+    write("\n")
+
+
+# 格式 -> (文件头, 单个章节的渲染函数, 文件尾)
+FORMATS: Dict[str, Tuple[str, Callable[[Section, Callable[[str], Any]], None], str]] = {
+    "markdown": ("", _write_markdown_record, ""),
+    "jsonl": ("", _write_jsonl_record, ""),
+    "html": (HTML_HEADER, write_html, HTML_FOOTER),
+}
+
+
+# ---------- 输入 ----------
+
+def _parse_record(text: str) -> Optional[Section]:
+    """解析一条记录：检查点 / SectionStore 文件取 "section" 字段，未完成的检查点返回 None
+
+    不是章节的记录抛出 ValueError（包括 json.JSONDecodeError 和 pydantic 的 ValidationError）。
+    """
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+    if data.get("status", "done") != "done":
+        return None
+    if "section" in data:
+        data = data["section"]
+    return Section.model_validate(data)
+
+
+# 一条记录：(来源，用于警告信息, 原始 JSON 文本)；文件读取或解码失败时第二项是只带错误信息的 ValueError
+# （UnicodeDecodeError 本身带着整个文件的字节，不传给子进程），和解析失败一样在渲染时记为跳过的记录
+Record = Tuple[str, Union[str, ValueError]]
+
+
+def iter_records(sources: Iterable[Union[str, Path]], exclude: Optional[Path] = None) -> Iterator[Record]:
+    """按顺序逐条产出章节记录的来源和原始 JSON 文本，不在父进程中解析
+
+    读取或解码失败的文件不会中断导出，产出的记录带着异常（JSONL 文件在失败处停止读取）。
+
+    Args:
+        sources: 文件或目录列表；目录中只读取 *.json 文件
+        exclude: 跳过的文件（导出到输入目录中时的输出文件本身）
+    """
+    for source in sources:
+        path = Path(source)
+        if exclude is not None and path.resolve() == exclude:
+            continue
+        if path.is_dir():
+            yield from iter_records(sorted(path.rglob("*.json")), exclude)
+        elif path.suffix == ".jsonl":
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for number, line in enumerate(f, 1):
+                        if line.strip():
+                            yield f"{path}:{number}", line
+            except (OSError, UnicodeDecodeError) as error:
+                # 按块解码，出错的位置不一定是下一行，只报告文件
+                yield str(path), ValueError(str(error))
+        else:
+            try:
+                text = path.read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError) as error:
+                yield str(path), ValueError(str(error))
+            else:
+                yield str(path), text
+
+
+def _chunks(records: Iterator[Record], size: int) -> Iterator[List[Record]]:
+    chunk: List[Record] = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ---------- 渲染 ----------
+
+def render_chunk(fmt: str, records: List[Record]) -> Tuple[str, int, List[str]]:
+    """渲染一块记录，返回 (渲染结果, 导出的章节数, 跳过的记录说明)；在子进程中执行"""
+    write_section = FORMATS[fmt][1]
+    buffer = io.StringIO()
+    count = 0
+    skipped: List[str] = []
+    for origin, record in records:
+        if isinstance(record, ValueError):
+            skipped.append(f"{origin}: {record}")
+            continue
+        try:
+            section = _parse_record(record)
+        except ValueError as error:
+            skipped.append(f"{origin}: {str(error).splitlines()[0]}")
+            continue
+        if section is not None:
+            write_section(section, buffer.write)
+            count += 1
+    return buffer.getvalue(), count, skipped
+
+
+def _render_chunks(chunks: Iterator[List[Record]], fmt: str, workers: int) -> Iterator[Tuple[str, int, List[str]]]:
+    """按输入顺序产出每块的渲染结果；workers > 1 时用进程池，最多 2 * workers 块同时在途"""
+    if workers <= 1:
+        for chunk in chunks:
+            yield render_chunk(fmt, chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[Future] = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(render_chunk, fmt, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def export_sections(
+    sources: Iterable[Union[str, Path]],
+    out_path: Union[str, Path],
+    fmt: str = "markdown",
+    workers: Optional[int] = None,
+    chunk_size: int = 64,
+) -> int:
+    """把 sources 中的所有章节导出到 out_path，返回导出的章节数；不是章节或无法读取的记录记录警告后跳过
+
+    Args:
+        sources: 文件或目录列表，见模块说明
+        out_path: 输出文件
+        fmt: markdown / jsonl / html
+        workers: 渲染进程数，默认为 CPU 核数；1 表示在当前进程中渲染
+        chunk_size: 每次交给子进程的章节数
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {sorted(FORMATS)}")
+    header, _, footer = FORMATS[fmt]
+    workers = workers or os.cpu_count() or 1
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    total = skipped = 0
+    with open(out_path, "w", encoding="utf-8") as out:
+        out.write(header)
+        chunks = _chunks(iter_records(sources, out_path.resolve()), chunk_size)
+        for text, count, reasons in _render_chunks(chunks, fmt, workers):
+            out.write(text)
+            total += count
+            skipped += len(reasons)
+            for reason in reasons:
+                logger.warning("Skipped a record that is not a readable section: %s", reason)
+        out.write(footer)
+    if skipped:
+        logger.warning("Skipped %d records that are not readable sections", skipped)
+    return total
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="批量导出章节")
+    parser.add_argument("sources", nargs="+", help="章节文件或目录（.json / .jsonl）")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="markdown", help="导出格式")
+    parser.add_argument("--out", required=True, help="输出文件路径")
+    parser.add_argument("--workers", type=int, default=None, help="渲染进程数，默认为 CPU 核数")
+    parser.add_argument("--chunk-size", type=int, default=64, help="每次交给子进程的章节数")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(message)s")
+    started = time.perf_counter()
+    count = export_sections(args.sources, args.out, args.format, args.workers, args.chunk_size)
+    print(f"导出 {count} 个章节到 {args.out}，用时 {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
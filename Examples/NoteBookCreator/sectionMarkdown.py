@@ -0,0 +1,149 @@
+"""Section markdown - 将 Section 及其各部分渲染为 Markdown
+
+每个部分都有独立的渲染函数，供完整渲染（section_to_markdown）和流式渲染（sectionStream）共用。
+section_blocks 把章节拆成以元素 ID 标识的块，sectionStore 修改单个元素时只重新渲染对应的块。
+"""
+
+from typing import Any, Callable, Dict, List, Tuple
+
+from model import (
+    Chapter,
+    CodeQuestion,
+    Example,
+    FillBlankQuestion,
+    MultipleChoiceQuestion,
+    ProofQuestion,
+    Section,
+    ShortAnswerQuestion,
+    Theorem,
+)
+
+
+def render_header(section_title: str, introduction: str) -> str:
+    """标题和介绍"""
+    return f"# {section_title}\n## 介绍\n\n{introduction}\n"
+
+
+def render_definition(definition: str) -> str:
+    return f"## 定义\n\n{definition}\n"
+
+
+def render_theorem(theorem: Theorem, index: int, heading: bool = False) -> str:
+    """第 index 个定理；heading 为 True 时在前面加上 "## 定理" 标题"""
+    md = ["## 定理\n\n"] if heading else []
+    md.append(f"### 定理 {index}\n\n")
+    md.append(f"{theorem.theorem}\n\n")
+    if theorem.proof:
+        md.append(f"**证明：**\n\n{theorem.proof}\n\n")
+    return "".join(md)
+
+
+def _multiple_choice_body(exercise: MultipleChoiceQuestion) -> List[str]:
+    md = ["**选项：**\n"]
+    md.extend(f"- {option}\n" for option in exercise.options)
+    md.append(f"\n**正确答案：** {exercise.correct_answer}\n\n")
+    return md
+
+
+def _fill_blank_body(exercise: FillBlankQuestion) -> List[str]:
+    md = ["**答案：**\n"]
+    md.extend(f"- {blank}: {answer}\n" for blank, answer in exercise.blanks.items())
+    md.append("\n")
+    return md
+
+
+def _proof_body(exercise: ProofQuestion) -> List[str]:
+    return [f"**证明：**\n\n{exercise.proof}\n\n"]
+
+
+def _short_answer_body(exercise: ShortAnswerQuestion) -> List[str]:
+    return [f"**答案：** {exercise.answer}\n\n"]
+
+
+def _code_body(exercise: CodeQuestion) -> List[str]:
+    return [f"**代码答案：**\n\n```python\n{exercise.code_answer}\n```\n\n"]
+
+
+# 题型 -> 题目正文之后、解释之前的部分
+_EXERCISE_BODIES: Dict[str, Callable[[Any], List[str]]] = {
+    "multiple_choice": _multiple_choice_body,
+    "fill_blank": _fill_blank_body,
+    "proof": _proof_body,
+    "short_answer": _short_answer_body,
+    "code": _code_body,
+}
+
+
+def render_exercise(exercise: Example, index: int, heading: bool = False) -> str:
+    """第 index 道练习题；heading 为 True 时在前面加上 "## 练习题" 标题"""
+    md = ["## 练习题\n\n"] if heading else []
+    md.append(f"### 第 {index} 题\n\n")
+    md.append(f"**题目：** {exercise.question}\n\n")
+    md.extend(_EXERCISE_BODIES[exercise.type](exercise))
+
+    explanation = getattr(exercise, "explanation", None)
+    if explanation:
+        md.append(f"**解释：** {explanation}\n\n")
+    return "".join(md)
+
+
+def render_summary(summary: str) -> str:
+    return f"## 总结\n\n{summary}\n"
+
+
+def theorem_block_id(theorem: Theorem, index: int) -> str:
+    """定理块的 ID：优先使用定理的 id，没有 id 时按位置编号"""
+    return theorem.id or f"theorem:{index}"
+
+
+def exercise_block_id(exercise: Example, index: int) -> str:
+    """练习题块的 ID：优先使用题目的 id，没有 id 时按位置编号"""
+    return exercise.id or f"example:{index}"
+
+
+def section_blocks(section: Section) -> List[Tuple[str, str]]:
+    """将 Section 渲染为按顺序排列的 (块 ID, Markdown) 列表
+
+    块 ID 为 header / definition / summary，或定理、练习题的 id。
+    """
+    blocks: List[Tuple[str, str]] = []
+
+    # 标题 + 介绍
+    blocks.append(("header", render_header(section.section_title, section.introduction)))
+
+    # 定义
+    blocks.append(("definition", render_definition(section.definition)))
+
+    # 定理
+    for i, theorem in enumerate(section.theorems, 1):
+        blocks.append((theorem_block_id(theorem, i), render_theorem(theorem, i, heading=(i == 1))))
+
+    # 练习题
+    for i, exercise in enumerate(section.examples, 1):
+        blocks.append((exercise_block_id(exercise, i), render_exercise(exercise, i, heading=(i == 1))))
+
+    # 总结
+    blocks.append(("summary", render_summary(section.summary)))
+
+    return blocks
+
+
+def write_markdown(section: Section, write: Callable[[str], Any]) -> None:
+    """逐块渲染 Section 并立即调用 write（如文件的 write 方法），不在内存中拼接整个章节"""
+    for _, markdown in section_blocks(section):
+        write(markdown)
+
+
+def section_to_markdown(section: Section) -> str:
+    """将 Section 转换为 Markdown 格式"""
+    return "".join(markdown for _, markdown in section_blocks(section))
+
+
+def chapter_to_markdown(chapter: Chapter) -> str:
+    """章标题、章介绍、共享概念，然后依次是各节（各节的格式与 section_to_markdown 相同）"""
+    md = [f"# {chapter.chapter_title}\n\n{chapter.introduction}\n\n"]
+    if chapter.concepts:
+        md.append("## 基本概念\n\n")
+        md.extend(f"### {block.name or '概念'}\n\n{block.definition}\n\n" for block in chapter.concepts)
+    md.extend(f"---\n\n{section_to_markdown(section)}\n" for section in chapter.sections)
+    return "".join(md)
@@ -0,0 +1,111 @@
+"""Section patch - 只调用相关的子 agent 来修改已保存的章节
+
+修正一道题不需要重新运行整个 section_agent：
+- regenerate_example：用同题型的 agent 重新生成一道练习题，替换原题
+- regenerate_proof：用 theorem_agent 为定理重新给出证明，定理陈述保持不变
+- append_exercise：用对应题型的 agent 追加一道比现有题目更难的练习题
+
+新元素沿用被替换元素的 ID，写回 SectionStore 时只重新渲染对应的 Markdown 块。
+输入中包含原有内容，因此不会命中 agentCache 中旧结果的缓存。
+输入以章节标题和定义开头，同一章节的多次修改共享这段前缀（见 promptCache）。
+
+用法：
+    store = SectionStore("output/sections")
+    section_id = store.save(await build_section("函数定义域"))
+    example_id = store.load(section_id).examples[0].id
+    await regenerate_example(store, section_id, example_id, instruction="换一个分段函数的例子")
+"""
+
+from typing import Optional
+
+from agents import RunConfig
+
+from agentRegistry import get_agent
+from agentRunner import run_agent
+from model import Example, QuestionType, Section, Theorem
+from ExerciseCreator.exercisePlanner import QUESTION_TYPE_NAMES
+from promptCache import layout_prompt
+from sectionStore import SectionStore, inherit_ids
+
+
+def _context(section: Section) -> str:
+    return f"章节：{section.section_title}\n\n章节的定义：\n{section.definition}"
+
+
+def _with_instruction(prompt: str, instruction: Optional[str]) -> str:
+    return layout_prompt(prompt, f"额外要求：{instruction}" if instruction else None)
+
+
+async def regenerate_example(
+    store: SectionStore,
+    section_id: str,
+    example_id: str,
+    instruction: Optional[str] = None,
+    run_config: Optional[RunConfig] = None,
+) -> Example:
+    """重新生成一道练习题（题型不变），替换原题并返回新题
+
+    Args:
+        store: 章节存储
+        section_id: 章节 ID
+        example_id: 要替换的练习题 ID
+        instruction: 对新题目的额外要求，如 "难度再低一些"
+        run_config: 传给 Runner.run 的运行配置
+    """
+    section = store.load(section_id)
+    previous = store.get_example(section_id, example_id)
+    question_type = previous.type
+    prompt = layout_prompt(
+        _context(section),
+        f"重新生成一道关于「{section.section_title}」的{QUESTION_TYPE_NAMES[question_type]}，"
+        f"替换下面这道题。新题目的难度与原题相当，但不要与原题重复。",
+        f"原题：{previous.question}",
+    )
+    exercise = await run_agent(get_agent(question_type), _with_instruction(prompt, instruction), run_config)
+    return store.put_example(section_id, inherit_ids(exercise, previous))
+
+
+async def regenerate_proof(
+    store: SectionStore,
+    section_id: str,
+    theorem_id: str,
+    instruction: Optional[str] = None,
+    run_config: Optional[RunConfig] = None,
+) -> Theorem:
+    """为定理重新生成证明，定理陈述和 ID 保持不变，返回更新后的定理"""
+    section = store.load(section_id)
+    theorem = store.get_theorem(section_id, theorem_id)
+    prompt = layout_prompt(
+        _context(section),
+        "为下面的定理重新给出完整、严谨的证明，定理内容保持不变。",
+        f"定理：{theorem.theorem}",
+        f"原证明（存在问题，需要重写）：\n{theorem.proof}" if theorem.proof else None,
+    )
+    result: Theorem = await run_agent(get_agent("theorem"), _with_instruction(prompt, instruction), run_config)
+    return store.put_theorem(section_id, theorem.model_copy(update={"proof": result.proof}))
+
+
+async def append_exercise(
+    store: SectionStore,
+    section_id: str,
+    question_type: Optional[QuestionType] = None,
+    instruction: Optional[str] = None,
+    run_config: Optional[RunConfig] = None,
+) -> Example:
+    """追加一道比现有题目更难的练习题，返回新题
+
+    Args:
+        question_type: 题型，默认与最后一道题相同（没有练习题时为简答题）
+    """
+    section = store.load(section_id)
+    if question_type is None:
+        question_type = section.examples[-1].type if section.examples else "short_answer"
+    prompt = layout_prompt(
+        _context(section),
+        f"为「{section.section_title}」生成一道{QUESTION_TYPE_NAMES[question_type]}，"
+        f"难度要高于下面已有的所有题目，并考察与它们不同的要点。",
+        "已有题目：\n" + "\n".join(f"- {exercise.question}" for exercise in section.examples) if section.examples else None,
+    )
+    exercise = await run_agent(get_agent(question_type), _with_instruction(prompt, instruction), run_config)
+    exercise.id = None  # 模型可能照抄已有题目的 ID，追加的题目总是使用新 ID
+    return store.put_example(section_id, exercise)
@@ -0,0 +1,290 @@
+"""Section pipeline - 代码驱动的章节生成流水线
+
+section_agent 把工具调用的顺序交给编排 LLM 决定，每次工具调用之间都要多等一轮编排对话。
+这里按固定的依赖关系直接调用子 agent，并在本地组装 Section：
+
+    介绍 ∥ 定义  →  定理 ∥ 练习题  →  总结
+
+同一阶段内的子 agent 互不依赖，用 asyncio.gather 并发执行。
+整个章节和每个子 agent 都受 agentDeadline 中设置的期限约束：超时的定理和练习题被丢弃，章节照常组装；
+介绍、定义和总结超时则整个章节失败。
+传入 ConceptIndex 时，定义和定理先在本地查找相似主题的已有结果，足够相似时直接复用。
+"""
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, List, Optional, Sequence
+
+from agents import RunConfig, trace
+from agents.tracing import get_current_trace
+from pydantic import BaseModel
+
+from agentDeadline import DeadlineExceeded, get_deadline_policy
+from agentRegistry import get_agent
+from agentRunner import run_agent
+from model import Section, Introduction, Definition, Theorem, Summary
+from promptCache import layout_prompt
+from ExerciseCreator.exercisePlanner import generate_exercises
+from sectionDigest import build_digest, summary_prompt
+from sectionStore import assign_ids
+
+if TYPE_CHECKING:
+    # 两个索引都依赖 numpy，只在调用方传入索引时才需要导入
+    from conceptIndex import ConceptIndex
+    from questionIndex import QuestionIndex
+    from ExerciseCreator.exerciseValidator import ExerciseValidator
+
+
+logger = logging.getLogger(__name__)
+
+
+async def _report(awaitable: Awaitable, kind: str, on_part: Optional[Callable[[str, Any], None]]):
+    """等待子 agent 完成，并在完成时立即通过 on_part 回调报告结果"""
+    value = await awaitable
+    if on_part is not None:
+        on_part(kind, value)
+    return value
+
+
+async def _unless_timed_out(awaitable: Awaitable, kind: str) -> Any:
+    """等待可以缺少的部分（定理、练习题），超过期限时返回 None"""
+    try:
+        return await awaitable
+    except DeadlineExceeded as error:
+        logger.warning("Dropping %s: %s", kind, error)
+        return None
+
+
+def _theorem_prompt(
+    topic: str,
+    definition: Definition,
+    index: int,
+    count: int,
+    context: Optional[str] = None,
+    references: str = "",
+    existing: Sequence[Theorem] = (),
+) -> str:
+    """生成第 index 个定理的输入
+
+    同一节的几个定理调用只有最后的序号不同，其余内容按共享范围从大到小排在前面（见 promptCache）。
+    """
+    return layout_prompt(
+        context,
+        f"章节的定义：\n{definition.definition}",
+        f"为「{topic}」生成一个定理及其证明。" + references,
+        "本章节已有下面的定理，不要重复：\n" + "\n".join(f"- {t.theorem}" for t in existing) if existing else None,
+        f"本章节共需要 {count} 个定理，这是第 {index} 个，请与其他定理考察不同的性质，避免重复。" if count > 1 else None,
+    )
+
+
+def _reference_block(title: str, texts: Sequence[str]) -> str:
+    """把参考示例拼成附加到子 agent 输入末尾的文本"""
+    if not texts:
+        return ""
+    examples = "\n\n".join(f"示例 {i}：\n{text}" for i, text in enumerate(texts, 1))
+    return (
+        f"\n\n以下是相关主题已有的{title}，可以参考其写法和符号，但要针对本主题，"
+        f"篇幅不要超过示例：\n\n{examples}"
+    )
+
+
+async def _completed(value: Any) -> Any:
+    return value
+
+
+def _without_ids(element: BaseModel) -> dict:
+    """写入 ConceptIndex 的记录不带 ID，复用时由 assign_ids 重新分配"""
+    ids = {name for name in type(element).model_fields if name == "id" or name.endswith("_id")}
+    return element.model_dump(mode="json", exclude=ids)
+
+
+async def _definition(topic: str, run_config: Optional[RunConfig], concept_index: Optional["ConceptIndex"]) -> Definition:
+    """生成定义；相似主题已有定义时直接复用，或作为参考示例传给 definition_agent"""
+    prompt = f"生成{topic}的定义"
+    if concept_index is None:
+        return await run_agent(get_agent("definition"), prompt, run_config)
+
+    reused, references = concept_index.lookup("definition", topic, k=2)
+    if reused:
+        logger.info("Reusing definition of %r for %r (similarity %.2f)", reused[0].key, topic, reused[0].score)
+        return Definition.model_validate(reused[0].record)
+    prompt += _reference_block("定义", [match.record["definition"] for match in references])
+    definition: Definition = await run_agent(get_agent("definition"), prompt, run_config)
+    concept_index.add("definition", topic, _without_ids(definition))
+    return definition
+
+
+def _theorem_text(theorem: dict) -> str:
+    return f"定理：{theorem['theorem']}" + (f"\n证明：{theorem['proof']}" if theorem.get("proof") else "")
+
+
+async def _theorems(
+    topic: str,
+    definition: Definition,
+    count: int,
+    run_config: Optional[RunConfig],
+    concept_index: Optional["ConceptIndex"],
+    on_part: Optional[Callable[[str, Any], None]],
+    context: Optional[str] = None,
+) -> List[Theorem]:
+    """并发生成 count 个定理；相似主题已有的定理直接复用，其余的以它们为参考示例生成"""
+    reused, references = [], []
+    if concept_index is not None and count:
+        matches, references = concept_index.lookup("theorem", topic, k=count + 2)
+        # 同一定理可能被多个相似主题各保存一份，按陈述去重
+        statements = set()
+        for match in matches:
+            if len(reused) < count and match.record["theorem"] not in statements:
+                statements.add(match.record["theorem"])
+                reused.append(match)
+
+    theorems = [Theorem.model_validate(match.record) for match in reused]
+    for match, theorem in zip(reused, theorems):
+        logger.info("Reusing theorem of %r for %r (similarity %.2f)", match.key, topic, match.score)
+        if on_part is not None:
+            on_part("theorem", theorem)
+
+    reference_text = _reference_block("定理", [_theorem_text(match.record) for match in references[:2]])
+    generated = await asyncio.gather(*(
+        _unless_timed_out(
+            _report(
+                run_agent(
+                    get_agent("theorem"),
+                    _theorem_prompt(topic, definition, i, count, context, reference_text, theorems),
+                    run_config,
+                ),
+                "theorem",
+                on_part,
+            ),
+            "theorem",
+        )
+        for i in range(len(theorems) + 1, count + 1)
+    ))
+    generated = [theorem for theorem in generated if theorem is not None]
+    if concept_index is not None:
+        for theorem in generated:
+            concept_index.add("theorem", topic, _without_ids(theorem))
+    return theorems + generated
+
+
+async def build_section(
+    topic: str,
+    theorem_count: int = 1,
+    exercise_count: int = 4,
+    exercise_concurrency: int = 5,
+    summary_token_budget: int = 800,
+    run_config: Optional[RunConfig] = None,
+    on_part: Optional[Callable[[str, Any], None]] = None,
+    question_index: Optional["QuestionIndex"] = None,
+    concept_index: Optional["ConceptIndex"] = None,
+    introduction: Optional[Introduction] = None,
+    definition: Optional[Definition] = None,
+    context: Optional[str] = None,
+    validator: Optional["ExerciseValidator"] = None,
+) -> Section:
+    """按固定流水线生成一个完整章节
+
+    所有子 agent 的运行放在同一个 trace 中（已有 trace 时沿用外层 trace），便于按章节查看耗时。
+    整个章节受名为 "section" 的期限约束，期限会传递到其中的每个子 agent。
+
+    Args:
+        topic: 章节主题或知识点，如 "函数定义域"
+        theorem_count: 定理数量（0 表示不生成定理），多个定理并发生成
+        exercise_count: 练习题数量，建议 3-5
+        exercise_concurrency: 并发出题的调用上限
+        summary_token_budget: 传给 summary_agent 的章节摘要的 token 上限
+        run_config: 传给每次 Runner.run 的运行配置
+        on_part: 每个部分完成时的回调 on_part(kind, value)，kind 为
+            introduction / definition / theorem / exercise / summary 之一，用于流式输出
+        question_index: 近重复题目索引，传入时与已有题目近似的练习题会被重新生成
+        concept_index: 定义和定理的相似度索引，传入时复用相似主题已有的定义和定理，新生成的结果会加入索引
+        introduction: 已有的标题和介绍（如章的规划中给出的），传入时不再调用 introduction_agent
+        definition: 已有的定义（如章中共享的概念块），传入时不再调用 definition_agent
+        context: 附加到介绍和定理输入中的前置内容（如章中其他节的紧凑引用）；
+            练习题的每次调用只带本节的定义，不附加这段内容
+        validator: 练习题检查器，传入时未通过结构检查或代码运行的题目会被单独重新生成
+    """
+    def run() -> Awaitable[Section]:
+        return _build_section(
+            topic, theorem_count, exercise_count, exercise_concurrency, summary_token_budget, run_config,
+            on_part, question_index, concept_index, introduction, definition, context, validator,
+        )
+
+    policy = get_deadline_policy()
+    if get_current_trace() is not None:
+        return await policy.run("section", run)
+    with trace("build_section"):
+        return await policy.run("section", run)
+
+
+async def _build_section(
+    topic: str,
+    theorem_count: int,
+    exercise_count: int,
+    exercise_concurrency: int,
+    summary_token_budget: int,
+    run_config: Optional[RunConfig],
+    on_part: Optional[Callable[[str, Any], None]],
+    question_index: Optional["QuestionIndex"],
+    concept_index: Optional["ConceptIndex"],
+    introduction: Optional[Introduction],
+    definition: Optional[Definition],
+    context: Optional[str],
+    validator: Optional["ExerciseValidator"],
+) -> Section:
+    """build_section 的实现，参数见 build_section"""
+    # 阶段 1：介绍和定义互不依赖，并发生成；调用方已给出的部分直接使用
+    if introduction is None:
+        introduction_step = run_agent(
+            get_agent("introduction"),
+            layout_prompt(context, f"为「{topic}」这一章节生成标题和介绍"),
+            run_config,
+        )
+    else:
+        introduction_step = _completed(introduction)
+    if definition is None:
+        definition_step = _definition(topic, run_config, concept_index)
+    else:
+        definition_step = _completed(definition)
+    introduction, definition = await asyncio.gather(
+        _report(introduction_step, "introduction", on_part),
+        _report(definition_step, "definition", on_part),
+    )
+
+    # 阶段 2：定理和练习题都只依赖定义，并发生成；练习题先规划再按题并发生成
+    theorems, exercises = await asyncio.gather(
+        _theorems(topic, definition, theorem_count, run_config, concept_index, on_part, context),
+        generate_exercises(
+            topic,
+            count=exercise_count,
+            max_concurrency=exercise_concurrency,
+            # 每道题都带着这段上下文，只放出题需要的本节定义，章的引用只给介绍和定理
+            context=f"章节的定义：\n{definition.definition}",
+            run_config=run_config,
+            on_exercise=(lambda exercise: on_part("exercise", exercise)) if on_part is not None else None,
+            question_index=question_index,
+            validator=validator,
+        ),
+    )
+
+    # 阶段 3：总结依赖前面所有内容，只传入定义、定理陈述和题干组成的紧凑摘要
+    digest = build_digest(definition.definition, theorems, exercises.exercises, summary_token_budget)
+    summary: Summary = await _report(
+        run_agent(get_agent("summary"), summary_prompt(topic, digest), run_config),
+        "summary",
+        on_part,
+    )
+
+    # 模型留空的 ID 在这里统一补全，供 sectionStore / sectionPatch 按 ID 定位
+    return assign_ids(Section(
+        section_title_id=introduction.section_title_id,
+        introduction_id=introduction.introduction_id,
+        section_title=introduction.section_title,
+        introduction=introduction.introduction,
+        definition=definition.definition,
+        definition_id=definition.definition_id,
+        theorems=theorems,
+        examples=exercises.exercises,
+        summary=summary.summary,
+        summary_id=summary.summary_id,
+    ))
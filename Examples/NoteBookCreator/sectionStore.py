@@ -0,0 +1,194 @@
+"""Section store - 按元素 ID 持久化和修改章节
+
+model.py 中几乎每个元素都带有 ID 字段（Section.id、Theorem.id、BaseExample.id、question_id、proof_id 等）。
+assign_ids 为模型留空的 ID 自动赋值；SectionStore 把章节和渲染好的 Markdown 块一起保存，
+替换或追加单个定理、练习题时只重新渲染对应的块，其余块原样保留。
+
+存储目录中每个章节两个文件：
+    <section_id>.json   章节内容和按顺序排列的 Markdown 块
+    <section_id>.md     拼接后的完整 Markdown
+
+用法：
+    store = SectionStore("output/sections")
+    section_id = store.save(section)
+    store.put_example(section_id, new_example)   # id 已存在时替换，否则追加
+    print(store.markdown(section_id))
+"""
+
+import json
+import os
+import tempfile
+import uuid
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+from pydantic import BaseModel
+
+from model import Chapter, Example, Notebook, Section, Theorem
+from sectionMarkdown import render_exercise, render_theorem, section_blocks
+
+
+def new_id(prefix: str) -> str:
+    """生成形如 "example_3f9a2c1b" 的 ID"""
+    return f"{prefix}_{uuid.uuid4().hex[:8]}"
+
+
+def _assign_field_ids(element: BaseModel, prefix: Optional[str] = None) -> None:
+    """为元素自身（prefix 不为 None 时）和各个 *_id 字段中留空的 ID 赋值"""
+    if prefix is not None and getattr(element, "id", None) is None:
+        element.id = new_id(prefix)
+    fields = type(element).model_fields
+    for name in fields:
+        if not name.endswith("_id") or getattr(element, name) is not None:
+            continue
+        field = name[:-3]
+        # 对应字段存在但为空（如没有 explanation）时不分配 ID
+        if field in fields and getattr(element, field) is None:
+            continue
+        setattr(element, name, new_id(field))
+
+
+def assign_ids(section: Section) -> Section:
+    """为章节、定理和练习题中留空的 ID 赋值（原地修改），已有的 ID 保持不变"""
+    _assign_field_ids(section, "section")
+    for theorem in section.theorems:
+        _assign_field_ids(theorem, "theorem")
+    for exercise in section.examples:
+        _assign_field_ids(exercise, "example")
+    return section
+
+
+def assign_chapter_ids(chapter: Chapter) -> Chapter:
+    """为章、共享概念块和各节中留空的 ID 赋值（原地修改）"""
+    _assign_field_ids(chapter, "chapter")
+    for block in chapter.concepts:
+        _assign_field_ids(block, "concept_block")
+    for section in chapter.sections:
+        assign_ids(section)
+    return chapter
+
+
+def assign_notebook_ids(notebook: Notebook) -> Notebook:
+    """为笔记本及其各章中留空的 ID 赋值（原地修改）"""
+    _assign_field_ids(notebook, "notebook")
+    for chapter in notebook.chapters:
+        assign_chapter_ids(chapter)
+    return notebook
+
+
+def inherit_ids(element: BaseModel, previous: BaseModel) -> BaseModel:
+    """新生成的元素沿用被替换元素的 ID，使其他地方对这些 ID 的引用保持有效"""
+    for name in type(element).model_fields:
+        if (name == "id" or name.endswith("_id")) and getattr(previous, name, None) is not None:
+            setattr(element, name, getattr(previous, name))
+    return element
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    """先写临时文件再原子替换，进程崩溃时不会留下写了一半的文件"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class SectionStore:
+    """以章节 ID 为键、基于文件的章节存储
+
+    所有方法都是同步的，读取、修改、写回之间没有 await，因此同一事件循环中的并发修改不会互相覆盖。
+
+    Args:
+        root: 存储目录
+    """
+
+    def __init__(self, root: Union[str, Path] = "sections"):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _json_path(self, section_id: str) -> Path:
+        return self.root / f"{section_id}.json"
+
+    def _read(self, section_id: str) -> Tuple[Section, List[Tuple[str, str]]]:
+        path = self._json_path(section_id)
+        if not path.exists():
+            raise KeyError(f"Section {section_id!r} not found in {self.root}")
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        section = Section.model_validate(data["section"])
+        blocks = [(block_id, markdown) for block_id, markdown in data["blocks"]]
+        return section, blocks
+
+    def _write(self, section: Section, blocks: List[Tuple[str, str]]) -> None:
+        data = {"section": section.model_dump(mode="json"), "blocks": blocks}
+        _write_atomic(self._json_path(section.id), json.dumps(data, ensure_ascii=False, indent=2))
+        _write_atomic(self.root / f"{section.id}.md", "".join(markdown for _, markdown in blocks))
+
+    def save(self, section: Section) -> str:
+        """保存整个章节（补全 ID 并重新渲染所有块），返回章节 ID"""
+        assign_ids(section)
+        self._write(section, section_blocks(section))
+        return section.id
+
+    def load(self, section_id: str) -> Section:
+        return self._read(section_id)[0]
+
+    def markdown(self, section_id: str) -> str:
+        return "".join(markdown for _, markdown in self._read(section_id)[1])
+
+    def ids(self) -> List[str]:
+        """所有已保存章节的 ID"""
+        return sorted(path.stem for path in self.root.glob("*.json"))
+
+    def get_theorem(self, section_id: str, theorem_id: str) -> Theorem:
+        for theorem in self.load(section_id).theorems:
+            if theorem.id == theorem_id:
+                return theorem
+        raise KeyError(f"Theorem {theorem_id!r} not found in section {section_id!r}")
+
+    def get_example(self, section_id: str, example_id: str) -> Example:
+        for exercise in self.load(section_id).examples:
+            if exercise.id == example_id:
+                return exercise
+        raise KeyError(f"Example {example_id!r} not found in section {section_id!r}")
+
+    # 块的顺序固定为：header、definition、各定理、各练习题、summary，
+    # 因此第 i 个定理的块位于 2 + i，第 i 道练习题的块位于 2 + 定理数 + i
+
+    def put_theorem(self, section_id: str, theorem: Theorem) -> Theorem:
+        """按 id 替换定理；id 为空或不存在时追加到定理列表末尾。只重新渲染该定理的块"""
+        section, blocks = self._read(section_id)
+        _assign_field_ids(theorem, "theorem")
+        index = next((i for i, item in enumerate(section.theorems) if item.id == theorem.id), None)
+        if index is None:
+            index = len(section.theorems)
+            section.theorems.append(theorem)
+            blocks.insert(2 + index, ("", ""))
+        else:
+            section.theorems[index] = theorem
+
+        blocks[2 + index] = (theorem.id, render_theorem(theorem, index + 1, heading=(index == 0)))
+        self._write(section, blocks)
+        return theorem
+
+    def put_example(self, section_id: str, exercise: Example) -> Example:
+        """按 id 替换练习题；id 为空或不存在时追加到练习题列表末尾。只重新渲染该题的块"""
+        section, blocks = self._read(section_id)
+        _assign_field_ids(exercise, "example")
+        index = next((i for i, item in enumerate(section.examples) if item.id == exercise.id), None)
+        if index is None:
+            index = len(section.examples)
+            section.examples.append(exercise)
+            blocks.insert(2 + len(section.theorems) + index, ("", ""))
+        else:
+            section.examples[index] = exercise
+
+        blocks[2 + len(section.theorems) + index] = (
+            exercise.id,
+            render_exercise(exercise, index + 1, heading=(index == 0)),
+        )
+        self._write(section, blocks)
+        return exercise
@@ -0,0 +1,158 @@
+"""Section stream - 边生成边输出 Markdown 的流式章节渲染
+
+两种来源：
+- stream_section：基于 Runner.run_streamed 运行 section_agent，每个工具（子 agent）返回时立即渲染对应部分。
+  标题和介绍由编排 agent 在最终输出中给出，因此在最后一步才出现；最终输出中的 ID 引用由 artifactTable 组装成 Section
+- stream_pipeline_section：基于 sectionPipeline.build_section，介绍、定义、每个定理、每道练习题、总结
+  在各自的子 agent 完成时立即渲染
+
+流式输出时的编号按完成顺序临时分配；两者最后都会产出一个 kind 为 "final" 的部分，
+包含按正确顺序和编号重新渲染的完整 Markdown。write_section_markdown 把这些部分逐个写入文件。
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from agents import Agent, RunConfig, Runner
+
+from artifactTable import assemble, new_context
+from model import Section, Introduction, Definition, Theorem, ExerciseList, Summary
+from agentRegistry import get_agent
+from sectionMarkdown import (
+    render_header,
+    render_definition,
+    render_theorem,
+    render_exercise,
+    render_summary,
+    section_to_markdown,
+)
+from sectionPipeline import build_section
+
+
+# section_agent 的工具名 -> 工具返回的模型类型
+TOOL_OUTPUT_TYPES = {
+    "generate_definition": Definition,
+    "generate_theorem": Theorem,
+    "generate_exercises": ExerciseList,
+    "generate_summary": Summary,
+}
+
+
+@dataclass
+class SectionPart:
+    """流式输出的一个部分
+
+    Attributes:
+        kind: header / definition / theorem / exercise / summary / final
+        markdown: 该部分渲染后的 Markdown
+        value: 对应的模型对象（final 时为完整的 Section）
+    """
+    kind: str
+    markdown: str
+    value: Any
+
+
+class _PartRenderer:
+    """按到达顺序渲染各部分，并临时分配定理和练习题的编号"""
+
+    def __init__(self):
+        self.theorem_count = 0
+        self.exercise_count = 0
+
+    def render(self, value: Any) -> List[SectionPart]:
+        if isinstance(value, Introduction):
+            return [SectionPart("header", render_header(value.section_title, value.introduction), value)]
+        if isinstance(value, Definition):
+            return [SectionPart("definition", render_definition(value.definition), value)]
+        if isinstance(value, Theorem):
+            self.theorem_count += 1
+            markdown = render_theorem(value, self.theorem_count, heading=(self.theorem_count == 1))
+            return [SectionPart("theorem", markdown, value)]
+        if isinstance(value, ExerciseList):
+            return [part for exercise in value.exercises for part in self.render(exercise)]
+        if isinstance(value, Summary):
+            return [SectionPart("summary", render_summary(value.summary), value)]
+        # 其余都是练习题（Example 的各个子类型）
+        self.exercise_count += 1
+        markdown = render_exercise(value, self.exercise_count, heading=(self.exercise_count == 1))
+        return [SectionPart("exercise", markdown, value)]
+
+
+def _tool_output_value(tool_name: Optional[str], output: Any) -> Any:
+    """取出工具返回的模型对象；工具返回的是带 ID 的 JSON 文本时重新校验"""
+    if isinstance(output, str) and tool_name in TOOL_OUTPUT_TYPES:
+        return TOOL_OUTPUT_TYPES[tool_name].model_validate_json(output)
+    return output
+
+
+async def stream_section(
+    input: str,
+    agent: Optional[Agent] = None,
+    run_config: Optional[RunConfig] = None,
+) -> AsyncIterator[SectionPart]:
+    """用 Runner.run_streamed 运行 section_agent（或传入的 agent），每个子 agent 返回时产出对应部分"""
+    agent = agent or get_agent("section")
+    table = new_context(agent.output_type, run_config)
+    result = Runner.run_streamed(agent, input, context=table, run_config=run_config)
+    renderer = _PartRenderer()
+    tool_names: Dict[str, str] = {}
+
+    async for event in result.stream_events():
+        if event.type != "run_item_stream_event":
+            continue
+        raw_item = event.item.raw_item
+        if event.name == "tool_called":
+            tool_names[getattr(raw_item, "call_id", None)] = getattr(raw_item, "name", None)
+        elif event.name == "tool_output":
+            call_id = raw_item.get("call_id") if isinstance(raw_item, dict) else getattr(raw_item, "call_id", None)
+            tool_name = tool_names.get(call_id)
+            if tool_name not in TOOL_OUTPUT_TYPES:
+                continue
+            for part in renderer.render(_tool_output_value(tool_name, event.item.output)):
+                yield part
+
+    section: Section = assemble(result.final_output, table)
+    yield SectionPart("final", section_to_markdown(section), section)
+
+
+async def stream_pipeline_section(topic: str, **pipeline_kwargs) -> AsyncIterator[SectionPart]:
+    """运行 build_section，每个子 agent 完成时产出对应部分"""
+    queue: asyncio.Queue = asyncio.Queue()
+    task = asyncio.ensure_future(
+        build_section(topic, on_part=lambda kind, value: queue.put_nowait(value), **pipeline_kwargs)
+    )
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+    renderer = _PartRenderer()
+
+    try:
+        while True:
+            value = await queue.get()
+            if value is None:
+                break
+            for part in renderer.render(value):
+                yield part
+        section = task.result()
+    finally:
+        # 调用方提前停止迭代时取消还在运行的子 agent
+        task.cancel()
+
+    yield SectionPart("final", section_to_markdown(section), section)
+
+
+async def write_section_markdown(parts: AsyncIterator[SectionPart], filepath: str) -> Section:
+    """把流式部分逐个追加写入文件，最后用完整渲染结果覆盖，修正顺序和编号
+
+    用法：
+        section = await write_section_markdown(stream_pipeline_section("函数定义域"), "函数定义域.md")
+    """
+    section = None
+    with open(filepath, 'w', encoding='utf-8') as f:
+        async for part in parts:
+            if part.kind == "final":
+                section = part.value
+                f.seek(0)
+                f.truncate()
+            f.write(part.markdown)
+            f.flush()
+    return section
@@ -0,0 +1,467 @@
+"""Stub model - 本地离线的假模型，用于在没有网络和 API Key 的情况下运行整个 agent 树
+
+StubModel 根据 output_schema 的名称返回预置的合法 JSON：
+- 如果 agent 带有工具且输入中还没有工具结果，先为每个工具各发起一次调用（模拟编排 agent）
+- 否则直接输出对应模型（Definition、Theorem、ExercisePlan 等）的 JSON；
+  编排 agent 的 SectionRefs / ExerciseRefs 按输入中工具结果带的 ID 生成（见 canned_output）
+
+可以配置模拟延迟、长尾延迟、429 限流错误和格式有小错误的输出（见 MALFORMATIONS）的注入比例。通过 RunConfig(model_provider=StubModelProvider(...))
+传入后，嵌套的 as_tool 子运行也会使用同一个假模型。
+
+prefix_cache=True 时模拟服务端的前缀缓存（见 PrefixCache），命中的 token 数与真实响应一样报告在
+usage.input_tokens_details.cached_tokens 中。
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from openai import RateLimitError
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseUsage,
+)
+from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails
+
+from agents import FunctionTool, Model, ModelProvider, ModelResponse, Usage
+from agents.tracing import generation_span
+
+from promptCache import CACHE_KEY_FIELD, prefix_text
+from rateLimit import estimate_tokens
+
+
+_MULTIPLE_CHOICE = {
+    "question": "函数 f(x) = 1/(x-1) 的定义域是？",
+    "options": ["A. R", "B. {x | x ≠ 1}", "C. {x | x > 1}", "D. {x | x ≥ 1}"],
+    "correct_answer": "B",
+    "explanation": "分母不能为零，因此 x ≠ 1。",
+}
+_FILL_BLANK = {
+    "question": "函数 f(x) = √x 的定义域是 [空1]。",
+    "blanks": {"[空1]": "[0, +∞)"},
+    "explanation": "偶次根式的被开方数必须非负。",
+}
+_PROOF = {
+    "question": "证明：函数 f(x) = 2x + 1 在 R 上单调递增。",
+    "proof": "任取 x1 < x2，则 f(x2) - f(x1) = 2(x2 - x1) > 0，所以 f(x1) < f(x2)，f(x) 在 R 上单调递增。",
+}
+_SHORT_ANSWER = {
+    "question": "求函数的定义域时需要考虑哪些限制条件？",
+    "answer": "分母不为零、偶次根式被开方数非负、对数的真数大于零等。",
+    "explanation": "这些条件保证函数表达式有意义。",
+}
+_CODE = {
+    "question": "编写一个 Python 函数，判断给定的 x 是否在 f(x) = 1/(x-1) 的定义域内。",
+    "code_answer": "def in_domain(x):\n    # 分母不能为零\n    return x != 1\n",
+    "explanation": "只需排除使分母为零的点。",
+}
+_DEFINITION = "设 f 是从集合 A 到集合 B 的函数，则集合 A 称为函数 f 的定义域，即使函数表达式有意义的自变量 x 的取值集合。"
+_THEOREM = {
+    "theorem": "若函数 f(x) 与 g(x) 的定义域分别为 A 与 B，则 f(x) + g(x) 的定义域为 A ∩ B。",
+    "proof": "f(x) + g(x) 有意义当且仅当 f(x) 与 g(x) 同时有意义，即 x ∈ A 且 x ∈ B，所以定义域为 A ∩ B。",
+}
+_SUMMARY = "本章介绍了函数定义域的概念，讨论了和函数定义域的性质，并通过由浅入深的练习巩固了求定义域的常见方法。"
+
+# output_schema 名称 -> 预置输出
+CANNED_OUTPUTS: Dict[str, Dict[str, Any]] = {
+    "Introduction": {"section_title": "函数的定义域", "introduction": "定义域是函数的三要素之一，本章学习如何确定函数的定义域。"},
+    "Definition": {"definition": _DEFINITION},
+    "Theorem": _THEOREM,
+    "Summary": {"summary": _SUMMARY},
+    "MultipleChoiceQuestion": _MULTIPLE_CHOICE,
+    "FillBlankQuestion": _FILL_BLANK,
+    "ProofQuestion": _PROOF,
+    "ShortAnswerQuestion": _SHORT_ANSWER,
+    "CodeQuestion": _CODE,
+    "ExercisePlan": {
+        "slots": [
+            {"question_type": "multiple_choice", "level": 1, "focus": "分式的定义域"},
+            {"question_type": "fill_blank", "level": 2, "focus": "根式的定义域"},
+            {"question_type": "short_answer", "level": 3, "focus": "限制条件的归纳"},
+            {"question_type": "proof", "level": 4, "focus": "函数性质"},
+        ]
+    },
+    "ExerciseList": {"exercises": [_MULTIPLE_CHOICE, _FILL_BLANK, _SHORT_ANSWER, _PROOF]},
+    "ChapterPlan": {
+        "chapter_title": "函数",
+        "introduction": "函数是描述变量之间依赖关系的基本工具，本章依次学习函数的定义域、值域和单调性。",
+        "concepts": ["函数", "定义域"],
+        "sections": [
+            {"title": "函数的定义域", "concepts": ["定义域", "函数"], "focus": "求定义域",
+             "introduction": "本节学习如何确定函数的定义域。"},
+            {"title": "函数的值域", "concepts": ["值域", "函数", "定义域"], "focus": "求值域",
+             "introduction": "在定义域的基础上，本节学习函数值的取值范围。"},
+            {"title": "函数的单调性", "concepts": ["单调性", "函数", "定义域"], "focus": "判断单调性",
+             "introduction": "本节研究函数值随自变量变化的趋势。"},
+        ],
+    },
+    "Section": {
+        "section_title": "函数的定义域",
+        "introduction": "定义域是函数的三要素之一，本章学习如何确定函数的定义域。",
+        "definition": _DEFINITION,
+        "theorems": [_THEOREM],
+        "examples": [_MULTIPLE_CHOICE, _FILL_BLANK, _SHORT_ANSWER, _PROOF],
+        "summary": _SUMMARY,
+    },
+}
+
+
+def _tool_results(input: Any) -> List[Dict[str, Any]]:
+    """输入中各工具结果解析出的 JSON 对象（不是 JSON 的结果跳过）"""
+    if isinstance(input, str):
+        return []
+    results = []
+    for item in input:
+        if isinstance(item, dict) and item.get("type") == "function_call_output":
+            try:
+                value = json.loads(item.get("output") or "")
+            except (TypeError, ValueError):
+                continue
+            if isinstance(value, dict):
+                results.append(value)
+    return results
+
+
+def _reference_output(name: str, input: Any) -> Optional[Dict[str, Any]]:
+    """编排 agent 的输出：按顺序引用工具结果中的 ID"""
+    results = _tool_results(input)
+    exercise_ids = [
+        exercise["id"]
+        for result in results
+        for exercise in (result["exercises"] if "exercises" in result else [result])
+        if "question" in exercise and "id" in exercise
+    ]
+    if name == "ExerciseRefs":
+        return {"exercise_ids": exercise_ids}
+    if name == "SectionRefs":
+        def first(field: str) -> str:
+            return next((result[field] for result in results if field in result), "")
+
+        return {
+            **CANNED_OUTPUTS["Introduction"],
+            "definition_id": first("definition_id"),
+            "theorem_ids": [result["id"] for result in results if "theorem" in result and "id" in result],
+            "example_ids": exercise_ids,
+            "summary_id": first("summary_id"),
+        }
+    return None
+
+
+def canned_output(name: Optional[str], input: Any) -> Optional[Dict[str, Any]]:
+    """名为 name 的输出 schema 的预置输出，没有时返回 None"""
+    if name is None:
+        return None
+    return _reference_output(name, input) or CANNED_OUTPUTS.get(name)
+
+
+def _unescaped_latex(data: Dict[str, Any]) -> Optional[str]:
+    field = next((name for name in ("proof", "theorem", "explanation") if isinstance(data.get(name), str)), None)
+    if field is None:
+        return None
+    text = json.dumps({**data, field: data[field] + " 由 \\frac{a}{b} 与 \\alpha 可知结论成立。"}, ensure_ascii=False)
+    # 模型忘记转义 LaTeX 的反斜杠
+    return text.replace("\\\\", "\\")
+
+
+# 格式有小错误的输出：名称 -> 由预置输出生成错误文本的函数（不适用时返回 None）
+MALFORMATIONS = {
+    "extra_text": lambda data: f"好的，结果如下：\n```json\n{json.dumps(data, ensure_ascii=False)}\n```\n如需调整请告诉我。",
+    "trailing_comma": lambda data: json.dumps(data, ensure_ascii=False)[:-1] + ",}",
+    "options_string": lambda data: json.dumps({**data, "options": " ".join(data["options"])}, ensure_ascii=False)
+    if "options" in data else None,
+    "blanks_list": lambda data: json.dumps({**data, "blanks": list(data["blanks"].values())}, ensure_ascii=False)
+    if "blanks" in data else None,
+    "latex": _unescaped_latex,
+    # 截断的输出无法在本地修复，只能重新请求
+    "truncated": lambda data: json.dumps(data, ensure_ascii=False)[:20],
+}
+
+
+def make_rate_limit_error() -> RateLimitError:
+    """构造一个与 OpenAI SDK 抛出的相同的 429 错误"""
+    request = httpx.Request("POST", "http://stub.local/v1/responses")
+    response = httpx.Response(429, request=request)
+    return RateLimitError("stub rate limit exceeded", response=response, body=None)
+
+
+def _has_tool_output(input: Any) -> bool:
+    if isinstance(input, str):
+        return False
+    return any(isinstance(item, dict) and item.get("type") == "function_call_output" for item in input)
+
+
+def tool_arguments(parameters: Optional[Dict[str, Any]], text: str) -> str:
+    """按工具的参数 schema 构造调用参数：每个参数都填入 text（as_tool 生成的工具只有一个 input 参数）"""
+    names = list(((parameters or {}).get("properties") or {}).keys()) or ["input"]
+    return json.dumps({name: text for name in names}, ensure_ascii=False)
+
+
+def _input_details(cached_tokens: int) -> InputTokensDetails:
+    # 新版 openai 增加了 cache_write_tokens 字段，旧版会忽略多余字段
+    return InputTokensDetails.model_validate({"cached_tokens": cached_tokens, "cache_write_tokens": 0})
+
+
+def _last_user_text(input: Any) -> str:
+    if isinstance(input, str):
+        return input
+    for item in reversed(input):
+        if isinstance(item, dict) and item.get("role") == "user":
+            content = item.get("content")
+            return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+    return ""
+
+
+class PrefixCache:
+    """模拟服务端的前缀缓存：请求文本从开头起逐字节相同的部分按块命中
+
+    与 OpenAI 的规则相同，前缀达到 min_tokens 后才开始缓存，之后每 block_tokens 一档；
+    token 数按 rateLimit.estimate_tokens 的比例（每 token 2 个字符）换算。
+    请求的 prompt_cache_key 不同时互不命中（服务端按 key 把请求路由到不同的缓存）。
+
+    Args:
+        min_tokens: 可缓存的最短前缀
+        block_tokens: 缓存的粒度
+        max_entries: 保留的前缀块数上限，超出时淘汰最久未命中的
+    """
+
+    CHARS_PER_TOKEN = 2
+
+    def __init__(self, min_tokens: int = 1024, block_tokens: int = 128, max_entries: int = 100_000):
+        self.min_tokens = min_tokens
+        self.block_tokens = block_tokens
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, None]" = OrderedDict()
+
+    def lookup(self, key: str, text: str) -> int:
+        """返回 text 命中的 token 数（key 不同的请求互不命中），并把 text 的各档前缀加入缓存"""
+        digest = hashlib.sha1(key.encode("utf-8"))
+        cached, hit, position = 0, True, 0
+        boundary = self.min_tokens
+        while boundary * self.CHARS_PER_TOKEN <= len(text):
+            end = boundary * self.CHARS_PER_TOKEN
+            digest.update(text[position:end].encode("utf-8"))
+            position = end
+            entry = digest.digest()
+            if hit and entry in self._entries:
+                self._entries.move_to_end(entry)
+                cached = boundary
+            else:
+                hit = False
+                self._entries[entry] = None
+            boundary += self.block_tokens
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return cached
+
+
+class StubModel(Model):
+    """离线假模型
+
+    Args:
+        latency: 每次调用的模拟延迟（秒）
+        jitter: 延迟的随机浮动比例，0.2 表示 ±20%
+        slow_rate: 每次调用以该概率变为长尾调用
+        slow_latency: 长尾调用的延迟（秒）
+        rate_limit_rate: 每次调用以该概率抛出 429 RateLimitError
+        malformed_rate: 结构化输出以该概率带有 MALFORMATIONS 中的一种格式错误
+        seed: 随机数种子，保证结果可复现
+        input_tokens: 每次调用报告的输入 token 数，None 表示按输入长度估算
+        output_tokens: 每次调用报告的输出 token 数，None 表示按输出长度估算
+        prefix_cache: 是否模拟服务端的前缀缓存，也可以直接传入 PrefixCache 指定粒度
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_latency: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        seed: Optional[int] = 0,
+        input_tokens: Optional[int] = None,
+        output_tokens: Optional[int] = None,
+        prefix_cache: Any = False,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.rate_limit_rate = rate_limit_rate
+        self.malformed_rate = malformed_rate
+        self.fixed_input_tokens = input_tokens
+        self.fixed_output_tokens = output_tokens
+        if prefix_cache is True:
+            prefix_cache = PrefixCache()
+        self.prefix_cache: Optional[PrefixCache] = prefix_cache or None
+        self._random = random.Random(seed)
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        """清零调用统计"""
+        self.calls = 0
+        self.rate_limited = 0
+        self.malformed = 0
+        self.tool_calls = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+
+    async def _simulate(self) -> None:
+        self.calls += 1
+        delay = self.latency * (1 + self._random.uniform(-self.jitter, self.jitter))
+        if self.slow_rate and self._random.random() < self.slow_rate:
+            delay = self.slow_latency
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self._random.random() < self.rate_limit_rate:
+            self.rate_limited += 1
+            raise make_rate_limit_error()
+
+    def _build_output(self, input: Any, tools: List[Any], output_schema: Any) -> List[Any]:
+        function_tools = [tool for tool in tools if isinstance(tool, FunctionTool)]
+        if function_tools and not _has_tool_output(input):
+            text = _last_user_text(input)
+            self.tool_calls += len(function_tools)
+            return [
+                ResponseFunctionToolCall(
+                    id=f"fc_{uuid.uuid4().hex}",
+                    call_id=f"call_{uuid.uuid4().hex}",
+                    type="function_call",
+                    name=tool.name,
+                    arguments=tool_arguments(tool.params_json_schema, text),
+                    status="completed",
+                )
+                for tool in function_tools
+            ]
+
+        if output_schema is None or output_schema.is_plain_text():
+            text = "stub response"
+        else:
+            text = self._structured_text(canned_output(output_schema.name(), input))
+        return [
+            ResponseOutputMessage(
+                id=f"msg_{uuid.uuid4().hex}",
+                type="message",
+                role="assistant",
+                status="completed",
+                content=[ResponseOutputText(type="output_text", text=text, annotations=[])],
+            )
+        ]
+
+    def _structured_text(self, data: Dict[str, Any]) -> str:
+        if self.malformed_rate and self._random.random() < self.malformed_rate:
+            candidates = [text for text in (make(data) for make in MALFORMATIONS.values()) if text is not None]
+            self.malformed += 1
+            return self._random.choice(candidates)
+        return json.dumps(data, ensure_ascii=False)
+
+    def _usage(
+        self,
+        system_instructions: Optional[str],
+        input: Any,
+        output: List[Any],
+        model_settings: Any,
+        tools: List[Any],
+        output_schema: Any,
+    ) -> Usage:
+        text = (system_instructions or "") + json.dumps(input, ensure_ascii=False, default=str)
+        input_tokens = self.fixed_input_tokens
+        if input_tokens is None:
+            input_tokens = estimate_tokens(text)
+        cached_tokens = 0
+        if self.prefix_cache is not None:
+            # 工具定义和输出 schema 在真实请求中位于最前，这里只让它们参与比较，不计入 token 数
+            extra_args = getattr(model_settings, "extra_args", None) or {}
+            key = str(extra_args.get(CACHE_KEY_FIELD, "")) + "\n" + prefix_text(None, tools, output_schema)
+            cached_tokens = min(self.prefix_cache.lookup(key, text), input_tokens)
+        output_tokens = self.fixed_output_tokens
+        if output_tokens is None:
+            output_tokens = estimate_tokens("".join(item.model_dump_json() for item in output))
+        self.input_tokens += input_tokens
+        self.cached_tokens += cached_tokens
+        self.output_tokens += output_tokens
+        return Usage(
+            requests=1,
+            input_tokens=input_tokens,
+            input_tokens_details=_input_details(cached_tokens),
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+        )
+
+    async def get_response(
+        self,
+        system_instructions,
+        input,
+        model_settings,
+        tools,
+        output_schema,
+        handoffs,
+        tracing,
+        **kwargs,
+    ) -> ModelResponse:
+        # 与真实模型一样发出 generation span，使 tracing 处理器能统计离线运行的 token
+        with generation_span(model="stub", disabled=tracing.is_disabled()) as span:
+            await self._simulate()
+            output = self._build_output(input, tools, output_schema)
+            usage = self._usage(system_instructions, input, output, model_settings, tools, output_schema)
+            span.span_data.usage = {
+                "input_tokens": usage.input_tokens,
+                "output_tokens": usage.output_tokens,
+                "input_tokens_details": {"cached_tokens": usage.input_tokens_details.cached_tokens},
+            }
+        return ModelResponse(output=output, usage=usage, response_id=None)
+
+    async def stream_response(
+        self,
+        system_instructions,
+        input,
+        model_settings,
+        tools,
+        output_schema,
+        handoffs,
+        tracing,
+        **kwargs,
+    ) -> AsyncIterator[Any]:
+        # 不模拟逐 token 的增量事件，只在延迟结束后发出一个 response.completed 事件
+        await self._simulate()
+        output = self._build_output(input, tools, output_schema)
+        usage = self._usage(system_instructions, input, output, model_settings, tools, output_schema)
+        response = Response(
+            id=f"resp_{uuid.uuid4().hex}",
+            created_at=time.time(),
+            model="stub",
+            object="response",
+            output=output,
+            parallel_tool_calls=True,
+            tool_choice="auto",
+            tools=[],
+            usage=ResponseUsage(
+                input_tokens=usage.input_tokens,
+                input_tokens_details=usage.input_tokens_details,
+                output_tokens=usage.output_tokens,
+                output_tokens_details=OutputTokensDetails(reasoning_tokens=0),
+                total_tokens=usage.total_tokens,
+            ),
+        )
+        yield ResponseCompletedEvent(type="response.completed", response=response, sequence_number=0)
+
+
+class StubModelProvider(ModelProvider):
+    """所有模型名都返回同一个 StubModel，便于统计整棵 agent 树的调用"""
+
+    def __init__(self, model: Optional[StubModel] = None, **kwargs):
+        self.model = model or StubModel(**kwargs)
+
+    def get_model(self, model_name: Optional[str]) -> Model:
+        return self.model
@@ -0,0 +1,211 @@
+"""Stub server - 本地的 OpenAI 兼容 HTTP 假服务器，用于离线测试真实的 HTTP 客户端和连接池
+
+stubModel 在 SDK 的 Model 层替换模型，不经过网络；这里则实现 POST /v1/responses，
+请求经过 openai 库和 httpx 的完整路径（连接池、keep-alive、超时），因此可以测量连接复用和排队。
+输出规则与 StubModel 相同：带工具且输入中还没有工具结果时为每个工具发起一次调用，
+否则按请求中 JSON schema 的 title 返回 canned_output 给出的预置输出。
+
+服务器按 HTTP/1.1 keep-alive 处理连接，并统计接受的连接数、请求数和同时打开的最大连接数：
+- GET /stats：返回统计
+- POST /stats/reset：清零统计
+
+只支持非流式请求。
+
+用法（在 NoteBookCreator 目录下）：
+    python stubServer.py --port 8765 --latency 0.05
+    python batchBuilder.py topics.txt --base-url http://127.0.0.1:8765/v1
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from rateLimit import estimate_tokens
+from stubModel import _has_tool_output, _last_user_text, canned_output, tool_arguments
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found"}
+
+
+def build_response(request: Dict[str, Any]) -> Dict[str, Any]:
+    """按 Responses API 请求构造响应"""
+    input = request.get("input", "")
+    tools = [tool for tool in request.get("tools") or [] if tool.get("type") == "function"]
+    if tools and not _has_tool_output(input):
+        text = _last_user_text(input)
+        output = [
+            {
+                "id": f"fc_{uuid.uuid4().hex}",
+                "call_id": f"call_{uuid.uuid4().hex}",
+                "type": "function_call",
+                "name": tool["name"],
+                "arguments": tool_arguments(tool.get("parameters"), text),
+                "status": "completed",
+            }
+            for tool in tools
+        ]
+    else:
+        schema = ((request.get("text") or {}).get("format") or {}).get("schema") or {}
+        canned = canned_output(schema.get("title"), input)
+        text = "stub response" if canned is None else json.dumps(canned, ensure_ascii=False)
+        output = [{
+            "id": f"msg_{uuid.uuid4().hex}",
+            "type": "message",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }]
+    input_tokens = estimate_tokens((request.get("instructions") or "") + json.dumps(input, ensure_ascii=False))
+    output_tokens = estimate_tokens(json.dumps(output, ensure_ascii=False))
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": request.get("model") or "stub",
+        "status": "completed",
+        "output": output,
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": input_tokens,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": output_tokens,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": input_tokens + output_tokens,
+        },
+    }
+
+
+class StubServer:
+    """OpenAI 兼容的假服务器
+
+    Args:
+        latency: 每个模型请求的模拟延迟（秒）
+        jitter: 延迟的随机浮动比例
+        seed: 随机数种子
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: Optional[int] = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.active = 0
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        """清零连接数和请求数；仍然打开的连接不受影响"""
+        self.connections = 0
+        self.requests = 0
+        self.max_active = self.active
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "connections": self.connections,
+            "requests": self.requests,
+            "active": self.active,
+            "max_active": self.max_active,
+        }
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """开始监听，返回实际端口（port 为 0 时由系统分配）"""
+        self._server = await asyncio.start_server(self._handle, host, port, backlog=1024)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self._route(method, path, body)
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("ascii") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.active -= 1
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        method, path, _ = line.decode("latin-1").split(" ", 2)
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+        return method, path, headers, body
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        path = path.split("?", 1)[0]
+        if method == "GET" and path == "/stats":
+            return 200, self.stats()
+        if method == "POST" and path == "/stats/reset":
+            self.reset_stats()
+            return 200, self.stats()
+        if method == "POST" and path.endswith("/responses"):
+            request = json.loads(body or b"{}")
+            if request.get("stream"):
+                return 400, {"error": {"message": "stub server does not support streaming", "type": "invalid_request_error"}}
+            self.requests += 1
+            delay = self.latency * (1 + self._random.uniform(-self.jitter, self.jitter))
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return 200, build_response(request)
+        return 404, {"error": {"message": f"{method} {path} not found", "type": "invalid_request_error"}}
+
+
+async def serve(host: str, port: int, latency: float, jitter: float) -> None:
+    server = StubServer(latency=latency, jitter=jitter)
+    port = await server.start(host, port)
+    # 第一行输出地址，供启动它的进程读取
+    print(f"http://{host}:{port}/v1", flush=True)
+    await asyncio.Event().wait()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="本地的 OpenAI 兼容假服务器")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口，0 表示由系统分配")
+    parser.add_argument("--latency", type=float, default=0.05, help="每个请求的模拟延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.3, help="延迟的随机浮动比例")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.latency, args.jitter))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
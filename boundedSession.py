@@ -0,0 +1,444 @@
+"""Bounded session - 共享连接池、批量写入、历史窗口化的对话 session
+
+每次对话都新建一个 SQLiteSession 时，历史会无限增长，而且每一轮都会把完整历史重新发给模型。
+这里的 BoundedSession 实现了 SDK 的 Session 接口：
+- 同一个数据库文件的所有 session 共用一个 SessionPool（连接池 + 后台批量写入）：
+  并发 session 的写入在短暂等待后合并到同一个事务中提交（group commit）
+- 历史窗口化：最近 keep_turns 轮对话原样保留，更早的对话由 summarizer 折叠进一段滚动摘要，
+  并从数据库中删除，因此每轮的 prompt 大小和数据库大小都不会随对话轮数增长
+- 逐 session 统计条目数、字节数、轮数和摘要长度，见 SessionPool.stats
+- 传入 image_store 时，条目中内联的 base64 图片经过缩放后存进 blob 存储，数据库只保存引用，
+  读取历史时再展开（见 imageStore.py）
+
+一轮对话从一条用户消息开始，包含之后的模型回复、工具调用和工具结果，折叠时整轮处理，
+不会把工具调用和对应的结果拆开。
+
+用法：
+    pool = SessionPool("conversation_history.db")
+    session = BoundedSession("conversation_123", pool, keep_turns=6)
+    result = await Runner.run(agent, "What city is the Golden Gate Bridge in?", session=session)
+"""
+
+import asyncio
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from agents import Agent, RunConfig, Runner
+
+if TYPE_CHECKING:
+    from imageStore import ImageStore
+
+
+logger = logging.getLogger(__name__)
+
+
+# 摘要函数：(已有摘要, 要折叠的条目) -> 新摘要
+Summarizer = Callable[[str, List[Any]], Awaitable[str]]
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_items (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    turn INTEGER NOT NULL,
+    item TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS session_items_turn ON session_items (session_id, turn);
+CREATE TABLE IF NOT EXISTS session_state (
+    session_id TEXT PRIMARY KEY,
+    turns INTEGER NOT NULL DEFAULT 0,
+    last_is_user INTEGER NOT NULL DEFAULT 0,
+    summary TEXT NOT NULL DEFAULT '',
+    folded_turns INTEGER NOT NULL DEFAULT 0,
+    items INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def _is_user_message(item: Any) -> bool:
+    return isinstance(item, dict) and item.get("role") == "user" and item.get("type", "message") == "message"
+
+
+def _item_text(item: Any, max_chars: int = 500) -> str:
+    """把一个输入条目转换成摘要用的一行文本，图片等非文本内容用占位符代替"""
+    if not isinstance(item, dict):
+        return str(item)[:max_chars]
+    if "role" in item:
+        content = item.get("content")
+        if isinstance(content, list):
+            parts = []
+            for part in content:
+                if isinstance(part, dict) and "text" in part:
+                    parts.append(part["text"])
+                elif isinstance(part, dict) and part.get("type") in ("input_image", "input_file"):
+                    parts.append("[图片]" if part["type"] == "input_image" else "[文件]")
+            content = " ".join(parts)
+        return f"{item['role']}: {str(content)[:max_chars]}"
+    if item.get("type") == "function_call":
+        return f"调用工具 {item.get('name')}({str(item.get('arguments'))[:max_chars]})"
+    if item.get("type") == "function_call_output":
+        return f"工具结果: {str(item.get('output'))[:max_chars]}"
+    return f"[{item.get('type', 'item')}]"
+
+
+summarizer_agent = Agent(
+    name="conversation_summarizer",
+    instructions="""你负责维护一段对话的滚动摘要。你会收到已有的摘要和一段更早的对话记录，
+请把它们合并成一段新的摘要：
+1. 保留用户的身份、目标、偏好和已经确认的事实
+2. 保留尚未解决的问题和重要的中间结论
+3. 省略寒暄和已经被后续对话推翻的内容
+4. 只输出摘要正文，不要超过给定的字数""",
+)
+
+
+class AgentSummarizer:
+    """用 summarizer_agent 把旧对话折叠进滚动摘要
+
+    Args:
+        agent: 生成摘要的 agent
+        run_config: 传给 Runner.run 的运行配置
+        max_chars: 摘要的最大字数，超出部分会被截断
+    """
+
+    def __init__(self, agent: Agent = summarizer_agent, run_config: Optional[RunConfig] = None, max_chars: int = 800):
+        self.agent = agent
+        self.run_config = run_config
+        self.max_chars = max_chars
+
+    async def __call__(self, summary: str, items: List[Any]) -> str:
+        transcript = "\n".join(_item_text(item) for item in items)
+        prompt = (
+            f"已有摘要：\n{summary or '（无）'}\n\n更早的对话记录：\n{transcript}\n\n"
+            f"请输出合并后的新摘要，不超过 {self.max_chars} 字。"
+        )
+        result = await Runner.run(self.agent, prompt, run_config=self.run_config)
+        return str(result.final_output)[:self.max_chars]
+
+
+class SessionPool:
+    """同一个 SQLite 数据库文件上所有 session 共用的连接池和批量写入器
+
+    Args:
+        db_path: 数据库文件路径
+        pool_size: 连接数
+        linger: 写入前等待的时间（秒），这段时间内到达的写入合并到同一个事务中
+    """
+
+    def __init__(self, db_path: Union[str, Path] = "conversation_history.db", pool_size: int = 4, linger: float = 0.005):
+        self.db_path = str(db_path)
+        self.linger = linger
+        self._connections: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(pool_size):
+            connection = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA busy_timeout=5000")
+            self._connections.put(connection)
+        with self._connection() as connection:
+            connection.executescript(_SCHEMA)
+
+        # 等待写入的 (session_id, 条目列表, future)
+        self._pending: List[Tuple[str, List[Any], asyncio.Future]] = []
+        self._writer: Optional[asyncio.Task] = None
+        self._write_lock = threading.Lock()
+        self.transactions = 0
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connections.get()
+        try:
+            yield connection
+        finally:
+            self._connections.put(connection)
+
+    async def run(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """在线程中用池里的一个连接执行 fn(connection)"""
+        def call():
+            with self._connection() as connection:
+                return fn(connection)
+        return await asyncio.to_thread(call)
+
+    async def transaction(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """在一个写事务中执行 fn(connection)，出错时回滚"""
+        def call(connection: sqlite3.Connection):
+            # SQLite 同一时间只允许一个写事务，在进程内先串行化，避免 busy 重试
+            with self._write_lock:
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    result = fn(connection)
+                    connection.execute("COMMIT")
+                except BaseException:
+                    connection.execute("ROLLBACK")
+                    raise
+            self.transactions += 1
+            return result
+        return await self.run(call)
+
+    async def append(self, session_id: str, items: List[Any]) -> None:
+        """追加条目；在 linger 时间内到达的所有写入合并成一个事务，提交后返回"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((session_id, items, future))
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.ensure_future(self._write_loop())
+        await future
+
+    async def _write_loop(self) -> None:
+        while self._pending:
+            await asyncio.sleep(self.linger)
+            batch, self._pending = self._pending, []
+            try:
+                await self.transaction(lambda connection: self._write_batch(connection, batch))
+            except Exception as error:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+            else:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+
+    def _write_batch(self, connection: sqlite3.Connection, batch: List[Tuple[str, List[Any], asyncio.Future]]) -> None:
+        now = time.time()
+        for session_id, items, _ in batch:
+            row = connection.execute(
+                "SELECT turns, last_is_user FROM session_state WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            turns, last_is_user = row if row else (0, 0)
+            rows = []
+            for item in items:
+                is_user = _is_user_message(item)
+                # 连续的用户消息（如图片 + 问题）属于同一轮
+                if (is_user and not last_is_user) or turns == 0:
+                    turns += 1
+                last_is_user = is_user
+                data = json.dumps(item, ensure_ascii=False)
+                rows.append((session_id, turns, data, len(data.encode("utf-8"))))
+            connection.executemany(
+                "INSERT INTO session_items (session_id, turn, item, size) VALUES (?, ?, ?, ?)", rows
+            )
+            connection.execute(
+                """INSERT INTO session_state (session_id, turns, last_is_user, items, bytes, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (session_id) DO UPDATE SET
+                       turns = excluded.turns,
+                       last_is_user = excluded.last_is_user,
+                       items = items + excluded.items,
+                       bytes = bytes + excluded.bytes,
+                       updated_at = excluded.updated_at""",
+                (session_id, turns, int(last_is_user), len(rows), sum(row[3] for row in rows), now),
+            )
+
+    async def stats(self, session_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """逐 session 的条目数、字节数（条目 + 摘要）、累计轮数和已折叠轮数"""
+        def query(connection: sqlite3.Connection):
+            sql = "SELECT session_id, items, bytes, turns, folded_turns, length(summary), updated_at FROM session_state"
+            args: tuple = ()
+            if session_id is not None:
+                sql += " WHERE session_id = ?"
+                args = (session_id,)
+            return connection.execute(sql, args).fetchall()
+
+        return {
+            row[0]: {
+                "items": row[1],
+                "bytes": row[2] + row[5],
+                "turns": row[3],
+                "folded_turns": row[4],
+                "summary_chars": row[5],
+                "updated_at": row[6],
+            }
+            for row in await self.run(query)
+        }
+
+    async def purge(self, idle_seconds: float) -> int:
+        """删除超过 idle_seconds 没有更新的 session，返回删除的数量"""
+        cutoff = time.time() - idle_seconds
+
+        def delete(connection: sqlite3.Connection) -> int:
+            connection.execute(
+                "DELETE FROM session_items WHERE session_id IN "
+                "(SELECT session_id FROM session_state WHERE updated_at < ?)",
+                (cutoff,),
+            )
+            return connection.execute("DELETE FROM session_state WHERE updated_at < ?", (cutoff,)).rowcount
+
+        return await self.transaction(delete)
+
+    def close(self) -> None:
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+
+class BoundedSession:
+    """历史有界的 session：最近 keep_turns 轮原样保留，更早的对话折叠进滚动摘要
+
+    Args:
+        session_id: session ID
+        pool: 共用的 SessionPool
+        keep_turns: 原样保留的最近轮数
+        fold_every: 超出窗口的轮数累积到这个数量时才折叠一次，减少摘要调用的次数；折叠之前这些轮次仍原样回放
+        summarizer: 摘要函数，默认使用 AgentSummarizer()
+        image_store: 保存图片的 ImageStore，None 表示图片以 base64 内联保存
+        replay_images: 回放历史时最多展开的图片数（最近的优先），更早的图片换成文字说明；None 表示全部展开
+    """
+
+    session_settings = None
+
+    def __init__(
+        self,
+        session_id: str,
+        pool: SessionPool,
+        keep_turns: int = 6,
+        fold_every: int = 2,
+        summarizer: Optional[Summarizer] = None,
+        image_store: Optional["ImageStore"] = None,
+        replay_images: Optional[int] = None,
+    ):
+        self.session_id = session_id
+        self.pool = pool
+        self.keep_turns = keep_turns
+        self.fold_every = fold_every
+        self.summarizer = summarizer or AgentSummarizer()
+        self.image_store = image_store
+        self.replay_images = replay_images
+        self._fold_task: Optional[asyncio.Task] = None
+
+    async def get_items(self, limit: Optional[int] = None) -> List[Any]:
+        """摘要（如果有）+ 所有尚未折叠的条目；limit 只作用于条目部分
+
+        尚未折叠的条目是最近 keep_turns 轮，加上超出窗口但还没攒够 fold_every 轮、或摘要失败的轮次，
+        因此摘要和条目合起来总是覆盖全部对话。
+        """
+        # 正在进行的折叠完成后再读取，避免读到一半被删除的旧轮次
+        if self._fold_task is not None:
+            await asyncio.wait([self._fold_task])
+
+        def query(connection: sqlite3.Connection):
+            row = connection.execute(
+                "SELECT summary, folded_turns FROM session_state WHERE session_id = ?", (self.session_id,)
+            ).fetchone()
+            if row is None:
+                return "", []
+            summary, folded_turns = row
+            rows = connection.execute(
+                "SELECT item FROM session_items WHERE session_id = ? AND turn > ? ORDER BY seq",
+                (self.session_id, folded_turns),
+            ).fetchall()
+            return summary, rows
+
+        summary, rows = await self.pool.run(query)
+        items = [json.loads(item) for (item,) in rows]
+        if limit is not None:
+            items = items[-limit:] if limit > 0 else []
+        if self.image_store is not None:
+            items = await asyncio.to_thread(self.image_store.expand, items, self.replay_images)
+        if summary:
+            items.insert(0, {"role": "system", "content": f"以下是之前对话的摘要：\n{summary}"})
+        return items
+
+    async def add_items(self, items: List[Any]) -> None:
+        if not items:
+            return
+        if self.image_store is not None:
+            # 解码、缩放和写文件都比较慢，放到线程中进行
+            items = await asyncio.to_thread(self.image_store.externalize, items)
+        await self.pool.append(self.session_id, items)
+        if self._fold_task is None or self._fold_task.done():
+            # 折叠在后台进行，不阻塞本轮结果的返回；下一轮 get_items 会等待它完成
+            self._fold_task = asyncio.ensure_future(self._fold())
+
+    async def _fold(self) -> None:
+        def old_items(connection: sqlite3.Connection):
+            row = connection.execute(
+                "SELECT summary, turns, folded_turns FROM session_state WHERE session_id = ?", (self.session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            summary, turns, folded_turns = row
+            boundary = turns - self.keep_turns
+            if boundary - folded_turns < self.fold_every:
+                return None
+            rows = connection.execute(
+                "SELECT seq, item, size FROM session_items WHERE session_id = ? AND turn <= ? ORDER BY seq",
+                (self.session_id, boundary),
+            ).fetchall()
+            return summary, boundary, rows
+
+        found = await self.pool.run(old_items)
+        if found is None:
+            return
+        summary, boundary, rows = found
+        try:
+            new_summary = await self.summarizer(summary, [json.loads(item) for _, item, _ in rows])
+        except Exception:
+            # 摘要失败时保留旧轮次，下一次 add_items 再重试
+            logger.exception("Failed to fold history of session %r", self.session_id)
+            return
+
+        def replace(connection: sqlite3.Connection) -> None:
+            # 按 seq 删除，折叠期间新写入的条目不受影响
+            last_seq = rows[-1][0] if rows else 0
+            connection.execute(
+                "DELETE FROM session_items WHERE session_id = ? AND seq <= ?", (self.session_id, last_seq)
+            )
+            connection.execute(
+                """UPDATE session_state SET summary = ?, folded_turns = ?,
+                       items = items - ?, bytes = bytes - ? WHERE session_id = ?""",
+                (new_summary, boundary, len(rows), sum(size for _, _, size in rows), self.session_id),
+            )
+
+        await self.pool.transaction(replace)
+
+    async def pop_item(self) -> Optional[Any]:
+        def pop(connection: sqlite3.Connection):
+            row = connection.execute(
+                "SELECT seq, item, size, turn FROM session_items WHERE session_id = ? ORDER BY seq DESC LIMIT 1",
+                (self.session_id,),
+            ).fetchone()
+            if row is not None:
+                seq, _, size, turn = row
+                connection.execute("DELETE FROM session_items WHERE seq = ?", (seq,))
+                # 弹出的是一轮的第一条时，这一轮不再存在，轮数减一；last_is_user 跟随新的最后一条，
+                # 之后追加的条目按同样的规则归入轮次
+                started_turn = connection.execute(
+                    "SELECT 1 FROM session_items WHERE session_id = ? AND turn = ? LIMIT 1", (self.session_id, turn)
+                ).fetchone() is None
+                last = connection.execute(
+                    "SELECT item FROM session_items WHERE session_id = ? ORDER BY seq DESC LIMIT 1", (self.session_id,)
+                ).fetchone()
+                connection.execute(
+                    """UPDATE session_state SET items = items - 1, bytes = bytes - ?,
+                           turns = MAX(folded_turns, turns - ?), last_is_user = ?
+                       WHERE session_id = ?""",
+                    (size, int(started_turn), int(last is not None and _is_user_message(json.loads(last[0]))),
+                     self.session_id),
+                )
+            return row
+
+        row = await self.pool.transaction(pop)
+        if row is None:
+            return None
+        item = json.loads(row[1])
+        if self.image_store is not None:
+            item = self.image_store.expand([item])[0]
+        return item
+
+    async def clear_session(self) -> None:
+        def clear(connection: sqlite3.Connection) -> None:
+            connection.execute("DELETE FROM session_items WHERE session_id = ?", (self.session_id,))
+            connection.execute("DELETE FROM session_state WHERE session_id = ?", (self.session_id,))
+
+        if self._fold_task is not None:
+            self._fold_task.cancel()
+        await self.pool.transaction(clear)
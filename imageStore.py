@@ -0,0 +1,270 @@
+"""Image store - 图片预处理和内容寻址的 blob 存储
+
+直接把原图 base64 编码后放进输入时，每次运行都要重新读取和编码整张原图，请求里是完整分辨率的图片；
+使用 session 时整段 base64 还会写进数据库，之后每一轮都要读出来重新发给模型。这里：
+- 预处理：原图缩放到模型实际使用的分辨率（长边不超过 max_side，短边不超过 min_side，
+  与 OpenAI 对 detail="high" 图片的缩放规则一致，缩得更小不会损失模型看到的细节），再重新压缩成 JPEG；
+  处理后反而更大时保留原图
+- 去重：处理后的图片按 sha256 存进 BlobStore（blobs/ab/cdef...），相同内容只存一份；
+  原图的哈希 -> 处理结果的对应关系也会记录下来，同一张原图不会重复处理
+- 引用：session 中的图片只保存 "blob:sha256:<哈希>" 引用，发给模型前再展开成 data URL，
+  展开结果有缓存，重复的轮次不会重复读文件和编码
+
+图片缩放需要 Pillow（pip install Pillow）；没有安装时跳过缩放，去重和引用照常工作。
+
+用法：
+    store = ImageStore("blobs")
+    part = store.input_image("testFile/question.jpg")  # {"type": "input_image", "image_url": "data:image/jpeg;base64,..."}
+    session = BoundedSession("image_analysis_session", pool, image_store=store)
+"""
+
+import base64
+import copy
+import hashlib
+import io
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+logger = logging.getLogger(__name__)
+
+
+REF_PREFIX = "blob:sha256:"
+
+# 文件头 -> MIME 类型
+_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+
+def sniff_mime(data: bytes) -> str:
+    """根据文件头判断图片的 MIME 类型"""
+    for signature, mime in _SIGNATURES:
+        if data.startswith(signature):
+            return mime
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def is_ref(url: Any) -> bool:
+    return isinstance(url, str) and url.startswith(REF_PREFIX)
+
+
+def prepare_image(data: bytes, max_side: int = 2048, min_side: int = 768, quality: int = 85) -> Tuple[bytes, str]:
+    """把图片缩放到长边不超过 max_side、短边不超过 min_side，并重新压缩成 JPEG，返回 (图片数据, MIME 类型)
+
+    没有安装 Pillow、图片无法解析或处理后更大时返回原图。
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        logger.warning("Pillow is not installed, images are stored without resizing (pip install Pillow)")
+        return data, sniff_mime(data)
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # 按 EXIF 方向旋转，缩放后不再保留 EXIF
+            image = ImageOps.exif_transpose(image)
+            width, height = image.size
+            scale = min(1.0, max_side / max(width, height), min_side / min(width, height))
+            if scale < 1.0:
+                image = image.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+            if image.mode in ("RGBA", "LA", "P"):
+                # JPEG 没有透明通道，透明部分铺白色背景
+                image = image.convert("RGBA")
+                background = Image.new("RGB", image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+            elif image.mode != "RGB":
+                image = image.convert("RGB")
+            output = io.BytesIO()
+            image.save(output, "JPEG", quality=quality, optimize=True, progressive=True)
+    except Exception:
+        logger.warning("Could not preprocess image, storing it unchanged", exc_info=True)
+        return data, sniff_mime(data)
+
+    processed = output.getvalue()
+    if len(processed) >= len(data) and scale >= 1.0:
+        return data, sniff_mime(data)
+    return processed, "image/jpeg"
+
+
+class BlobStore:
+    """按 sha256 寻址的文件存储，相同内容只存一份
+
+    Args:
+        root: 存储目录，文件保存在 root/<哈希前两位>/<哈希其余部分>
+    """
+
+    def __init__(self, root: Union[str, Path] = "blobs"):
+        self.root = Path(root)
+
+    def path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:]
+
+    def __contains__(self, digest: str) -> bool:
+        return self.path(digest).exists()
+
+    def put(self, data: bytes) -> str:
+        """写入数据并返回其 sha256；内容已存在时不重复写入"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # 先写临时文件再改名，并发写入同一内容时也不会读到写了一半的文件
+            fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp_")
+            try:
+                with os.fdopen(fd, "wb") as file:
+                    file.write(data)
+                os.replace(tmp, path)
+            except BaseException:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        return self.path(digest).read_bytes()
+
+    def size(self) -> int:
+        """所有 blob 的总字节数"""
+        return sum(path.stat().st_size for path in self.root.glob("??/*") if not path.name.startswith(".tmp_"))
+
+
+class ImageStore:
+    """图片预处理 + BlobStore，在 session 条目中用引用代替内联的 base64
+
+    Args:
+        root: blob 存储目录
+        max_side: 处理后图片长边的上限（像素）
+        min_side: 处理后图片短边的上限（像素）
+        quality: 重新压缩的 JPEG 质量
+        cache_size: 缓存的 data URL 个数
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path] = "blobs",
+        max_side: int = 2048,
+        min_side: int = 768,
+        quality: int = 85,
+        cache_size: int = 32,
+    ):
+        self.blobs = BlobStore(root)
+        self.max_side = max_side
+        self.min_side = min_side
+        self.quality = quality
+        self.cache_size = cache_size
+        # 原图哈希 -> 处理后图片的哈希，同时记录在 root/sources 下，跨进程复用
+        self._sources: Dict[str, str] = {}
+        self._urls: "OrderedDict[str, str]" = OrderedDict()
+        # 统计：处理的图片数、去重命中数、原图和处理后的总字节数
+        self.ingested = 0
+        self.deduped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _source_path(self, source_digest: str) -> Path:
+        return self.blobs.root / "sources" / source_digest
+
+    def ingest(self, source: Union[str, Path, bytes]) -> str:
+        """预处理一张图片并存入 blob 存储，返回引用 "blob:sha256:<哈希>" """
+        data = source if isinstance(source, bytes) else Path(source).read_bytes()
+        source_digest = hashlib.sha256(data).hexdigest()
+        digest = self._sources.get(source_digest)
+        if digest is None:
+            if source_digest in self.blobs:
+                # 已经是处理过的图片（例如 input_image 生成的 data URL 又经过 session 写回）
+                digest = source_digest
+            else:
+                path = self._source_path(source_digest)
+                if path.exists():
+                    digest = path.read_text().strip()
+        if digest is not None and digest in self.blobs:
+            self.deduped += 1
+        else:
+            processed, _ = prepare_image(data, self.max_side, self.min_side, self.quality)
+            digest = self.blobs.put(processed)
+            path = self._source_path(source_digest)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(digest)
+            self.ingested += 1
+            self.bytes_in += len(data)
+            self.bytes_out += len(processed)
+        self._sources[source_digest] = digest
+        return REF_PREFIX + digest
+
+    def data_url(self, ref: str) -> str:
+        """把引用展开成 data URL"""
+        digest = ref[len(REF_PREFIX):]
+        url = self._urls.get(digest)
+        if url is None:
+            data = self.blobs.get(digest)
+            url = f"data:{sniff_mime(data)};base64,{base64.b64encode(data).decode('ascii')}"
+            self._urls[digest] = url
+            if len(self._urls) > self.cache_size:
+                self._urls.popitem(last=False)
+        else:
+            self._urls.move_to_end(digest)
+        return url
+
+    def input_image(self, source: Union[str, Path, bytes], detail: str = "auto") -> Dict[str, Any]:
+        """预处理图片并返回可以直接放进消息 content 的 input_image 条目"""
+        return {"type": "input_image", "detail": detail, "image_url": self.data_url(self.ingest(source))}
+
+    def externalize(self, items: List[Any]) -> List[Any]:
+        """返回条目的副本，其中内联的 data URL 图片换成 blob 引用"""
+        return [self._map_images(item, self._to_ref) for item in items]
+
+    def expand(self, items: List[Any], max_images: Optional[int] = None) -> List[Any]:
+        """返回条目的副本，其中的 blob 引用展开成 data URL
+
+        max_images 不为 None 时只展开最近出现的 max_images 张不同图片，更早的图片换成一段文字说明。
+        """
+        refs = [part["image_url"] for item in items for part in _image_parts(item) if is_ref(part["image_url"])]
+        # 从后往前去重，保留最近出现的图片
+        recent = list(dict.fromkeys(reversed(refs)))
+        keep = set(recent if max_images is None else recent[:max_images])
+        return [self._map_images(item, lambda part: self._to_url(part, keep)) for item in items]
+
+    def _to_ref(self, part: Dict[str, Any]) -> Dict[str, Any]:
+        url = part.get("image_url")
+        if not isinstance(url, str) or not url.startswith("data:") or ";base64," not in url:
+            return part
+        data = base64.b64decode(url.split(",", 1)[1])
+        return {**part, "image_url": self.ingest(data)}
+
+    def _to_url(self, part: Dict[str, Any], keep: set) -> Dict[str, Any]:
+        url = part.get("image_url")
+        if not is_ref(url):
+            return part
+        if url not in keep:
+            return {"type": "input_text", "text": "[图片：已在之前的对话中发送过]"}
+        return {**part, "image_url": self.data_url(url)}
+
+    @staticmethod
+    def _map_images(item: Any, fn) -> Any:
+        if not _image_parts(item):
+            return item
+        item = copy.copy(item)
+        item["content"] = [
+            fn(part) if isinstance(part, dict) and part.get("type") == "input_image" else part
+            for part in item["content"]
+        ]
+        return item
+
+
+def _image_parts(item: Any) -> List[Dict[str, Any]]:
+    if not isinstance(item, dict) or not isinstance(item.get("content"), list):
+        return []
+    return [
+        part for part in item["content"]
+        if isinstance(part, dict) and part.get("type") == "input_image" and isinstance(part.get("image_url"), str)
+    ]